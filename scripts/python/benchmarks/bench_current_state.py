@@ -0,0 +1,49 @@
+import time
+import logging
+import argparse
+
+from fake_tfe import fake_tfe, build_fake_client, configure_scheduler
+import migration_script
+
+# Throughput of migrate_current_state against a fake Source and Target with simulated API latency,
+# for a range of worker counts
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark current state migration throughput against a fake TFE API.")
+    parser.add_argument("--workspaces", type=int, default=200, help="Workspaces on the Source and Target.")
+    parser.add_argument("--state-kb", type=int, default=64, help="Size of each state file in KiB.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds each fake API request takes.")
+    parser.add_argument("--workers", default="1,4,16", help="Comma separated worker counts to compare.")
+    parser.add_argument("--max-host-connections", type=int, default=32, help="Concurrent requests per host.")
+    parser.add_argument("--requests-per-second", type=float, default=10000, help="Request rate limit per host.")
+    return parser.parse_args()
+
+def run(source_server, target_server, max_workers):
+    source = build_fake_client(source_server)
+    target = build_fake_client(target_server)
+    source_inventory = migration_script.OrganizationInventory(source)
+    target_inventory = migration_script.OrganizationInventory(target)
+    # Inventories are listed up front, like a real run does before the phase
+    source_inventory.workspaces()
+    target_inventory.workspaces()
+
+    started = time.perf_counter()
+    results = migration_script.migrate_current_state(source, target, max_workers, migration_script.MigrationJournal(), \
+        source_inventory, target_inventory)
+    elapsed = time.perf_counter() - started
+    created = sum(1 for result in results if result["status"] == "created")
+    return elapsed, created
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    configure_scheduler(args.max_host_connections, args.requests_per_second)
+
+    options = {"workspaces": args.workspaces, "state_bytes": args.state_kb * 1024, "latency": args.latency}
+    with fake_tfe(id_prefix="ws-source", **options) as source_server, fake_tfe(id_prefix="ws-target", **options) as target_server:
+        print(f"{args.workspaces} workspaces, {args.state_kb} KiB states, {args.latency * 1000:.0f} ms per API request")
+        print(f"{'workers':>8} {'seconds':>9} {'workspaces/s':>13} {'migrated':>9}")
+        for max_workers in [int(workers) for workers in args.workers.split(",")]:
+            elapsed, created = run(source_server, target_server, max_workers)
+            print(f"{max_workers:>8} {elapsed:>9.2f} {created / elapsed:>13.1f} {created:>9}")
+        print(f"Source API calls: {source_server.calls()}")
+        print(f"Target API calls: {target_server.calls()}")
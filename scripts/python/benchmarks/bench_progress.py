@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Imported for its sys.path setup only, no fake API is needed
+import fake_tfe
+import migration_script
+
+# Per-item cost of the loop bookkeeping shared by the migration phases: Progress.step(), grouping a
+# variables file by Workspace and the reverse lookup of VCS Providers by ot-* token. The cost per item
+# should stay flat as the item count grows; the previous list.index() progress logging grew with it.
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark per-item loop overhead of the migration phases.")
+    parser.add_argument("--sizes", default="10000,20000,40000,80000,160000", help="Comma separated item counts to compare.")
+    parser.add_argument("--max-ratio", type=float, default=None, \
+        help="Exit non-zero if the per-item cost of the largest size exceeds the smallest by more than this factor.")
+    return parser.parse_args()
+
+def best_of(function, repeat=3):
+    # The fastest run is the least disturbed by the rest of the machine
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def progress_loop(size):
+    # A long log interval keeps logging out of the measurement, only the bookkeeping is timed
+    progress = migration_script.Progress("benchmark", size, log_interval=3600)
+    for _ in range(size):
+        progress.step()
+
+def list_index_loop(size):
+    # The previous progress logging, kept for comparison
+    items = list(range(size))
+    for item in items:
+        f"({items.index(item) + 1}/{len(items)})"
+
+def vcs_lookup_loop(size):
+    oauth_token_ids = [f"ot-{index % 8}" for index in range(size)]
+    for oauth_token_id in oauth_token_ids:
+        migration_script.TFE_SOURCE_VCS_TYPES.get(oauth_token_id)
+
+def write_variables_file(filepath, size):
+    with open(filepath, "w", encoding="utf-8") as variables_file:
+        for row in range(size):
+            workspace = row % 1000
+            variables_file.write(json.dumps({"workspace_name": f"workspace-{workspace:06d}", "workspace_id": f"ws-{workspace:06d}", \
+                "variable_key": f"variable_{row}", "variable_value": "value", "variable_category": "terraform", \
+                "variable_hcl": False, "variable_sensitive": False}) + "\n")
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    migration_script.TFE_SOURCE_VCS_TYPES.update({f"ot-{index}": "github" for index in range(4)})
+
+    loops = {"Progress.step": progress_loop, "vcs lookup": vcs_lookup_loop}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            write_variables_file(os.path.join(directory, f"variables-{size}.jsonl"), size)
+        loops["group variables"] = lambda size: migration_script.group_workspace_variables( \
+            os.path.join(directory, f"variables-{size}.jsonl"), migration_script.MigrationJournal())
+
+        print(f"{'loop':>16} " + " ".join(f"{size:>10}" for size in sizes) + f" {'ratio':>7}   (microseconds per item)")
+        worst = 0.0
+        for name, loop in loops.items():
+            costs = [best_of(lambda: loop(size)) / size * 1e6 for size in sizes]
+            ratio = costs[-1] / costs[0]
+            worst = max(worst, ratio)
+            print(f"{name:>16} " + " ".join(f"{cost:>10.3f}" for cost in costs) + f" {ratio:>7.2f}")
+
+    # Only the smallest size, the old approach grows with the square of the item count
+    index_sizes = sizes[:2]
+    costs = [best_of(lambda: list_index_loop(size), repeat=1) / size * 1e6 for size in index_sizes]
+    print(f"{'list.index':>16} " + " ".join(f"{cost:>10.3f}" for cost in costs) + f" {costs[-1] / costs[0]:>7.2f}   (previous, first sizes only)")
+
+    if args.max_ratio is not None and worst > args.max_ratio:
+        print(f"Per-item cost grew by {worst:.2f}x, more than --max-ratio {args.max_ratio}")
+        sys.exit(1)
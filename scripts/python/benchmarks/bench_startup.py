@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from fake_tfe import FAKE_TFE_TOKEN, FAKE_TFE_ORG, fake_tfe
+
+# Startup time of migration_script in fresh interpreters: the import alone, `--help`, an invocation that
+# fails argument validation and a Source only phase against the fake API. The Source only phase must not
+# touch the Target, whose fake API counts every request including the well-known discovery document.
+SCRIPT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(SCRIPT_DIRECTORY, "migration_script.py")
+HEAVY_MODULES = ("requests", "terrasnek.api", "pandas")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark startup time of the migration script.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per invocation, the median is reported.")
+    parser.add_argument("--workspaces", type=int, default=20, help="Workspaces on the fake Source for the Source only phase.")
+    return parser.parse_args()
+
+def median_seconds(command, repeat, env=None):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPT_DIRECTORY, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def loaded_heavy_modules():
+    code = f"import sys, migration_script; print(' '.join(module for module in {HEAVY_MODULES!r} if module in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], cwd=SCRIPT_DIRECTORY, check=True, capture_output=True, text=True).stdout.split()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    invocations = {
+        "python -c 'pass'": [sys.executable, "-c", "pass"],
+        "import migration_script": [sys.executable, "-c", "import migration_script"],
+        "--help": [sys.executable, SCRIPT, "--help"],
+        "failed validation": [sys.executable, SCRIPT, "--sync-since", "sync.json"]
+    }
+
+    print(f"{'invocation':>26} {'median seconds':>15}")
+    for name, command in invocations.items():
+        print(f"{name:>26} {median_seconds(command, args.repeat):>15.3f}")
+    loaded = loaded_heavy_modules()
+    print(f"Heavy modules loaded by the import: {', '.join(loaded) if loaded else 'none'}")
+
+    with tempfile.TemporaryDirectory() as directory, fake_tfe(workspaces=args.workspaces, variables_per_workspace=5) as source_server, \
+            fake_tfe() as target_server:
+        env = dict(os.environ, TFE_SOURCE_TOKEN=FAKE_TFE_TOKEN, TFE_SOURCE_URL=source_server.url, TFE_SOURCE_ORG=FAKE_TFE_ORG, \
+            TFC_TARGET_TOKEN=FAKE_TFE_TOKEN, TFC_TARGET_URL=target_server.url, TFC_TARGET_ORG=FAKE_TFE_ORG)
+        command = [sys.executable, SCRIPT, "--create-workspace-vars-csv", "--output-file-path", os.path.join(directory, "variables.csv")]
+        print(f"{'--create-workspace-vars-csv':>26} {median_seconds(command, args.repeat, env):>15.3f}")
+        target_calls = sum(target_server.calls().values())
+        print(f"Source API calls: {source_server.calls()}")
+        print(f"Target API calls: {target_calls}")
+        if target_calls:
+            sys.exit(1)
@@ -0,0 +1,91 @@
+import sys
+import json
+import base64
+import hashlib
+import logging
+import argparse
+import resource
+import subprocess
+import tracemalloc
+from urllib import request
+
+from fake_tfe import FakeTFEProcess, fake_tfe, build_fake_client, configure_scheduler
+import migration_script
+
+# Peak memory of one current state transfer: the streaming path of migrate_current_state against the
+# previous path, which read the whole state, parsed it and base64 encoded it in memory. Each path runs
+# in its own process so their peak RSS values do not mix.
+MODES = ("streaming", "buffered")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of a state download and upload against a fake TFE API.")
+    parser.add_argument("--state-mb", type=int, default=100, help="Size of the state file in MiB.")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def max_rss_bytes():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def transfer_streaming(client, workspace_id):
+    state_version = client.state_versions.get_current(workspace_id)["data"]
+    state_blob = migration_script.fetch_state_blob(workspace_id, state_version)
+    migration_script.upload_workspace_state(client, workspace_id, state_blob)
+
+def transfer_buffered(client, workspace_id):
+    state_version = client.state_versions.get_current(workspace_id)["data"]
+    state_data = request.urlopen(state_version["attributes"]["hosted-state-download-url"]).read()
+    state_json = json.loads(state_data)
+    state_hash = hashlib.md5()
+    state_hash.update(state_data)
+    payload = {
+        "data": {
+            "type": "state-versions",
+            "attributes": {
+                "serial": state_json["serial"],
+                "md5": state_hash.hexdigest(),
+                "lineage": state_json["lineage"],
+                "state": base64.b64encode(state_data).decode("utf-8")
+            }
+        }
+    }
+    client.workspaces.lock(workspace_id, {"reason": "benchmark"})
+    client.state_versions.create(workspace_id, payload)
+    client.workspaces.unlock(workspace_id)
+
+def measure(mode, url):
+    # The fake API serves both sides, states are downloaded from and uploaded to the same Workspace
+    client = build_fake_client(FakeTFEProcess(url, None))
+    workspace_id = client.workspaces.list()["data"][0]["id"]
+    transfer = transfer_streaming if mode == "streaming" else transfer_buffered
+
+    baseline = max_rss_bytes()
+    transfer(client, workspace_id)
+    rss_growth = max_rss_bytes() - baseline
+
+    tracemalloc.start()
+    transfer(client, workspace_id)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"rss_growth": rss_growth, "traced_peak": traced_peak}
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    configure_scheduler(4, 1000)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.url)))
+        sys.exit()
+
+    state_bytes = args.state_mb * 1024 * 1024
+    with fake_tfe(workspaces=1, state_bytes=state_bytes) as server:
+        print(f"{args.state_mb} MiB state, spooled to disk above {migration_script.STATE_SPOOL_MAX_BYTES // (1024 * 1024)} MiB")
+        print(f"{'mode':>10} {'peak RSS growth MiB':>20} {'traced peak MiB':>16} {'x state size':>13}")
+        for mode in MODES:
+            output = subprocess.run([sys.executable, __file__, "--mode", mode, "--url", server.url], \
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>10} {result['rss_growth'] / 2 ** 20:>20.1f} {result['traced_peak'] / 2 ** 20:>16.1f} " \
+                f"{result['traced_peak'] / state_bytes:>13.2f}")
@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from collections import Counter
+
+from fake_tfe import fake_tfe, build_fake_client, configure_scheduler
+import migration_script
+
+# API calls and wall time of deploy_target_workspace_variables for a synthetic variables file, against a
+# fake Target whose Workspaces already hold some of the variables
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark Workspace variable deployment against a fake TFE API.")
+    parser.add_argument("--rows", type=int, default=50000, help="Variables in the synthetic variables file.")
+    parser.add_argument("--workspaces", type=int, default=1000, help="Workspaces the variables are spread over.")
+    parser.add_argument("--existing", type=int, default=10, help="Variables per Workspace that already exist on the Target.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each fake API request takes.")
+    parser.add_argument("--max-workers", type=int, default=16, help="Concurrent variable creates.")
+    parser.add_argument("--max-host-connections", type=int, default=16, help="Concurrent requests per host.")
+    parser.add_argument("--requests-per-second", type=float, default=10000, help="Request rate limit per host.")
+    return parser.parse_args()
+
+def write_variables_file(filepath, rows, workspaces):
+    with open(filepath, "w", encoding="utf-8") as variables_file:
+        for row in range(rows):
+            workspace, index = row % workspaces, row // workspaces
+            variables_file.write(json.dumps({
+                "workspace_name": f"workspace-{workspace:06d}",
+                "workspace_id": f"ws-source-{workspace:06d}",
+                "variable_key": f"variable_{index}",
+                "variable_value": f"value-{index}",
+                "variable_category": "terraform",
+                "variable_hcl": False,
+                "variable_sensitive": False
+            }) + "\n")
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    configure_scheduler(args.max_host_connections, args.requests_per_second)
+
+    with tempfile.TemporaryDirectory() as directory, \
+            fake_tfe(workspaces=args.workspaces, variables_per_workspace=args.existing, latency=args.latency) as server:
+        filepath = os.path.join(directory, "variables.jsonl")
+        write_variables_file(filepath, args.rows, args.workspaces)
+        target = build_fake_client(server)
+        target_inventory = migration_script.OrganizationInventory(target)
+        target_inventory.workspaces()
+        calls_before = Counter(server.calls())
+
+        started = time.perf_counter()
+        migration_script.deploy_target_workspace_variables(target, filepath, migration_script.MigrationJournal(), target_inventory, \
+            args.max_workers)
+        elapsed = time.perf_counter() - started
+
+        # Counter subtraction keeps only the routes called during the deployment
+        calls = Counter(server.calls()) - calls_before
+        # Rows are spread round-robin, so each Workspace gets its first keys skipped
+        existing = sum(min(args.existing, len(range(workspace, args.rows, args.workspaces))) for workspace in range(args.workspaces))
+        print(f"{args.rows} variables over {args.workspaces} workspaces, {existing} already on the Target")
+        print(f"Wall time: {elapsed:.2f}s, {args.rows / elapsed:.0f} rows/s")
+        print(f"API calls: {sum(calls.values())} {dict(calls)}, {sum(calls.values()) / args.rows:.2f} per row")
+        # The previous implementation listed the variables and showed the Workspace for every row
+        print(f"Per row lookups would make: {2 * args.rows + args.rows - existing}")
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+from fake_tfe import FakeTFEProcess, fake_tfe, build_fake_client, configure_scheduler
+import migration_script
+
+# Peak memory of the Workspace variable export and import against a fake Source, 100k variables by
+# default, and the import time of migration_script. Each mode runs in its own process so their peak RSS
+# values do not mix. "buffered" collects every row before writing, like the previous DataFrame export.
+MODES = ("export-csv", "export-jsonl", "buffered-csv", "read-csv", "group-csv")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark memory of the Workspace variable export and import against a fake TFE API.")
+    parser.add_argument("--workspaces", type=int, default=1000, help="Workspaces on the fake Source.")
+    parser.add_argument("--variables-per-workspace", type=int, default=100, help="Variables of each Workspace.")
+    parser.add_argument("--max-workers", type=int, default=16, help="Workspaces whose variables are fetched concurrently.")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def max_rss_bytes():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def export(source, filepath, max_workers):
+    migration_script.create_source_variable_spreadsheet(source, filepath, max_workers=max_workers)
+
+def export_buffered(source, filepath, max_workers):
+    workspaces = migration_script.OrganizationInventory(source).workspaces()
+    variables = list(migration_script.iter_source_variables(source, workspaces, max_workers))
+    migration_script.write_variable_rows(filepath, variables)
+
+def read(filepath):
+    for _ in migration_script.read_variable_rows(filepath):
+        pass
+
+def measure(args):
+    csv_path = os.path.join(args.directory, "variables.csv")
+    jsonl_path = os.path.join(args.directory, "variables.jsonl")
+    source = build_fake_client(FakeTFEProcess(args.url, None)) if args.mode.startswith(("export", "buffered")) else None
+    run = {
+        "export-csv": lambda: export(source, csv_path, args.max_workers),
+        "export-jsonl": lambda: export(source, jsonl_path, args.max_workers),
+        "buffered-csv": lambda: export_buffered(source, os.path.join(args.directory, "buffered.csv"), args.max_workers),
+        "read-csv": lambda: read(csv_path),
+        # Grouping keeps every pending row until its Workspace is deployed, so this one grows with the file
+        "group-csv": lambda: migration_script.group_workspace_variables(csv_path, migration_script.MigrationJournal())
+    }[args.mode]
+
+    baseline = max_rss_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": elapsed, "rss_growth": max_rss_bytes() - baseline, "traced_peak": traced_peak}
+
+def measure_import():
+    code = "import sys, time; started = time.perf_counter(); import migration_script; " \
+        "print(time.perf_counter() - started, 'pandas' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, \
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    configure_scheduler(args.max_workers, 10000)
+
+    if args.mode:
+        print(json.dumps(measure(args)))
+        sys.exit()
+
+    variables = args.workspaces * args.variables_per_workspace
+    with tempfile.TemporaryDirectory() as directory, \
+            fake_tfe(workspaces=args.workspaces, variables_per_workspace=args.variables_per_workspace) as server:
+        print(f"{variables} variables over {args.workspaces} workspaces")
+        print(f"{'mode':>13} {'seconds':>8} {'peak RSS growth MiB':>20} {'traced peak MiB':>16} {'bytes/variable':>15}")
+        # The export modes run first, the read modes use their files
+        for mode in MODES:
+            output = subprocess.run([sys.executable, __file__, "--mode", mode, "--url", server.url, "--directory", directory, \
+                "--max-workers", str(args.max_workers)], check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>13} {result['seconds']:>8.2f} {result['rss_growth'] / 2 ** 20:>20.1f} " \
+                f"{result['traced_peak'] / 2 ** 20:>16.1f} {result['traced_peak'] / variables:>15.0f}")
+
+    seconds, pandas_imported = measure_import()
+    print(f"import migration_script: {seconds:.3f}s, pandas imported: {pandas_imported}")
@@ -0,0 +1,199 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import threading
+import multiprocessing
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Makes migration_script importable from the benchmark scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_TFE_TOKEN = "benchmark-token"
+FAKE_TFE_ORG = "benchmark"
+
+WELL_KNOWN = {"tfe.v2": "/api/v2/", "tfe.v2.1": "/api/v2/", "tfe.v2.2": "/api/v2/", "modules.v1": "/api/registry/v1/modules/"}
+
+STATE_PADDING_CHUNK = b"0123456789abcdef" * 4096
+
+# Minimal TFE/TFC API for benchmarks: paginated Workspaces, current state versions with downloadable blobs,
+# locks, state version uploads and Workspace variables. Every API request sleeps for the configured latency
+# and is counted by route; GET /_calls returns the counts.
+class FakeTFE(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, workspaces=0, variables_per_workspace=0, state_bytes=4096, latency=0.0, id_prefix="ws"):
+        super().__init__(("127.0.0.1", 0), FakeTFEHandler)
+        self.workspace_count = workspaces
+        self.variables_per_workspace = variables_per_workspace
+        self.state_bytes = state_bytes
+        self.latency = latency
+        self.id_prefix = id_prefix
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count(self, route):
+        with self._lock:
+            self.calls[route] += 1
+
+    def workspace(self, index):
+        workspace_id = f"{self.id_prefix}-{index:06d}"
+        return {
+            "id": workspace_id,
+            "type": "workspaces",
+            "attributes": {"name": f"workspace-{index:06d}", "updated-at": "2024-01-01T00:00:00.000Z"},
+            "relationships": {"current-state-version": {"data": {"id": f"sv-{workspace_id}", "type": "state-versions"}}}
+        }
+
+    def variables(self, workspace_id):
+        return [{
+            "id": f"var-{workspace_id}-{index}",
+            "type": "vars",
+            "attributes": {"key": f"variable_{index}", "value": f"value-{index}", "description": None, "category": "terraform", \
+                "hcl": False, "sensitive": False},
+            "relationships": {"configurable": {"data": {"id": workspace_id, "type": "workspaces"}}}
+        } for index in range(self.variables_per_workspace)]
+
+    def state_parts(self):
+        # The state is streamed as a header, padding and a footer, so even large states take no server memory
+        header = b'{"version": 4, "terraform_version": "1.5.0", "serial": 7, "lineage": "benchmark-lineage", "outputs": {}, "resources": [], "padding": "'
+        footer = b'"}'
+        return header, max(0, self.state_bytes - len(header) - len(footer)), footer
+
+class FakeTFEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without this every keep-alive response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", re.compile(r"^/api/v2/organizations/[^/]+/workspaces$"), "list_workspaces"),
+        ("GET", re.compile(r"^/api/v2/state-versions$"), "list_state_versions"),
+        ("GET", re.compile(r"^/api/v2/workspaces/(?P<workspace_id>[^/]+)/current-state-version$"), "current_state_version"),
+        ("POST", re.compile(r"^/api/v2/workspaces/(?P<workspace_id>[^/]+)/actions/(lock|unlock|force-unlock)$"), "lock"),
+        ("POST", re.compile(r"^/api/v2/workspaces/(?P<workspace_id>[^/]+)/state-versions$"), "create_state_version"),
+        ("GET", re.compile(r"^/api/v2/workspaces/(?P<workspace_id>[^/]+)/vars/?$"), "list_variables"),
+        ("POST", re.compile(r"^/api/v2/workspaces/(?P<workspace_id>[^/]+)/vars/?$"), "create_variable"),
+        ("GET", re.compile(r"^/blobs/(?P<workspace_id>[^/]+)$"), "download_state"),
+    ]
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body):
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _discard_body(self):
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+
+    def _dispatch(self):
+        self._discard_body()
+        request = urlparse(self.path)
+        if request.path == "/.well-known/terraform.json":
+            self.server.count("well_known")
+            return self._json(200, WELL_KNOWN)
+        if request.path == "/_calls":
+            return self._json(200, dict(self.server.calls))
+
+        for method, pattern, route in self.ROUTES:
+            match = pattern.match(request.path)
+            if method == self.command and match:
+                self.server.count(route)
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                return getattr(self, route)(parse_qs(request.query), **match.groupdict())
+        self._json(404, {"errors": [{"status": "404", "title": "not found"}]})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def list_workspaces(self, query):
+        page = int(query.get("page[number]", ["1"])[0])
+        page_size = int(query.get("page[size]", ["20"])[0])
+        total_pages = max(1, -(-self.server.workspace_count // page_size))
+        indexes = range((page - 1) * page_size, min(page * page_size, self.server.workspace_count))
+        self._json(200, {"data": [self.server.workspace(index) for index in indexes], \
+            "meta": {"pagination": {"current-page": page, "total-pages": total_pages, "total-count": self.server.workspace_count}}})
+
+    def list_state_versions(self, query):
+        # Target Workspaces have no state, so every Source state is migrated
+        self._json(200, {"data": [], "meta": {"pagination": {"current-page": 1, "total-pages": 1, "total-count": 0}}})
+
+    def current_state_version(self, query, workspace_id):
+        self._json(200, {"data": {"id": f"sv-{workspace_id}", "type": "state-versions", "attributes": {"serial": 7, \
+            "hosted-state-download-url": f"http://{self.headers['Host']}/blobs/{workspace_id}"}}})
+
+    def lock(self, query, workspace_id):
+        self._json(200, {"data": {"id": workspace_id, "type": "workspaces"}})
+
+    def create_state_version(self, query, workspace_id):
+        self._json(201, {"data": {"id": f"sv-new-{workspace_id}", "type": "state-versions"}})
+
+    def list_variables(self, query, workspace_id):
+        self._json(200, {"data": self.server.variables(workspace_id)})
+
+    def create_variable(self, query, workspace_id):
+        self._json(201, {"data": {"id": f"var-new-{workspace_id}", "type": "vars"}})
+
+    def download_state(self, query, workspace_id):
+        header, padding, footer = self.server.state_parts()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(header) + padding + len(footer)))
+        self.end_headers()
+        self.wfile.write(header)
+        while padding:
+            chunk = STATE_PADDING_CHUNK[:padding]
+            self.wfile.write(chunk)
+            padding -= len(chunk)
+        self.wfile.write(footer)
+
+def _serve(connection, options):
+    server = FakeTFE(**options)
+    connection.send(server.url)
+    server.serve_forever()
+
+class FakeTFEProcess:
+    def __init__(self, url, process):
+        self.url = url
+        self.process = process
+
+    def calls(self):
+        with urlopen(f"{self.url}/_calls") as response:
+            return json.loads(response.read())
+
+@contextmanager
+def fake_tfe(**options):
+    # Served from a separate process, so its threads and memory do not show up in the measured process
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, options), daemon=True)
+    process.start()
+    try:
+        yield FakeTFEProcess(parent.recv(), process)
+    finally:
+        process.terminate()
+        process.join()
+
+def build_fake_client(server, log_level=logging.ERROR):
+    import migration_script
+    return migration_script.build_client(FAKE_TFE_TOKEN, server.url, False, FAKE_TFE_ORG, log_level)
+
+def configure_scheduler(max_connections, requests_per_second):
+    # The default limits protect real TFE/TFC instances, the fake API is only limited by the benchmark arguments
+    import migration_script
+    migration_script.REQUEST_SCHEDULER.configure(max_connections, requests_per_second)
@@ -0,0 +1,56 @@
+__version__ = "1.0.0"
+
+import os
+import json
+import logging
+import argparse
+from migration_script import build_client, iter_pages, MIGRATION_MAX_WORKERS
+
+# Lists every Workspace of an Organization, one per line. Replaces list-all-workspace-ids.sh and
+# list-all-workspace-names.sh, which only read the first page of 100 Workspaces.
+TFC_TOKEN = os.getenv("TFC_TOKEN", "")
+TFC_URL = os.getenv("TFC_URL", "")
+TFC_ORG = os.getenv("TFC_ORG", "")
+TFC_VERIFY = os.getenv("TFC_VERIFY", False)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='List all Workspace IDs and/or names of a TFE/TFC Organization.')
+    parser.add_argument('--url', dest="url", default=TFC_URL, \
+        help="URL or hostname of the TFE/TFC instance. Example: tfe.mydomain.com [TFC_URL]"
+    )
+    parser.add_argument('--org', dest="org", default=TFC_ORG, \
+        help="Organization that contains the Workspaces. [TFC_ORG]"
+    )
+    parser.add_argument('--field', dest="field", choices=["id", "name", "both"], default="both", \
+        help="Print Workspace IDs, names or both separated by a tab."
+    )
+    parser.add_argument('--max-workers', dest="max_workers", type=int, default=MIGRATION_MAX_WORKERS, \
+        help="Pages fetched concurrently after the first."
+    )
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    if not TFC_TOKEN:
+        logging.error(f"'Missing API token. Set the TFC_TOKEN environment variable.")
+        exit(1)
+    if not args.url or not args.org:
+        logging.error(f"'Missing TFE/TFC URL or Organization Parameter. [--url] [--org]")
+        exit(1)
+
+    url = args.url if "://" in args.url else f"https://{args.url}"
+    try:
+        client = build_client(TFC_TOKEN, url, TFC_VERIFY, args.org, logging.WARNING)
+    except json.JSONDecodeError:
+        logging.error(f"Outgoing GET Request to '//.well-known/terraform.json' failed to acquire JSON data.")
+        exit(1)
+
+    # Workspaces are printed as their pages arrive
+    for workspace in iter_pages(client.workspaces.list, args.max_workers):
+        if args.field == "id":
+            print(workspace['id'])
+        elif args.field == "name":
+            print(workspace['attributes']['name'])
+        else:
+            print(f"{workspace['id']}\t{workspace['attributes']['name']}")
@@ -1,21 +1,31 @@
 __version__ = "1.0.0"
 __author__ = "Noah Eldreth"
 
-from asyncio.log import logger
 import os
+import csv
 import json
+import gzip
 import time
-import ssl
 import logging
 import base64
+import heapq
 import hashlib
+import random
 import argparse
+import tempfile
+import threading
 from typing import Dict
-import pandas as PD
-from urllib import request
-from terrasnek.api import TFC
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from collections import deque
+from functools import partial, wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlparse
 from terrasnek.exceptions import *
 
+logger = logging.getLogger(__name__)
+
 # Authenticate with Owners Token to TFE/TFC Terraform Organization
 TFE_SOURCE_TOKEN = os.getenv("TFE_SOURCE_TOKEN", "")
 # Terraform Source URL
@@ -29,6 +39,8 @@ TFE_SOURCE_VCS = {
     "devops": "",
     "github": ""
 }
+# Reverse lookup of VCS Providers by ot-* token, the first Provider listed wins
+TFE_SOURCE_VCS_TYPES = {oauth_token_id: vcs_type for vcs_type, oauth_token_id in reversed(list(TFE_SOURCE_VCS.items()))}
 # Source of module repositories if not specified by API response
 TFE_SOURCE_DEFAULT_MODULE_VCS_PROVIDER = "devops"
 
@@ -60,6 +72,105 @@ IGNORED_VARIABLE_KEYS = []
 # Workspace Var Key Pairs that will need to be overwritten due to sensitivity
 OVERWRITE_VARIABLE_KEY_PAIRS = {}
 
+# Number of Workspaces processed concurrently by parallel migration steps
+MIGRATION_MAX_WORKERS = int(os.getenv("MIGRATION_MAX_WORKERS", "8"))
+# Maximum number of concurrent in-flight requests against a single host
+MIGRATION_MAX_HOST_CONNECTIONS = int(os.getenv("MIGRATION_MAX_HOST_CONNECTIONS", "4"))
+
+# State files larger than this many bytes are spooled to a temporary file instead of memory
+STATE_SPOOL_MAX_BYTES = int(os.getenv("STATE_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+# Read size for streaming state downloads; must stay a multiple of 3 for chunked base64 encoding
+STATE_CHUNK_BYTES = 3 * 256 * 1024
+
+# Keep-alive connections pooled per host for state blob downloads and uploads
+STATE_BLOB_POOL_SIZE = int(os.getenv("STATE_BLOB_POOL_SIZE", "10"))
+# Request gzip transfer encoding for state blob downloads
+STATE_BLOB_GZIP = os.getenv("STATE_BLOB_GZIP", "true").lower() in ("true", "1", "yes")
+
+# Newest missing state versions migrated per Workspace by [--migrate-state-history]
+STATE_HISTORY_MAX_VERSIONS = int(os.getenv("STATE_HISTORY_MAX_VERSIONS", "100"))
+# Only state versions created within this many days are migrated by [--migrate-state-history]; 0 disables the limit
+STATE_HISTORY_MAX_AGE_DAYS = int(os.getenv("STATE_HISTORY_MAX_AGE_DAYS", "0"))
+# Concurrent state version downloads per Workspace by [--migrate-state-history]
+STATE_HISTORY_DOWNLOAD_WORKERS = int(os.getenv("STATE_HISTORY_DOWNLOAD_WORKERS", "4"))
+
+# Directory of the local state blob cache; unset disables caching
+STATE_CACHE_DIR = os.getenv("STATE_CACHE_DIR", "")
+# Compressed bytes kept in the state blob cache before least recently used blobs are evicted
+STATE_CACHE_MAX_BYTES = int(os.getenv("STATE_CACHE_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+
+# Re-attempts of a Workspace create rejected with Bad Request, and the delay before each. Other Workspaces keep being created meanwhile.
+WORKSPACE_CREATE_RETRIES = int(os.getenv("WORKSPACE_CREATE_RETRIES", "5"))
+WORKSPACE_CREATE_RETRY_SECONDS = float(os.getenv("WORKSPACE_CREATE_RETRY_SECONDS", "30"))
+
+# Items per page of JSON:API listings, the maximum the API allows
+LIST_PAGE_SIZE = 100
+
+# Invitation errors worth retrying in a later run, anything else is a permanent rejection. requests' RequestException is added on use.
+RETRYABLE_INVITE_EXCEPTIONS = (TFCHTTPAPIRequestRateLimit, TFCHTTPInternalServerError, ConnectionError, TimeoutError)
+
+# Arguments whose phases read from the Source or write to the Target; clients are only built when one is selected
+SOURCE_CLIENT_ARGUMENTS = ("migrate_teams", "migrate_workspaces", "create_workspace_vars_csv", "migrate_registry_modules", \
+    "migrate_current_state", "migrate_state_history", "prestage_state", "pipeline", "plan_file_path", "apply_plan_file_path", "sync_state_file_path")
+TARGET_CLIENT_ARGUMENTS = ("migrate_teams", "migrate_workspaces", "create_workspace_vars", "delete_workspace_vars", "migrate_registry_modules", \
+    "update_workspace_execution", "update_workspace_varsets", "migrate_current_state", "migrate_state_history", "pipeline", \
+    "plan_file_path", "apply_plan_file_path")
+
+# Phases a migration plan does not cover, rejected together with [--plan] and [--apply-plan]
+UNPLANNED_ARGUMENTS = ("migrate_state_history", "prestage_state", "create_workspace_vars_csv", "pipeline")
+
+# Order in which [--apply-plan] executes the phases of a migration plan
+PLAN_PHASES = ("teams", "org-memberships", "registry-modules", "workspaces", "team-access", \
+    "workspace-variables", "execution-mode", "varsets", "current-state")
+
+# Upper bounds in seconds of the request latency histogram buckets
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Variable attributes compared by [--sync-since] to detect changed Workspace Variables
+SYNC_VARIABLE_ATTRIBUTES = ("key", "value", "description", "category", "hcl", "sensitive")
+
+# Seconds between progress reports with rate and ETA for long running phases
+PROGRESS_LOG_SECONDS = int(os.getenv("PROGRESS_LOG_SECONDS", "30"))
+
+# Task types scheduled by the workspace pipeline, each with its own worker pool
+PIPELINE_TASK_TYPES = ("workspace", "team-access", "variables", "execution-mode", "varsets", "state")
+
+# Terrasnek exceptions raised for HTTP status codes returned by raw requests
+TFC_HTTP_EXCEPTIONS = {
+    400: TFCHTTPBadRequest,
+    401: TFCHTTPUnauthorized,
+    403: TFCHTTPForbidden,
+    404: TFCHTTPNotFound,
+    409: TFCHTTPConflict,
+    412: TFCHTTPPreconditionFailed,
+    422: TFCHTTPUnprocessableEntity,
+    429: TFCHTTPAPIRequestRateLimit,
+    500: TFCHTTPInternalServerError
+}
+
+# Seconds an on-disk inventory snapshot stays valid when [--inventory-cache-dir] is set
+INVENTORY_CACHE_TTL_SECONDS = int(os.getenv("INVENTORY_CACHE_TTL_SECONDS", "3600"))
+
+# Requests per second allowed against a single host. TFC enforces 30 requests per second per token.
+MIGRATION_REQUESTS_PER_SECOND = float(os.getenv("MIGRATION_REQUESTS_PER_SECOND", "25"))
+# Attempts for rate limited or transiently failing requests before giving up
+MIGRATION_MAX_RETRIES = int(os.getenv("MIGRATION_MAX_RETRIES", "6"))
+# Base and maximum delay in seconds for jittered exponential backoff
+MIGRATION_RETRY_BASE_SECONDS = float(os.getenv("MIGRATION_RETRY_BASE_SECONDS", "1"))
+MIGRATION_RETRY_MAX_SECONDS = float(os.getenv("MIGRATION_RETRY_MAX_SECONDS", "60"))
+# Consecutive transient failures that open a host's circuit breaker, and seconds it stays open
+MIGRATION_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("MIGRATION_CIRCUIT_BREAKER_THRESHOLD", "10"))
+MIGRATION_CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("MIGRATION_CIRCUIT_BREAKER_COOLDOWN", "60"))
+
+# Terrasnek endpoint methods that are safe to repeat after a server error or dropped connection
+IDEMPOTENT_METHOD_PREFIXES = ("list", "show", "get", "update", "destroy", "lock", "unlock", "force_unlock", "apply_varset")
+
+def parse_task_concurrency(value):
+    task_type, _, workers = value.partition("=")
+    if task_type not in PIPELINE_TASK_TYPES or not workers.isdigit() or int(workers) < 1:
+        raise argparse.ArgumentTypeError(f"Expected TASK=WORKERS with TASK one of: {', '.join(PIPELINE_TASK_TYPES)}.")
+    return task_type, int(workers)
+
 def parse_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument('--debug', dest="debug", action="store_true", \
@@ -75,7 +186,7 @@ def parse_arguments():
 
     # Filepath for Workspace Variables
     parser.add_argument('--var-file-path', dest="var_file_path", default="./variables.csv", \
-        help="Path to the Workspace Variables JSON file. Defaults to `./variables.csv`.")
+        help="Path to the Workspace Variables CSV, or JSONL if it ends in `.jsonl`. Defaults to `./variables.csv`.")
     
     # Migrate Workspace Variables
     parser.add_argument('--create-workspace-vars', dest="create_workspace_vars", action="store_true", \
@@ -84,10 +195,12 @@ def parse_arguments():
     # Delete Workspace Variables
     parser.add_argument('--delete-workspace-vars', dest="delete_workspace_vars", action="store_true", \
         help="Delete all Workspace Variables from TFC Target")
+    parser.add_argument('--delete-workspace-vars-identifier', dest="delete_workspace_vars_identifier", default=None, \
+        help="Only delete Workspace Variables of Target Workspaces whose name contains this identifier. [--delete-workspace-vars]")
 
     # Output Filepath for Source Workspace Variables
     parser.add_argument('--output-file-path', dest="output_file_path", default="./variables.csv", \
-        help="Target path for CSV output. Defaults to `./variables.csv`.")
+        help="Target path for CSV output, or JSONL if it ends in `.jsonl`. Defaults to `./variables.csv`.")
 
     # Create *.csv file for Source Workspace Variables
     parser.add_argument('--create-workspace-vars-csv', dest="create_workspace_vars_csv", action="store_true", \
@@ -113,361 +226,2510 @@ def parse_arguments():
     parser.add_argument('--migrate-current-state', dest="migrate_current_state", action="store_true", \
         help="Add Source Current State Version to Target Workspaces")
 
+    # Migrate State history
+    parser.add_argument('--migrate-state-history', dest="migrate_state_history", action="store_true", \
+        help="Add all missing Source State Versions to Target Workspaces, oldest first")
+
+    # Cap on State Versions per Workspace
+    parser.add_argument('--state-history-max-versions', dest="state_history_max_versions", type=int, default=STATE_HISTORY_MAX_VERSIONS, \
+        help=f"Newest missing State Versions migrated per Workspace. Defaults to `{STATE_HISTORY_MAX_VERSIONS}`.")
+
+    # Cap on State Version age
+    parser.add_argument('--state-history-max-age-days', dest="state_history_max_age_days", type=int, default=STATE_HISTORY_MAX_AGE_DAYS, \
+        help="Only migrate State Versions created within this many days. Defaults to no limit.")
+
+    # Write a migration plan instead of migrating
+    parser.add_argument('--plan', dest="plan_file_path", \
+        help="Write the changes the selected phases would make to this JSON file without changing the Target. [--delete-workspace-vars], " \
+            "[--migrate-state-history], [--prestage-state], [--create-workspace-vars-csv] and [--pipeline] can not be planned.")
+
+    # Apply a migration plan
+    parser.add_argument('--apply-plan', dest="apply_plan_file_path", \
+        help="Apply the changes recorded in this JSON file by [--plan] without re-discovering the Source or Target")
+
+    # Metrics JSON report
+    parser.add_argument('--metrics-file-path', dest="metrics_file_path", \
+        help="Write request, transfer and phase timing metrics of the run to this JSON file")
+
+    # Metrics Prometheus textfile
+    parser.add_argument('--prometheus-file-path', dest="prometheus_file_path", \
+        help="Write the run metrics in Prometheus text format to this file, e.g. for the node_exporter textfile collector")
+
+    # Incremental sync since the previous run
+    parser.add_argument('--sync-since', dest="sync_state_file_path", \
+        help="Path to a JSON file of high-water marks from the previous sync. Only Source Workspaces whose settings, current state " \
+            "version or variables changed since then are migrated. Changed settings update existing Target Workspaces [--migrate-workspaces] " \
+            "and re-check their team access [--migrate-teams], a newer current state is uploaded [--migrate-current-state] and changed " \
+            "variables update existing Target variables [--create-workspace-vars], which requires re-exporting them in the same run " \
+            "[--create-workspace-vars-csv] with [--output-file-path] equal to [--var-file-path]. Marks only advance for changes whose " \
+            "phase ran without failures. Requires [--journal-file-path]."
+    )
+
+    # Pipeline per Workspace tasks
+    parser.add_argument('--pipeline', dest="pipeline", action="store_true", \
+        help="Run the selected Workspace phases per Workspace as soon as the Workspace exists on the Target, instead of phase by phase")
+
+    # Pipeline concurrency per task type
+    parser.add_argument('--task-concurrency', dest="task_concurrency", type=parse_task_concurrency, action="append", default=[], \
+        help=f"Workers for a [--pipeline] task type as TASK=WORKERS, repeatable. TASK is one of: {', '.join(PIPELINE_TASK_TYPES)}. Defaults to [--max-workers].")
+
+    # Local State cache directory
+    parser.add_argument('--state-cache-dir', dest="state_cache_dir", default=STATE_CACHE_DIR, \
+        help="Directory to cache downloaded Source State files between runs. Disabled by default.")
+
+    # Local State cache size
+    parser.add_argument('--state-cache-max-bytes', dest="state_cache_max_bytes", type=int, default=STATE_CACHE_MAX_BYTES, \
+        help=f"Maximum compressed size of the State cache. Defaults to `{STATE_CACHE_MAX_BYTES}`.")
+
+    # Pre-stage State files into the local cache
+    parser.add_argument('--prestage-state', dest="prestage_state", action="store_true", \
+        help="Download Source Current State Versions into [--state-cache-dir] without migrating them")
+
     # Migrate Registry Modules
     parser.add_argument('--migrate-registry-modules', dest="migrate_registry_modules", action="store_true", \
         help="Migrate Registry Module and version into TFC Target")
 
+    # Journal of completed work for resuming interrupted runs
+    parser.add_argument('--journal-file-path', dest="journal_file_path", default=None, \
+        help="Path to a JSONL journal of completed work. Completed units, and org invitations the Target rejected, are skipped when the script is re-executed. Disabled by default.")
+
+    # Directory for cached Organization inventory snapshots
+    parser.add_argument('--inventory-cache-dir', dest="inventory_cache_dir", default=None, \
+        help="Directory to save Source/Target inventory snapshots for repeated runs. Disabled by default.")
+
+    # Inventory snapshot time to live
+    parser.add_argument('--inventory-cache-ttl', dest="inventory_cache_ttl", type=int, default=INVENTORY_CACHE_TTL_SECONDS, \
+        help=f"Seconds a cached inventory snapshot remains valid. Defaults to `{INVENTORY_CACHE_TTL_SECONDS}`.")
+
+    # Concurrency for parallel migration steps
+    parser.add_argument('--max-workers', dest="max_workers", type=int, default=MIGRATION_MAX_WORKERS, \
+        help=f"Number of Workspaces migrated concurrently. Defaults to `{MIGRATION_MAX_WORKERS}`.")
+
+    # Concurrency limit per host
+    parser.add_argument('--max-host-connections', dest="max_host_connections", type=int, default=MIGRATION_MAX_HOST_CONNECTIONS, \
+        help=f"Maximum concurrent requests against a single TFE/TFC host. Defaults to `{MIGRATION_MAX_HOST_CONNECTIONS}`.")
+
+    # Connection pool size for state blob transfers
+    parser.add_argument('--blob-pool-size', dest="blob_pool_size", type=int, default=STATE_BLOB_POOL_SIZE, \
+        help=f"Keep-alive connections pooled per host for state downloads and uploads. Defaults to `{STATE_BLOB_POOL_SIZE}`.")
+
+    # Disable gzip for state blob downloads
+    parser.add_argument('--disable-blob-gzip', dest="blob_gzip", action="store_false", default=STATE_BLOB_GZIP, \
+        help="Do not request gzip transfer encoding for state downloads.")
+
+    # Rate limit per host
+    parser.add_argument('--requests-per-second', dest="requests_per_second", type=float, default=MIGRATION_REQUESTS_PER_SECOND, \
+        help=f"Maximum requests per second against a single TFE/TFC host. Defaults to `{MIGRATION_REQUESTS_PER_SECOND}`.")
+
     args = parser.parse_args()
 
     return args
 
-def create_source_variable_spreadsheet(source, filepath):
-    workspaces = source.workspaces.list_all()['data']
-    data = []
-    for workspace in workspaces:
-        logging.info(f"Acquring data for workspace: {workspace['attributes']['name']}...")
-        workspace_vars = source.workspace_vars.list(workspace['id'])['data']
-        for workspace_var in workspace_vars:
-            logging.info(f"Reading information for variable: {workspace_var['attributes']['key']}...")
-            if workspace_var['attributes']['key'] not in IGNORED_VARIABLE_KEYS:
-                variable = {
-                    "workspace_name": workspace['attributes']['name'],
-                    "workspace_id": workspace['id'],
-                    "variable_id": workspace_var['id'],
-                    "variable_key": workspace_var['attributes']['key'],
-                    "variable_value": workspace_var['attributes']['value'],
-                    "variable_description": workspace_var['attributes']['description'],
-                    "variable_category": workspace_var['attributes']['category'],
-                    "variable_hcl": workspace_var['attributes']['hcl'],
-                    "variable_sensitive": workspace_var['attributes']['sensitive']
-                }
-                if workspace_var['attributes']['key'] in OVERWRITE_VARIABLE_KEY_PAIRS:
-                    variable['variable_value'] = OVERWRITE_VARIABLE_KEY_PAIRS[workspace_var['attributes']['key']]
-                data.append(variable)
-
-    PD.DataFrame(data).to_csv(filepath, index=False)
-
-def deploy_target_workspace_variables(target, filepath):
-    data = PD.read_csv(filepath).to_dict('records')
-    total = len(data)
-    for sensitive_variable in data:
-        logging.info(f"({data.index(sensitive_variable) + 1}/{total}): Adding Workspace Variable '{sensitive_variable['variable_key']}' for workspace: {sensitive_variable['workspace_name']}...")
-
-        workspace_variables = target.vars.list(sensitive_variable['workspace_name'])['data']
-        workspace_variable_exists = False
-        for workspace_variable in workspace_variables:
-            if workspace_variable['attributes']['key'] == sensitive_variable['variable_key']:
-                workspace_variable_exists = True
-                break
-        if workspace_variable_exists:
-            logging.info(f"Workspace Variable '{sensitive_variable['variable_key']}' already exists for workspace: {sensitive_variable['workspace_name']}, skipped.")
-            continue
+def validate_arguments(args):
+    # Checked before any client is built, so a bad invocation fails without network calls
+    if args.update_workspace_execution:
+        if not args.execution_mode:
+            logging.error(f"'Missing Workspace Execution Mode Parameter. [--execution-mode]")
+            exit()
+        if not args.workspace_identifier:
+            logging.error(f"'Missing Workspace Identifier Parameter. [--workspace-identifier]")
+            exit()
+    if args.create_workspace_vars_csv and not args.output_file_path:
+        logging.error(f"'Missing file path for Workspace Variables Parameter. [--output-file-path]")
+        exit()
+    if args.prestage_state and not args.state_cache_dir:
+        logging.error(f"'Missing State cache directory Parameter. [--state-cache-dir]")
+        exit()
+    if args.delete_workspace_vars and (args.plan_file_path or args.apply_plan_file_path):
+        logging.error(f"'Workspace Variable deletion can not be planned. Run [--delete-workspace-vars] without [--plan] or [--apply-plan].")
+        exit()
+    unplanned = [f"[--{argument.replace('_', '-')}]" for argument in UNPLANNED_ARGUMENTS if getattr(args, argument)]
+    if unplanned and (args.plan_file_path or args.apply_plan_file_path):
+        logging.error(f"'{' '.join(unplanned)} can not be planned. Run them without [--plan] or [--apply-plan].")
+        exit()
+    if args.sync_state_file_path and not args.journal_file_path:
+        logging.error(f"'Missing Journal file path Parameter required to sync. [--journal-file-path]")
+        exit()
 
-        workspace_id = target.workspaces.show(sensitive_variable['workspace_name'])['data']['id']
-        attributes =  {
-            "key" :sensitive_variable['variable_key'],
-            "category": sensitive_variable['variable_category'],
-            "hcl": sensitive_variable['variable_hcl'],
-            "sensitive": False
-        }
-        if "variable_value" in sensitive_variable:
-            if isinstance(sensitive_variable['variable_value'], str):
-                attributes['value'] = sensitive_variable['variable_value']
-        if "variable_description" in sensitive_variable:
-            if isinstance(sensitive_variable['variable_description'], str):
-                attributes['description'] = sensitive_variable['variable_description']
-        if "password" in sensitive_variable['variable_key'].lower() or "pass" in sensitive_variable['variable_key'].lower():
-            attributes["sensitive"] = True
-            
-        payload = {
-            "data": {
-                "type": "vars",
-                "attributes": attributes
-            }
-        }
+# requests and the terrasnek API, which imports every endpoint, are imported on first use to keep CLI startup fast
+def requests_exceptions():
+    from requests import exceptions
+    return exceptions
+
+def build_client(token, url, verify, org, log_level):
+    from terrasnek import endpoint
+    from terrasnek.api import TFC
+    # Terrasnek calls the module level requests functions, send them through the shared API session instead
+    endpoint.requests = api_session()
+    client = ScheduledClient(TFC(token, url=url, verify=verify, log_level=log_level))
+    client.set_org(org)
+    return client
+
+def retry_after_seconds(headers):
+    if headers is None:
+        return None
+    retry_after = headers.get("Retry-After")
+    if retry_after:
         try:
-            target.workspace_vars.create(workspace_id, payload)
-        except TFCHTTPInternalServerError as error:
-            logging.error(f"Status Code: {error.args[0]['errors'][0]['status']} | {error.args[0]['errors'][0]['title']}")
-            continue
-    logging.info(f"All Workspace Variables Successfully Created")
-
-def nuke_target_workspace_variables(target):
-    confirmation = input(f"Are you sure you want to delete all Workspace Variables for {target.account.get_current_org()} ORG at URL '{target._instance_url}'? [Y/N]:")
-    if confirmation.lower() == 'y':
-        logging.info("Deleting workspace variables...")
-        target_variables = target.vars.list()["data"]
-        total = len(target_variables)
-        if target_variables:
-            for target_variable in target_variables:
-                target_variable_id = target_variable['id']
-                target_workspace_id = target_variable['relationships']['configurable']['data']['id']
-                target.workspace_vars.destroy(target_workspace_id, target_variable_id)
-                logging.info(f"({target_variables.index(target_variable) + 1}/{total}): Workspace variable {target_variable['attributes']['key']}, from workspace {target_workspace_id}, deleted.")
-        logging.info("Workspace variables deleted.")
-
-def set_target_workspace_execution_mode(target, mode, name_identifier):
-    logging.info(f"Updating {name_identifier} Workspaces' Execution Mode...")
-    if mode == 'agent' and target._hostname != 'app.terraform.io':
-        logging.warning(f"Execution Mode '{mode}' is not available for non TFC Workspaces.")
-    else:
-        if mode == 'agent':
-            agent_pools = target.agents.list_pools()['data']
-            agent_pool_id = None
-            for agent_pool in agent_pools:
-                if name_identifier in agent_pool['attributes']['name'].lower():
-                    agent_pool_id = agent_pool['id']
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    rate_limit_reset = headers.get("X-RateLimit-Reset")
+    if rate_limit_reset:
+        try:
+            return max(0.0, float(rate_limit_reset))
+        except ValueError:
+            pass
+    return None
+
+# Token bucket that halves its rate on every 429 and slowly recovers on success
+class AdaptiveTokenBucket:
+    def __init__(self, rate):
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = max(1.0, rate)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        with self._lock:
+            self.rate = max(1.0, self.rate / 2)
+            self.tokens = 0.0
+
+    def recover(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+# Pauses all requests to a host for a cooldown after repeated consecutive transient failures
+class CircuitBreaker:
+    def __init__(self, host, threshold, cooldown):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            remaining = self.open_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.failures = 0
+                self.open_until = time.monotonic() + self.cooldown
+                logging.warning(f"Circuit breaker for '{self.host}' opened after {self.threshold} consecutive failures, pausing requests for {self.cooldown:.0f}s.")
+
+# Request latency, retries, scheduler wait, transferred bytes and phase wall time of a run
+class MigrationMetrics:
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._requests = {}
+        self._waits = {}
+        self._bytes = {}
+        self._counters = {}
+        self._phases = {}
+        self._tasks = {}
+        self._workspace_locks = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, host, operation, seconds, error=False):
+        with self._lock:
+            request = self._requests.setdefault((host, operation), \
+                {"count": 0, "errors": 0, "retries": 0, "seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * len(self.buckets)})
+            request["count"] += 1
+            request["errors"] += int(error)
+            request["seconds"] += seconds
+            request["max_seconds"] = max(request["max_seconds"], seconds)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    request["buckets"][index] += 1
                     break
-            if not agent_pool_id:
-                logging.error(f"Could not find correct Agent Pool to assign to Workspaces.")
-                exit()
-        workspaces = target.workspaces.list_all()['data']
-        total = len(workspaces)
-        if workspaces:
-            for workspace in workspaces:
-                logging.info(f"({workspaces.index(workspace) + 1}/{total}): Updating Workspace {workspace['attributes']['name']} execution mode to '{mode}'...")
-                workspace_name = workspace['attributes']['name']
-                if name_identifier in workspace_name.lower():
-                    payload = {
-                        "data": {
-                            "attributes": {
-                                "execution-mode": mode
-                            },
-                        },
-                            "type": "workspaces"
-                    }
 
-                    if mode == 'agent':
-                        payload['data']['attributes']['agent-pool-id'] = agent_pool_id
+    def record_retry(self, host, operation):
+        with self._lock:
+            self._requests[(host, operation)]["retries"] += 1
 
-                    target.workspaces.update(payload, workspace_name)
-                else:
-                    logging.info(f"(Workspace {workspace['attributes']['name']} does not match identifier '{name_identifier}', skipped.'")
-        logging.info("Workspaces' Execution Mode Updated.")
+    def record_wait(self, host, seconds):
+        with self._lock:
+            self._waits[host] = self._waits.get(host, 0.0) + seconds
 
-def migrate_workspaces(source, target):
-    logging.info(f"Migrating Source Workspaces...")
-    source_workspaces = source.workspaces.list_all()['data']
-    total = len(source_workspaces)
-    for source_workspace in source_workspaces:
-        source_workspace_name = source_workspace['attributes']['name']
+    def record_bytes(self, host, direction, count):
+        with self._lock:
+            self._bytes[(host, direction)] = self._bytes.get((host, direction), 0) + count
 
-        try:
-            source_workspace_vcs_id = source_workspace['attributes']['vcs-repo']['oauth-token-id']
-            if source_workspace_vcs_id in TFE_SOURCE_VCS.values():
-                source_workspace_vcs_type = list(TFE_SOURCE_VCS.keys())[list(TFE_SOURCE_VCS.values()).index(source_workspace_vcs_id)]  
-            else:
-                logger.error("Could not find VCS Identifier in hardcoded list of VCS Providers Dict.")
-                exit()
-        except:
-            logging.debug(f"Workspace {source_workspace_name} is not connected to a VCS provider")
-            source_workspace_vcs_type = None
+    def record_workspace_lock(self, workspace, seconds):
+        with self._lock:
+            lock = self._workspace_locks.setdefault(workspace, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            lock["count"] += 1
+            lock["seconds"] += seconds
+            lock["max_seconds"] = max(lock["max_seconds"], seconds)
 
+    def increment(self, name, count=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+
+    @contextmanager
+    def _timed(self, durations, name):
+        started = time.monotonic()
         try:
-            target.workspaces.show(source_workspace_name)
-            logging.info(f"({source_workspaces.index(source_workspace) + 1}/{total}): Workspace {source_workspace_name} already exists on target.")
-        except TFCHTTPNotFound as not_found:
-            logging.info(f"({source_workspaces.index(source_workspace) + 1}/{total}): Creating Workspace {source_workspace_name} on TFC Target...")
-            new_workspace_payload = {
-                "data": {
-                    "attributes": {
-                        "name": source_workspace_name,
-                        "terraform_version": source_workspace["attributes"]["terraform-version"],
-                        "working-directory": source_workspace["attributes"]["working-directory"],
-                        "file-triggers-enabled": \
-                            source_workspace["attributes"]["file-triggers-enabled"],
-                        "allow-destroy-plan": source_workspace["attributes"]["allow-destroy-plan"],
-                        "auto-apply": source_workspace["attributes"]["auto-apply"],
-                        "execution-mode": source_workspace["attributes"]["execution-mode"],
-                        "description": source_workspace["attributes"]["description"],
-                        "source-name": source_workspace["attributes"]["source-name"],
-                        "source-url": source_workspace["attributes"]["source-url"],
-                        "queue-all-runs": source_workspace["attributes"]["queue-all-runs"],
-                        "speculative-enabled": \
-                            source_workspace["attributes"]["speculative-enabled"],
-                        "trigger-prefixes": source_workspace["attributes"]["trigger-prefixes"],
-                    },
-                    "type": "workspaces"
+            yield
+        finally:
+            with self._lock:
+                duration = durations.setdefault(name, {"runs": 0, "seconds": 0.0})
+                duration["runs"] += 1
+                duration["seconds"] += time.monotonic() - started
+
+    def phase(self, name):
+        return self._timed(self._phases, name)
+
+    def task(self, name):
+        # Workspace tasks run concurrently, so their summed seconds exceed the wall time of the phase running them
+        return self._timed(self._tasks, name)
+
+    def report(self):
+        with self._lock:
+            requests = {}
+            for (host, operation), request in self._requests.items():
+                # Buckets are reported cumulatively, as in Prometheus
+                cumulative, total = {}, 0
+                for bound, count in zip(self.buckets, request["buckets"]):
+                    total += count
+                    cumulative[str(bound)] = total
+                requests.setdefault(host, {})[operation] = {**request, "buckets": cumulative}
+            transferred = {}
+            for (host, direction), count in self._bytes.items():
+                transferred.setdefault(host, {})[direction] = count
+            return {
+                "started-at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "seconds": time.time() - self.started,
+                "phases": dict(self._phases),
+                "tasks": dict(self._tasks),
+                "requests": requests,
+                "wait_seconds": dict(self._waits),
+                "bytes": transferred,
+                "workspace_locks": {workspace: dict(lock) for workspace, lock in self._workspace_locks.items()},
+                "counters": dict(self._counters)
+            }
+
+    def log_summary(self):
+        report = self.report()
+        for name, phase in report["phases"].items():
+            logging.info(f"Phase {name}: {phase['seconds']:.1f}s over {phase['runs']} runs.")
+        for name, task in report["tasks"].items():
+            logging.info(f"Task {name}: {task['seconds']:.1f}s summed over {task['runs']} concurrent runs.")
+        for host, operations in report["requests"].items():
+            count = sum(request["count"] for request in operations.values())
+            seconds = sum(request["seconds"] for request in operations.values())
+            retries = sum(request["retries"] for request in operations.values())
+            logging.info(f"Host '{host}': {count} requests, {seconds:.1f}s in requests, {report['wait_seconds'].get(host, 0.0):.1f}s waiting " \
+                f"for the scheduler, {retries} retries, {sum(report['bytes'].get(host, {}).values())} state bytes transferred.")
+            slowest = sorted(operations.items(), key=lambda item: item[1]["seconds"], reverse=True)[:3]
+            logging.info(f"Host '{host}' slowest operations: " + ", ".join(f"{operation} {request['seconds']:.1f}s/{request['count']}" \
+                for operation, request in slowest))
+        if report["workspace_locks"]:
+            locks = report["workspace_locks"]
+            longest = sorted(locks.items(), key=lambda item: item[1]["max_seconds"], reverse=True)[:3]
+            logging.info(f"Target Workspace locks: {sum(lock['count'] for lock in locks.values())} held for {sum(lock['seconds'] for lock in locks.values()):.1f}s " \
+                f"in total, longest: " + ", ".join(f"{workspace} {lock['max_seconds']:.2f}s" for workspace, lock in longest))
+
+    def write_json(self, filepath):
+        with open(filepath, "w", encoding="utf-8") as metrics_file:
+            json.dump(self.report(), metrics_file, indent=2)
+        logging.info(f"Metrics written to '{filepath}'.")
+
+    def write_prometheus(self, filepath):
+        report = self.report()
+
+        def labels(**values):
+            escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"') for name, value in values.items()}
+            return "{" + ",".join(f'{name}="{value}"' for name, value in escaped.items()) + "}"
+
+        lines = [
+            "# HELP tfe_migration_request_duration_seconds Latency of API and state blob requests.",
+            "# TYPE tfe_migration_request_duration_seconds histogram"
+        ]
+        for host, operations in report["requests"].items():
+            for operation, request in operations.items():
+                for bound, count in request["buckets"].items():
+                    lines.append(f"tfe_migration_request_duration_seconds_bucket{labels(host=host, operation=operation, le=bound)} {count}")
+                lines.append(f"tfe_migration_request_duration_seconds_bucket{labels(host=host, operation=operation, le='+Inf')} {request['count']}")
+                lines.append(f"tfe_migration_request_duration_seconds_sum{labels(host=host, operation=operation)} {request['seconds']}")
+                lines.append(f"tfe_migration_request_duration_seconds_count{labels(host=host, operation=operation)} {request['count']}")
+        for name, help_text, field in (("errors", "Requests that raised an error.", "errors"), ("retries", "Requests retried by the scheduler.", "retries")):
+            lines += [f"# HELP tfe_migration_request_{name}_total {help_text}", f"# TYPE tfe_migration_request_{name}_total counter"]
+            for host, operations in report["requests"].items():
+                for operation, request in operations.items():
+                    lines.append(f"tfe_migration_request_{name}_total{labels(host=host, operation=operation)} {request[field]}")
+        lines += ["# HELP tfe_migration_scheduler_wait_seconds_total Time spent waiting for rate limits and connection slots.", \
+            "# TYPE tfe_migration_scheduler_wait_seconds_total counter"]
+        lines += [f"tfe_migration_scheduler_wait_seconds_total{labels(host=host)} {seconds}" for host, seconds in report["wait_seconds"].items()]
+        lines += ["# HELP tfe_migration_state_bytes_total State bytes transferred.", "# TYPE tfe_migration_state_bytes_total counter"]
+        for host, directions in report["bytes"].items():
+            lines += [f"tfe_migration_state_bytes_total{labels(host=host, direction=direction)} {count}" for direction, count in directions.items()]
+        lines += ["# HELP tfe_migration_workspace_lock_seconds_total Time Target Workspaces were locked for state uploads.", \
+            "# TYPE tfe_migration_workspace_lock_seconds_total counter"]
+        lines += [f"tfe_migration_workspace_lock_seconds_total{labels(workspace=workspace)} {lock['seconds']}" \
+            for workspace, lock in report["workspace_locks"].items()]
+        lines += ["# HELP tfe_migration_phase_duration_seconds Wall time of migration phases.", "# TYPE tfe_migration_phase_duration_seconds gauge"]
+        lines += [f"tfe_migration_phase_duration_seconds{labels(phase=name)} {phase['seconds']}" for name, phase in report["phases"].items()]
+        lines += ["# HELP tfe_migration_task_seconds_total Summed duration of Workspace task runs, which overlap when run concurrently.", \
+            "# TYPE tfe_migration_task_seconds_total counter"]
+        lines += [f"tfe_migration_task_seconds_total{labels(task=name)} {task['seconds']}" for name, task in report["tasks"].items()]
+        lines += ["# HELP tfe_migration_task_runs_total Workspace task runs.", "# TYPE tfe_migration_task_runs_total counter"]
+        lines += [f"tfe_migration_task_runs_total{labels(task=name)} {task['runs']}" for name, task in report["tasks"].items()]
+        lines += ["# HELP tfe_migration_events_total Migration events.", "# TYPE tfe_migration_events_total counter"]
+        lines += [f"tfe_migration_events_total{labels(event=name)} {count}" for name, count in report["counters"].items()]
+        lines += ["# HELP tfe_migration_last_run_seconds Duration of the migration run.", "# TYPE tfe_migration_last_run_seconds gauge", \
+            f"tfe_migration_last_run_seconds {report['seconds']}"]
+
+        # Written to a temporary file first so collectors never read a partial file
+        partial_path = f"{filepath}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write("\n".join(lines) + "\n")
+        os.replace(partial_path, filepath)
+        logging.info(f"Prometheus metrics written to '{filepath}'.")
+
+METRICS = MigrationMetrics()
+
+def timed_phase(name):
+    def decorator(function):
+        @wraps(function)
+        def timed(*args, **kwargs):
+            with METRICS.phase(name):
+                return function(*args, **kwargs)
+        return timed
+    return decorator
+
+# Central scheduler for every request to a TFE/TFC host: per-host concurrency, rate limiting,
+# retries with jittered exponential backoff honoring Retry-After, and a per-host circuit breaker
+class RequestScheduler:
+    def __init__(self, max_connections=MIGRATION_MAX_HOST_CONNECTIONS, requests_per_second=MIGRATION_REQUESTS_PER_SECOND, \
+            max_retries=MIGRATION_MAX_RETRIES):
+        self.configure(max_connections, requests_per_second, max_retries)
+
+    def configure(self, max_connections, requests_per_second, max_retries=MIGRATION_MAX_RETRIES):
+        self.max_connections = max_connections
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        # Accept either a full URL or a bare hostname
+        host = urlparse(url).netloc or url
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {
+                    "semaphore": threading.BoundedSemaphore(self.max_connections),
+                    "bucket": AdaptiveTokenBucket(self.requests_per_second),
+                    "circuit": CircuitBreaker(host, MIGRATION_CIRCUIT_BREAKER_THRESHOLD, MIGRATION_CIRCUIT_BREAKER_COOLDOWN)
                 }
+            return host, self._hosts[host]
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after + random.uniform(0, MIGRATION_RETRY_BASE_SECONDS)
+        return random.uniform(0, min(MIGRATION_RETRY_MAX_SECONDS, MIGRATION_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    def call(self, url, function, *args, retry_server_errors=False, operation=None, **kwargs):
+        host, limits = self._host(url)
+        operation = operation or function.__name__
+        attempt = 0
+        while True:
+            waited = time.monotonic()
+            limits["circuit"].wait()
+            limits["bucket"].acquire()
+            try:
+                with limits["semaphore"]:
+                    started = time.monotonic()
+                    METRICS.record_wait(host, started - waited)
+                    try:
+                        result = function(*args, **kwargs)
+                    except BaseException:
+                        METRICS.record_request(host, operation, time.monotonic() - started, error=True)
+                        raise
+                    METRICS.record_request(host, operation, time.monotonic() - started)
+            except (TFCHTTPAPIRequestRateLimit, requests_exceptions().HTTPError) as error:
+                response = getattr(error, "response", None)
+                status = response.status_code if response is not None else 429
+                if status != 429 and not (status >= 500 and retry_server_errors):
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                if status == 429:
+                    limits["bucket"].throttle()
+                    reason = "rate limited"
+                else:
+                    limits["circuit"].record_failure()
+                    reason = f"failed with status {status}"
+                delay = self._backoff(attempt, retry_after_seconds(response.headers if response is not None else None))
+            except (TFCHTTPInternalServerError, requests_exceptions().RequestException, ConnectionError, TimeoutError) as error:
+                if not retry_server_errors or attempt >= self.max_retries:
+                    raise
+                limits["circuit"].record_failure()
+                reason = f"failed ({error.__class__.__name__})"
+                delay = self._backoff(attempt)
+            else:
+                limits["circuit"].record_success()
+                limits["bucket"].recover()
+                return result
+
+            attempt += 1
+            METRICS.record_retry(host, operation)
+            logging.warning(f"Request to '{host}' {reason}, retry {attempt}/{self.max_retries} in {delay:.1f}s...")
+            time.sleep(delay)
+
+REQUEST_SCHEDULER = RequestScheduler()
+
+# Routes every endpoint method call of a terrasnek endpoint through the request scheduler
+class ScheduledEndpoint:
+    def __init__(self, endpoint, scheduler, host, name):
+        self._endpoint = endpoint
+        self._scheduler = scheduler
+        self._host = host
+        self._name = name
+
+    def __getattr__(self, name):
+        attribute = getattr(self._endpoint, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        retry_server_errors = name.startswith(IDEMPOTENT_METHOD_PREFIXES)
+
+        def scheduled(*args, **kwargs):
+            try:
+                return self._scheduler.call(self._host, attribute, *args, retry_server_errors=retry_server_errors, \
+                    operation=f"{self._name}.{name}", **kwargs)
+            except requests_exceptions().HTTPError as error:
+                raise tfc_http_error(error.response)
+        return scheduled
+
+# Wraps a terrasnek TFC client so source and target share one request scheduler
+class ScheduledClient:
+    def __init__(self, client, scheduler=REQUEST_SCHEDULER):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        from terrasnek.endpoint import TFCEndpoint
+        attribute = getattr(self._client, name)
+        if isinstance(attribute, TFCEndpoint):
+            return ScheduledEndpoint(attribute, self._scheduler, self._client.get_hostname(), name)
+        return attribute
+
+# Counts completed items of a phase, periodically logging the rate and ETA. Safe to step from worker threads.
+class Progress:
+    def __init__(self, description, total, log_interval=PROGRESS_LOG_SECONDS):
+        self.description = description
+        self.total = total
+        self.completed = 0
+        self.log_interval = log_interval
+        self.started = time.monotonic()
+        self._reported = self.started
+        self._lock = threading.Lock()
+
+    def step(self):
+        with self._lock:
+            self.completed += 1
+            completed = self.completed
+            now = time.monotonic()
+            report = now - self._reported >= self.log_interval and completed < self.total
+            if report:
+                self._reported = now
+        if report:
+            logging.info(self.status())
+        return f"({completed}/{self.total})"
+
+    def add(self, count):
+        # For phases that discover their items while running
+        with self._lock:
+            self.total += count
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def status(self):
+        rate = self.rate()
+        eta = f"{(self.total - self.completed) / rate:.0f}s" if rate else "unknown"
+        return f"{self.description}: {self.completed}/{self.total} completed, {rate:.1f}/s, ETA {eta}."
+
+    def finish(self):
+        logging.info(f"{self.description}: {self.completed}/{self.total} completed in {time.monotonic() - self.started:.1f}s, {self.rate():.1f}/s.")
+
+# Append-only JSONL record of completed units of work per phase, keyed by source ID
+class MigrationJournal:
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            line = ""
+            with open(path, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A partially written line from an interrupted run, ignore it
+                        continue
+                    self._entries[(entry["phase"], entry["key"])] = entry
+            if line and not line.endswith("\n"):
+                with open(path, "a", encoding="utf-8") as journal_file:
+                    journal_file.write("\n")
+            logging.info(f"Loaded {len(self._entries)} journal entries from '{path}'.")
+
+    def is_done(self, phase, key):
+        return self.status(phase, key) == "done"
+
+    def status(self, phase, key):
+        entry = self._entries.get((phase, key))
+        return entry["status"] if entry else None
+
+    def detail(self, phase, key):
+        entry = self._entries.get((phase, key))
+        return entry["detail"] if entry else None
+
+    def reopen(self, phase, workspace_ids):
+        # Done entries of the given Source Workspaces, keyed by the Workspace ID optionally followed by ':', are pending again
+        with self._lock:
+            keys = [key for (entry_phase, key), entry in self._entries.items() \
+                if entry_phase == phase and entry["status"] == "done" and str(key).split(":")[0] in workspace_ids]
+        for key in keys:
+            self.record(phase, key, status="pending")
+        return len(keys)
+
+    def failed_keys(self, since=0):
+        with self._lock:
+            return {entry["key"] for entry in self._entries.values() if entry["status"] == "failed" and entry["time"] >= since}
+
+    def record(self, phase, key, status="done", detail=None):
+        if not self.path:
+            return
+        entry = {"phase": phase, "key": key, "status": status, "detail": detail, "time": time.time()}
+        with self._lock:
+            self._entries[(phase, key)] = entry
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(json.dumps(entry) + "\n")
+
+def iter_pages(list_page, max_workers=MIGRATION_MAX_WORKERS, **kwargs):
+    # The first page gives meta.pagination.total-pages, the remaining pages are fetched concurrently and yielded in order
+    first_page = list_page(page=1, page_size=LIST_PAGE_SIZE, **kwargs)
+    yield from first_page['data']
+    total_pages = first_page.get('meta', {}).get('pagination', {}).get('total-pages') or 1
+    if total_pages < 2:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, total_pages - 1)) as executor:
+        pages = executor.map(lambda number: list_page(page=number, page_size=LIST_PAGE_SIZE, **kwargs), range(2, total_pages + 1))
+        for page in pages:
+            yield from page['data']
+
+def list_all_pages(list_page, max_workers=MIGRATION_MAX_WORKERS, **kwargs):
+    return list(iter_pages(list_page, max_workers, **kwargs))
+
+# Workspaces, teams, org memberships and registry modules of one Organization, listed once per run
+# and indexed by name and ID. Optionally persisted to disk so repeated runs can skip re-listing.
+class OrganizationInventory:
+    def __init__(self, client, cache_dir=None, ttl=INVENTORY_CACHE_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+        self.cache_path = None
+        self._collections = {}
+        self._fetched_at = {}
+        self._by_id = {}
+        self._by_name = {}
+        self._workspace_ids = None
+        self._lock = threading.RLock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.cache_path = os.path.join(cache_dir, f"{client.get_hostname()}-{client.get_org()}.json")
+            self._load()
+
+    def _fetch(self, collection):
+        if collection == "workspaces":
+            return list_all_pages(self.client.workspaces.list)
+        if collection == "teams":
+            return list_all_pages(self.client.teams.list)
+        if collection == "memberships":
+            return list_all_pages(self.client.org_memberships.list_for_org)
+        if collection == "modules":
+            return list_all_pages(self.client.registry_modules.list)
+        raise ValueError(f"Unknown inventory collection '{collection}'.")
+
+    @staticmethod
+    def _name(collection, item):
+        if collection == "memberships":
+            return item["attributes"]["email"]
+        if collection == "modules":
+            return registry_module_key(item)
+        return item["attributes"]["name"]
+
+    def _index(self, collection, items, fetched_at):
+        self._collections[collection] = items
+        self._fetched_at[collection] = fetched_at
+        self._by_id[collection] = {item["id"]: item for item in items}
+        self._by_name[collection] = {self._name(collection, item): item for item in items}
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, "r", encoding="utf-8") as cache_file:
+            snapshot = json.load(cache_file)
+        for collection, fetched_at in snapshot["fetched_at"].items():
+            if time.time() - fetched_at < self.ttl:
+                self._index(collection, snapshot["collections"][collection], fetched_at)
+                logging.info(f"Loaded {len(self._collections[collection])} {collection} for '{self.client.get_org()}' from inventory cache.")
+
+    def save(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            snapshot = {"fetched_at": self._fetched_at, "collections": self._collections}
+            with open(self.cache_path, "w", encoding="utf-8") as cache_file:
+                json.dump(snapshot, cache_file)
+
+    def collection(self, collection):
+        with self._lock:
+            if collection not in self._collections:
+                logging.info(f"Listing {collection} for Organization '{self.client.get_org()}'...")
+                self._index(collection, self._fetch(collection), time.time())
+            return self._collections[collection]
+
+    def find(self, collection, name=None, id=None):
+        with self._lock:
+            self.collection(collection)
+            if id is not None:
+                return self._by_id[collection].get(id)
+            return self._by_name[collection].get(name)
+
+    def add(self, collection, item):
+        with self._lock:
+            self.collection(collection)
+            existing = self._by_id[collection].get(item["id"])
+            if existing is not None:
+                self._collections[collection].remove(existing)
+            self._collections[collection].append(item)
+            self._by_id[collection][item["id"]] = item
+            self._by_name[collection][self._name(collection, item)] = item
+
+    def restrict_workspaces(self, workspace_ids):
+        # Phases iterate only these Workspaces; lookups by name or ID still see the whole Organization
+        self._workspace_ids = set(workspace_ids)
+
+    def workspaces(self):
+        workspaces = self.collection("workspaces")
+        if self._workspace_ids is None:
+            return workspaces
+        return [workspace for workspace in workspaces if workspace["id"] in self._workspace_ids]
+
+    def teams(self):
+        return self.collection("teams")
+
+    def memberships(self, status=None):
+        memberships = self.collection("memberships")
+        if status is None:
+            return memberships
+        return [membership for membership in memberships if membership["attributes"]["status"] == status]
+
+    def modules(self):
+        return self.collection("modules")
+
+    def workspace(self, name):
+        return self.find("workspaces", name=name)
+
+# High-water marks of the previous sync per Source Workspace: its updated-at, current state version ID and a hash of its variables
+class SyncState:
+    KINDS = ("workspaces", "state-versions", "variables")
+    # Journal phases whose completed entries are redone when a kind of change is detected. Current state
+    # versions need none, their journal keys include the Source state version.
+    REOPENED_PHASES = {"workspaces": ("workspaces", "team-access"), "variables": ("workspace-variables",)}
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.marks = {kind: {} for kind in self.KINDS}
+        self.changed = {kind: set() for kind in self.KINDS}
+        self._observed = None
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as sync_file:
+                snapshot = json.load(sync_file)
+            for kind in self.KINDS:
+                self.marks[kind].update(snapshot.get(kind, {}))
+            logging.info(f"Loaded sync marks of {len(self.marks['workspaces'])} Workspaces from '{path}', last synced at {snapshot.get('synced-at')}.")
+
+    @staticmethod
+    def variables_hash(variables):
+        digest = hashlib.sha256()
+        for variable in sorted(variables, key=lambda variable: (variable['attributes']['category'], variable['attributes']['key'])):
+            digest.update(json.dumps([variable['attributes'].get(attribute) for attribute in SYNC_VARIABLE_ATTRIBUTES]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def changed_workspace_ids(self, source, workspaces):
+        # Variables of the whole Organization are listed in one request rather than per Workspace
+        workspace_variables = {}
+        for variable in source.vars.list()['data']:
+            workspace_variables.setdefault(variable['relationships']['configurable']['data']['id'], []).append(variable)
+
+        self._observed = {kind: {} for kind in self.KINDS}
+        changed = {kind: set() for kind in self.KINDS}
+        for workspace in workspaces:
+            marks = {
+                "workspaces": workspace['attributes']['updated-at'],
+                "state-versions": current_state_version_id(workspace),
+                "variables": self.variables_hash(workspace_variables.get(workspace['id'], []))
             }
-            
-            if source_workspace_vcs_type is not None:
-                if source_workspace_vcs_type in TFC_TARGET_VCS:
-                    new_workspace_payload["data"]["attributes"]["vcs-repo"] = {
-                        "identifier": source_workspace["attributes"]['vcs-repo']['identifier'],
-                        "oauth-token-id": TFC_TARGET_VCS[source_workspace_vcs_type],
-                        "branch": source_workspace["attributes"]["vcs-repo"]["branch"],
-                        "default-branch": True if source_workspace["attributes"]["vcs-repo"]["branch"] == "" else False,
-                        "ingress-submodules": source_workspace["attributes"]["vcs-repo"]["ingress-submodules"]
-                    }
+            for kind, mark in marks.items():
+                self._observed[kind][workspace['id']] = mark
+                if workspace['id'] not in self.marks[kind] or self.marks[kind][workspace['id']] != mark:
+                    changed[kind].add(workspace['id'])
+
+        self.changed = changed
+        changed_ids = set().union(*changed.values())
+        logging.info(f"{len(changed_ids)}/{len(workspaces)} Source Workspaces changed since the last sync. Settings: {len(changed['workspaces'])}, " \
+            f"current state: {len(changed['state-versions'])}, variables: {len(changed['variables'])}.")
+        return changed_ids
+
+    def reopen(self, journal):
+        for kind, phases in self.REOPENED_PHASES.items():
+            for phase in phases:
+                reopened = journal.reopen(phase, self.changed[kind])
+                if reopened:
+                    logging.info(f"{reopened} '{phase}' journal entries of changed Workspaces reopened.")
+
+    def save(self, journal, applied_kinds=KINDS):
+        # Workspaces with failures in this run keep their previous marks so that the next sync retries them
+        failed_ids = {str(key).split(":")[0] for key in journal.failed_keys(self.started)} & set(self._observed["workspaces"])
+        # Kinds of change whose phase did not run keep every previous mark, so they are still seen as changed
+        marks = {kind: dict(observed if kind in applied_kinds else self.marks[kind]) for kind, observed in self._observed.items()}
+        for workspace_id in failed_ids:
+            for kind in self.KINDS:
+                if workspace_id in self.marks[kind]:
+                    marks[kind][workspace_id] = self.marks[kind][workspace_id]
                 else:
-                    logging.warning(f"VCS Type '{source_workspace_vcs_type}' in VCS library, skipped.")
+                    marks[kind].pop(workspace_id, None)
+
+        snapshot = dict(marks, **{"synced-at": datetime.fromtimestamp(self.started, timezone.utc).isoformat()})
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as sync_file:
+            json.dump(snapshot, sync_file)
+        os.replace(temporary_path, self.path)
+        self.marks = marks
+        logging.info(f"Sync marks of {len(self._observed['workspaces'])} Workspaces written to '{self.path}', " \
+            f"{len(failed_ids)} Workspaces with failures will be synced again.")
+        unapplied = [kind for kind in self.KINDS if kind not in applied_kinds and self.changed[kind]]
+        if unapplied:
+            logging.warning(f"Changes to {', '.join(unapplied)} were not applied by the selected phases and will be synced again.")
+
+# Shared keep-alive HTTP session for state blob transfers. TLS verification is configured once per session.
+class BlobSession:
+    def __init__(self, verify, pool_size=STATE_BLOB_POOL_SIZE, gzip=STATE_BLOB_GZIP):
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Unset verification disables it, a CA bundle path is used as-is, any other value verifies
+        if verify is False:
+            self.session.verify = False
+        elif isinstance(verify, str) and os.path.isfile(verify):
+            self.session.verify = verify
+        else:
+            self.session.verify = True
+        self.session.headers["Accept-Encoding"] = "gzip" if gzip else "identity"
+
+    def stats(self):
+        connections = 0
+        requests = 0
+        # The same adapter is mounted for both schemes
+        for adapter in {id(adapter): adapter for adapter in self.session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests += pool.num_requests
+        return {"requests": requests, "connections": connections, "reused": max(0, requests - connections)}
+
+# Keep-alive session for terrasnek's API requests. Rate limited and server error responses are raised as
+# HTTPError with the response attached, so the request scheduler can read the status and Retry-After header.
+class APISession:
+    def __init__(self, pool_size=MIGRATION_MAX_HOST_CONNECTIONS):
+        from requests import Session
+        self.session = Session()
+        self.configure(pool_size)
+        self.session.hooks["response"].append(self._raise_for_retryable_status)
+
+    def configure(self, pool_size):
+        # One pooled connection per request the scheduler lets run concurrently against a host
+        from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def _raise_for_retryable_status(response, *args, **kwargs):
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.session.put(url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.session.patch(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session.delete(url, **kwargs)
+
+API_SESSION = None
+API_SESSION_LOCK = threading.Lock()
+
+def api_session():
+    global API_SESSION
+    with API_SESSION_LOCK:
+        if API_SESSION is None:
+            API_SESSION = APISession(REQUEST_SCHEDULER.max_connections)
+        return API_SESSION
+
+def configure_api_session(pool_size):
+    with API_SESSION_LOCK:
+        if API_SESSION is not None:
+            API_SESSION.configure(pool_size)
+
+BLOB_SESSIONS = {}
+BLOB_SESSIONS_LOCK = threading.Lock()
+BLOB_SESSION_OPTIONS = {"pool_size": STATE_BLOB_POOL_SIZE, "gzip": STATE_BLOB_GZIP}
+
+def configure_blob_sessions(pool_size, gzip):
+    with BLOB_SESSIONS_LOCK:
+        BLOB_SESSION_OPTIONS.update({"pool_size": pool_size, "gzip": gzip})
+        BLOB_SESSIONS.clear()
+
+def blob_session(verify):
+    with BLOB_SESSIONS_LOCK:
+        if verify not in BLOB_SESSIONS:
+            BLOB_SESSIONS[verify] = BlobSession(verify, **BLOB_SESSION_OPTIONS)
+        return BLOB_SESSIONS[verify]
+
+def log_blob_session_stats():
+    for blob in list(BLOB_SESSIONS.values()):
+        stats = blob.stats()
+        if stats["requests"]:
+            logging.info(f"State blob connections: {stats['requests']} requests over {stats['connections']} connections, {stats['reused']} reused.")
+
+# File-like view of a spooled or streamed payload that reports its length, so it is sent with a Content-Length
+# instead of being read into memory or rolled over to disk
+class PayloadReader:
+    def __init__(self, payload_file, size):
+        self.payload_file = payload_file
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, amount=-1):
+        return self.payload_file.read(amount)
+
+# Incrementally scans a JSON state document for top-level scalar keys without parsing the whole file
+class StateHeaderScanner:
+    def __init__(self, keys=("serial", "lineage")):
+        self.wanted = set(keys)
+        self.values = {}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = bytearray()
+        self._last_key = None
+        self._capture = None
+        self._capture_key = None
+
+    @property
+    def complete(self):
+        return self.wanted.issubset(self.values)
+
+    def feed(self, chunk):
+        if self.complete:
+            return
+        for byte in chunk:
+            if self._in_string:
+                if self._capture is not None:
+                    self._capture.append(byte)
+                if self._escape:
+                    self._escape = False
+                elif byte == 0x5C: # backslash
+                    self._escape = True
+                elif byte == 0x22: # closing quote
+                    self._in_string = False
+                    if self._capture is None and self._depth == 1:
+                        self._last_key = json.loads(b'"' + self._string + b'"')
                     continue
+                if self._capture is None and self._depth == 1:
+                    self._string.append(byte)
+                continue
 
-            try:
-                target.workspaces.create(new_workspace_payload)
-                logging.info(f"Workspace {source_workspace_name} has been created.")
-            except TFCHTTPBadRequest as error: 
-                logging.error(f"Status Code: {error.args[0]['errors'][0]['status']} | {error.args[0]['errors'][0]['detail']}")
-                logging.debug(f"New Workspace Payload: {new_workspace_payload}")
-                for attempt in range(5):
-                    logging.warning(f"Failed to create Workspace '{source_workspace_name}'. Re-attempt in 30 Seconds...")
-                    time.sleep(30)
-                    logging.warning(f"Retry Attempt: {attempt + 1}/5 to Create Workspace '{source_workspace_name}'.")
+            if byte == 0x22: # opening quote
+                self._in_string = True
+                if self._capture is not None:
+                    self._capture.append(byte)
+                elif self._depth == 1:
+                    self._string = bytearray()
+                continue
+
+            if self._capture is not None and self._depth == 1 and byte in (0x2C, 0x7D): # ',' or '}'
+                self.values[self._capture_key] = json.loads(self._capture)
+                self._capture = None
+                if self.complete:
+                    return
+
+            if byte in (0x7B, 0x5B): # '{' or '['
+                self._depth += 1
+            elif byte in (0x7D, 0x5D): # '}' or ']'
+                self._depth -= 1
+            elif byte == 0x3A and self._depth == 1 and self._capture is None: # ':'
+                if self._last_key in self.wanted and self._last_key not in self.values:
+                    self._capture = bytearray()
+                    self._capture_key = self._last_key
+                continue
+
+            if self._capture is not None:
+                self._capture.append(byte)
+
+def stream_state_blob(url, verify):
+    scanner = StateHeaderScanner()
+    state_hash = hashlib.md5()
+    state_file = tempfile.SpooledTemporaryFile(max_size=STATE_SPOOL_MAX_BYTES)
+    size = 0
+
+    try:
+        with blob_session(verify).session.get(url, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(STATE_CHUNK_BYTES):
+                state_hash.update(chunk)
+                scanner.feed(chunk)
+                state_file.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        state_file.close()
+        raise
+
+    METRICS.record_bytes(urlparse(url).netloc, "download", size)
+    if not scanner.complete:
+        state_file.close()
+        raise ValueError(f"State file at '{urlparse(url).path}' is missing 'serial' and/or 'lineage'.")
+
+    state_file.seek(0)
+    return {
+        "file": state_file,
+        "size": size,
+        "md5": state_hash.hexdigest(),
+        "serial": scanner.values["serial"],
+        "lineage": scanner.values["lineage"]
+    }
+
+def download_state_blob(url, verify):
+    return REQUEST_SCHEDULER.call(url, stream_state_blob, url, verify, retry_server_errors=True, operation="state-blob.download")
+
+# On-disk cache of gzip compressed state blobs, stored by MD5 and indexed by workspace and serial.
+# The index is an append-only JSONL file that is compacted on load.
+class StateBlobCache:
+    def __init__(self, directory, max_bytes=STATE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self._entries = {}
+        self._lock = threading.RLock()
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                for line in index_file:
                     try:
-                        target.workspaces.create(new_workspace_payload)
-                        logging.info(f"Workspace {source_workspace_name} has been created.")
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("evicted"):
+                        self._entries.pop(entry["key"], None)
+                    else:
+                        self._entries[entry["key"]] = entry
+        self._entries = {key: entry for key, entry in self._entries.items() if os.path.exists(self._blob_path(entry["md5"]))}
+
+        compacted_path = f"{self.index_path}.tmp"
+        with open(compacted_path, "w", encoding="utf-8") as index_file:
+            for entry in self._entries.values():
+                index_file.write(json.dumps(entry) + "\n")
+        os.replace(compacted_path, self.index_path)
+        logging.info(f"State cache '{directory}' holds {len(self._entries)} state versions.")
+
+    @staticmethod
+    def _key(workspace_id, serial):
+        return f"{workspace_id}/{serial}"
+
+    def _blob_path(self, md5):
+        return os.path.join(self.directory, "blobs", f"{md5}.tfstate.gz")
+
+    def _append(self, entry):
+        with open(self.index_path, "a", encoding="utf-8") as index_file:
+            index_file.write(json.dumps(entry) + "\n")
+
+    def get(self, workspace_id, serial, state_version_id=None):
+        key = self._key(workspace_id, serial)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (state_version_id and entry["state_version_id"] != state_version_id):
+            return None
+
+        state_hash = hashlib.md5()
+        state_file = tempfile.SpooledTemporaryFile(max_size=STATE_SPOOL_MAX_BYTES)
+        try:
+            with gzip.open(self._blob_path(entry["md5"]), "rb") as blob_file:
+                while True:
+                    chunk = blob_file.read(STATE_CHUNK_BYTES)
+                    if not chunk:
                         break
-                    except TFCHTTPBadRequest as error: 
-                        logging.error(f"Status Code: {error.args[0]['errors'][0]['status']} | {error.args[0]['errors'][0]['detail']}")
-                        logging.debug(f"New Workspace Payload: {new_workspace_payload}")
+                    state_hash.update(chunk)
+                    state_file.write(chunk)
+        except (OSError, EOFError):
+            state_file.close()
+            self.evict(key)
+            return None
+
+        if state_hash.hexdigest() != entry["md5"]:
+            logging.warning(f"Cached state for '{key}' is corrupt, evicted.")
+            state_file.close()
+            self.evict(key)
+            return None
+
+        with self._lock:
+            entry["last_used"] = time.time()
+            self._append(entry)
+        state_file.seek(0)
+        return {
+            "file": state_file,
+            "size": entry["size"],
+            "md5": entry["md5"],
+            "serial": entry["serial"],
+            "lineage": entry["lineage"]
+        }
 
-def apply_workspace_variable_sets(target):
-    logging.info(f"Applying Variable Sets to Workspaces...")
-    workspaces = target.workspaces.list_all()['data']
-    total = len(workspaces)
+    def put(self, workspace_id, state_version_id, state_blob):
+        blob_path = self._blob_path(state_blob["md5"])
+        if not os.path.exists(blob_path):
+            partial_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            state_blob["file"].seek(0)
+            with gzip.open(partial_path, "wb") as blob_file:
+                while True:
+                    chunk = state_blob["file"].read(STATE_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    blob_file.write(chunk)
+            os.replace(partial_path, blob_path)
+            state_blob["file"].seek(0)
+
+        entry = {
+            "key": self._key(workspace_id, state_blob["serial"]),
+            "workspace_id": workspace_id,
+            "state_version_id": state_version_id,
+            "serial": state_blob["serial"],
+            "lineage": state_blob["lineage"],
+            "md5": state_blob["md5"],
+            "size": state_blob["size"],
+            "stored_size": os.path.getsize(blob_path),
+            "last_used": time.time()
+        }
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            self._append(entry)
+            self._evict_to_size()
+
+    def evict(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self._append({"key": key, "evicted": True})
+            if not any(other["md5"] == entry["md5"] for other in self._entries.values()):
+                try:
+                    os.remove(self._blob_path(entry["md5"]))
+                except FileNotFoundError:
+                    pass
+
+    def _evict_to_size(self):
+        stored_sizes = {entry["md5"]: entry["stored_size"] for entry in self._entries.values()}
+        total = sum(stored_sizes.values())
+        for entry in sorted(self._entries.values(), key=lambda entry: entry["last_used"]):
+            if total <= self.max_bytes:
+                break
+            self.evict(entry["key"])
+            if entry["md5"] in stored_sizes and not any(other["md5"] == entry["md5"] for other in self._entries.values()):
+                total -= stored_sizes.pop(entry["md5"])
+
+STATE_CACHE = None
+
+def configure_state_cache(directory, max_bytes):
+    global STATE_CACHE
+    STATE_CACHE = StateBlobCache(directory, max_bytes) if directory else None
+
+def fetch_state_blob(workspace_id, state_version):
+    serial = state_version["attributes"]["serial"]
+    if STATE_CACHE is not None:
+        state_blob = STATE_CACHE.get(workspace_id, serial, state_version["id"])
+        if state_blob is not None:
+            logging.debug(f"State serial {serial} for workspace '{workspace_id}' served from cache.")
+            METRICS.increment("state-cache-hit")
+            return state_blob
+        METRICS.increment("state-cache-miss")
+
+    state_blob = download_state_blob(state_version["attributes"]["hosted-state-download-url"], TFE_SOURCE_VERIFY)
+    if STATE_CACHE is not None:
+        STATE_CACHE.put(workspace_id, state_version["id"], state_blob)
+    return state_blob
+
+def write_state_version_payload(state_blob):
+    # Validated before any Target Workspace is locked
+    if not isinstance(state_blob["serial"], int) or not state_blob["lineage"] or not state_blob["size"]:
+        raise ValueError(f"State blob with serial {state_blob['serial']!r} and lineage {state_blob['lineage']!r} is empty or incomplete.")
+
+    # Build the new state payload, base64 encoding the state in chunks straight into the request body
+    attributes = json.dumps({
+        "serial": state_blob["serial"],
+        "md5": state_blob["md5"],
+        "lineage": state_blob["lineage"]
+    })
+    payload_file = tempfile.SpooledTemporaryFile(max_size=STATE_SPOOL_MAX_BYTES)
+    payload_file.write(f'{{"data": {{"type": "state-versions", "attributes": {attributes[:-1]}, "state": "'.encode("utf-8"))
+
+    state_blob["file"].seek(0)
+    while True:
+        chunk = state_blob["file"].read(STATE_CHUNK_BYTES)
+        if not chunk:
+            break
+        payload_file.write(base64.b64encode(chunk))
+    payload_file.write(b'"}}}')
+
+    size = payload_file.tell()
+    payload_file.seek(0)
+    return payload_file, size
+
+def tfc_error_body(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.content
+
+def tfc_http_error(response):
+    # Server errors without their own exception (e.g. a proxy's 502) are reported like a 500, so phases
+    # count them against the item instead of aborting as an unclassified response
+    status = response.status_code
+    exception = TFC_HTTP_EXCEPTIONS.get(status, TFCHTTPInternalServerError if status >= 500 else TFCHTTPUnclassified)
+    return exception(tfc_error_body(response))
+
+def tfc_error_message(error):
+    # Error bodies may lack a detail or title, or not be JSON at all (e.g. a proxy's HTML error page)
+    try:
+        api_error = error.args[0]['errors'][0]
+        return f"Status Code: {api_error['status']} | {api_error.get('detail') or api_error['title']}"
+    except (IndexError, KeyError, TypeError):
+        return repr(error)
+
+def post_state_version(url, headers, payload_file, payload_size):
+    payload_file.seek(0)
+    response = blob_session(TFC_TARGET_VERIFY).session.post(url, data=PayloadReader(payload_file, payload_size), headers=headers)
+
+    if response.status_code == 429 or response.status_code >= 500:
+        # Let the request scheduler retry, honoring any Retry-After header
+        response.raise_for_status()
+    if response.status_code not in (200, 201):
+        raise tfc_http_error(response)
+    METRICS.record_bytes(urlparse(url).netloc, "upload", payload_size)
+    return response.json()
+
+def upload_state_version(target, workspace_id, payload_file, payload_size):
+    url = f"{target.get_url()}/api/v2/workspaces/{workspace_id}/state-versions"
+
+    try:
+        return REQUEST_SCHEDULER.call(url, post_state_version, url, target._headers, payload_file, payload_size, retry_server_errors=True, \
+            operation="state-versions.upload")
+    except requests_exceptions().HTTPError as error:
+        raise tfc_http_error(error.response)
+
+# Columns of the Workspace Variables file, in order
+VARIABLE_COLUMNS = ["workspace_name", "workspace_id", "variable_id", "variable_key", "variable_value", \
+    "variable_description", "variable_category", "variable_hcl", "variable_sensitive"]
+VARIABLE_BOOLEAN_COLUMNS = ("variable_hcl", "variable_sensitive")
+
+def iter_workspace_variable_listings(source, workspaces, max_workers=MIGRATION_MAX_WORKERS):
+    # Variables are listed concurrently and yielded in Workspace order, holding at most two listings per worker
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for workspace in workspaces:
+            window.append((workspace, executor.submit(source.workspace_vars.list, workspace['id'])))
+            if len(window) > max_workers * 2:
+                workspace, future = window.popleft()
+                yield workspace, future.result()['data']
+        while window:
+            workspace, future = window.popleft()
+            yield workspace, future.result()['data']
+
+def iter_source_variables(source, workspaces, max_workers=MIGRATION_MAX_WORKERS):
+    progress = Progress("Workspace variable export", len(workspaces))
+    for workspace, workspace_vars in iter_workspace_variable_listings(source, workspaces, max_workers):
+        logging.info(f"{progress.step()}: Acquired {len(workspace_vars)} variables for workspace: {workspace['attributes']['name']}.")
+        for workspace_var in workspace_vars:
+            if workspace_var['attributes']['key'] in IGNORED_VARIABLE_KEYS:
+                continue
+            variable = {
+                "workspace_name": workspace['attributes']['name'],
+                "workspace_id": workspace['id'],
+                "variable_id": workspace_var['id'],
+                "variable_key": workspace_var['attributes']['key'],
+                "variable_value": workspace_var['attributes']['value'],
+                "variable_description": workspace_var['attributes']['description'],
+                "variable_category": workspace_var['attributes']['category'],
+                "variable_hcl": workspace_var['attributes']['hcl'],
+                "variable_sensitive": workspace_var['attributes']['sensitive']
+            }
+            if workspace_var['attributes']['key'] in OVERWRITE_VARIABLE_KEY_PAIRS:
+                variable['variable_value'] = OVERWRITE_VARIABLE_KEY_PAIRS[workspace_var['attributes']['key']]
+            yield variable
+    progress.finish()
+
+def write_variable_rows(filepath, variables):
+    # Rows are written as they arrive, `.jsonl` files get one JSON object per line and anything else is CSV
+    count = 0
+    with open(filepath, "w", encoding="utf-8", newline="") as variable_file:
+        if filepath.endswith(".jsonl"):
+            for variable in variables:
+                variable_file.write(json.dumps({key: value for key, value in variable.items() if value is not None}) + "\n")
+                count += 1
+        else:
+            writer = csv.DictWriter(variable_file, fieldnames=VARIABLE_COLUMNS)
+            writer.writeheader()
+            for variable in variables:
+                writer.writerow(variable)
+                count += 1
+    return count
+
+def read_variable_rows(filepath):
+    with open(filepath, "r", encoding="utf-8", newline="") as variable_file:
+        if filepath.endswith(".jsonl"):
+            for line in variable_file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        for row in csv.DictReader(variable_file):
+            # Empty cells are omitted and booleans restored, matching what was exported
+            variable = {key: value for key, value in row.items() if value not in ("", None)}
+            for column in VARIABLE_BOOLEAN_COLUMNS:
+                if variable.get(column) in ("True", "False"):
+                    variable[column] = variable[column] == "True"
+            yield variable
+
+@timed_phase("workspace-variables-csv")
+def create_source_variable_spreadsheet(source, filepath, source_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    source_inventory = source_inventory or OrganizationInventory(source)
+    workspaces = source_inventory.workspaces()
+    logging.info(f"Exporting variables of {len(workspaces)} workspaces with {max_workers} workers...")
+    count = write_variable_rows(filepath, iter_source_variables(source, workspaces, max_workers))
+    logging.info(f"{count} Workspace Variables written to '{filepath}'.")
+
+def build_workspace_variable_payload(sensitive_variable):
+    attributes =  {
+        "key" :sensitive_variable['variable_key'],
+        "category": sensitive_variable['variable_category'],
+        "hcl": sensitive_variable['variable_hcl'],
+        "sensitive": False
+    }
+    if "variable_value" in sensitive_variable:
+        if isinstance(sensitive_variable['variable_value'], str):
+            attributes['value'] = sensitive_variable['variable_value']
+    if "variable_description" in sensitive_variable:
+        if isinstance(sensitive_variable['variable_description'], str):
+            attributes['description'] = sensitive_variable['variable_description']
+    if "password" in sensitive_variable['variable_key'].lower() or "pass" in sensitive_variable['variable_key'].lower():
+        attributes["sensitive"] = True
+
+    return {
+        "data": {
+            "type": "vars",
+            "attributes": attributes
+        }
+    }
+
+def list_workspace_variables(target, workspace_id):
+    workspace_variables = target.workspace_vars.list(workspace_id)['data']
+    return {workspace_variable['attributes']['key']: workspace_variable for workspace_variable in workspace_variables}
+
+def workspace_variable_changed(target_variable, payload):
+    # Sensitive values can not be read back from the Target, so they always count as changed
+    attributes = payload["data"]["attributes"]
+    if target_variable['attributes']['sensitive'] or attributes['sensitive']:
+        return True
+    return any((target_variable['attributes'].get(attribute) or None) != (attributes.get(attribute) or None) \
+        for attribute in ("value", "description", "category", "hcl"))
+
+def group_workspace_variables(filepath, journal):
+    total = 0
+    completed = 0
+
+    # Group variables by Workspace, preserving the order of the CSV
+    workspace_variables = {}
+    for sensitive_variable in read_variable_rows(filepath):
+        total += 1
+        journal_key = f"{sensitive_variable['workspace_id']}:{sensitive_variable['variable_key']}"
+        if journal.is_done("workspace-variables", journal_key):
+            completed += 1
+            continue
+        workspace_variables.setdefault(sensitive_variable['workspace_name'], []).append((journal_key, sensitive_variable))
+    if completed:
+        logging.info(f"{completed}/{total} Workspace Variables completed in a previous run, skipped.")
+    return workspace_variables, total, completed
+
+def deploy_workspace_variables(target, workspace_name, variables, journal, target_inventory, update_workspace_ids=()):
+    target_workspace = target_inventory.workspace(workspace_name)
+    if target_workspace is None:
+        return {"workspace": workspace_name, "status": "skipped", \
+            "detail": f"Target Workspace not found, skipping {len(variables)} Workspace Variables."}
+
+    existing_variables = list_workspace_variables(target, target_workspace['id'])
+    created, updated, existing, failed = 0, 0, 0, 0
+    for journal_key, sensitive_variable in variables:
+        payload = build_workspace_variable_payload(sensitive_variable)
+        existing_variable = existing_variables.get(sensitive_variable['variable_key'])
+        # Existing variables are only updated for Workspaces whose variables changed since the last sync
+        if existing_variable is not None and not (sensitive_variable['workspace_id'] in update_workspace_ids \
+                and workspace_variable_changed(existing_variable, payload)):
+            existing += 1
+            journal.record("workspace-variables", journal_key)
+            continue
+        try:
+            if existing_variable is None:
+                existing_variables[sensitive_variable['variable_key']] = target.workspace_vars.create(target_workspace['id'], payload)['data']
+                created += 1
+            else:
+                target.workspace_vars.update(target_workspace['id'], existing_variable['id'], payload)
+                updated += 1
+            journal.record("workspace-variables", journal_key)
+        except TFCHTTPUnclassified:
+            raise
+        except Exception as error:
+            logging.error(f"Workspace Variable '{sensitive_variable['variable_key']}' failed for workspace: {workspace_name}. {tfc_error_message(error)}")
+            failed += 1
+            journal.record("workspace-variables", journal_key, status="failed", detail=tfc_error_message(error))
+
+    status = "failed" if failed else "created" if created or updated else "skipped"
+    return {"workspace": workspace_name, "status": status, "done": not failed, \
+        "detail": f"Workspace Variables created: {created}, updated: {updated}, existing: {existing}, failed: {failed}."}
+
+@timed_phase("workspace-variables")
+def deploy_target_workspace_variables(target, filepath, journal=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS, \
+        update_workspace_ids=()):
+    journal = journal or MigrationJournal()
+    target_inventory = target_inventory or OrganizationInventory(target)
+    workspace_variables = group_workspace_variables(filepath, journal)[0]
+
+    # Each Workspace is deployed like a pipeline variables task, listing its existing variables once
+    logging.info(f"Adding Workspace Variables for {len(workspace_variables)} Workspaces with {max_workers} workers...")
+    graph = WorkspaceTaskGraph({"variables": max_workers}, "Workspace variables")
+    for workspace_name, variables in workspace_variables.items():
+        graph.add((workspace_name, "workspace variables"), "variables", partial(deploy_workspace_variables, \
+            target, workspace_name, variables, journal, target_inventory, update_workspace_ids))
+    return graph.run()
+
+def destroy_workspace_variable(target, workspace_id, variable_id):
+    # Variables that are already gone count as deleted, so an interrupted deletion can simply be re-run
+    try:
+        target.workspace_vars.destroy(workspace_id, variable_id)
+        return True
+    except TFCHTTPNotFound:
+        return False
+
+@timed_phase("delete-workspace-variables")
+def nuke_target_workspace_variables(target, name_identifier=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    target_inventory = target_inventory or OrganizationInventory(target)
+    scope = f"Workspaces matching '{name_identifier}'" if name_identifier else "all Workspaces"
+    confirmation = input(f"Are you sure you want to delete Workspace Variables of {scope} for {target.account.get_current_org()} ORG at URL '{target._instance_url}'? [Y/N]:")
+    if confirmation.lower() == 'y':
+        workspaces = [workspace for workspace in target_inventory.workspaces() \
+            if not name_identifier or name_identifier in workspace['attributes']['name'].lower()]
+        logging.info(f"Deleting workspace variables of {len(workspaces)} Workspaces with {max_workers} workers...")
+
+        # Variables are deleted while further Workspaces are still being listed, with a bounded number of deletes in flight
+        progress = Progress("Workspace variable deletion", 0)
+        counts = {"deleted": 0, "missing": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+
+            def collect(done):
+                for future in done:
+                    workspace_name, variable_key = futures.pop(future)
+                    try:
+                        existed = future.result()
+                    except TFCHTTPUnclassified:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        raise
+                    except Exception as error:
+                        counts["failed"] += 1
+                        logging.error(f"{progress.step()}: Failed to delete Workspace variable {variable_key}, from workspace {workspace_name}. {error!r}")
+                        continue
+                    counts["deleted" if existed else "missing"] += 1
+                    logging.info(f"{progress.step()}: Workspace variable {variable_key}, from workspace {workspace_name}, deleted.")
+
+            for workspace, workspace_vars in iter_workspace_variable_listings(target, workspaces, max_workers):
+                progress.add(len(workspace_vars))
+                for workspace_var in workspace_vars:
+                    future = executor.submit(destroy_workspace_variable, target, workspace['id'], workspace_var['id'])
+                    futures[future] = (workspace['attributes']['name'], workspace_var['attributes']['key'])
+                    if len(futures) >= max_workers * 4:
+                        collect(wait(futures, return_when=FIRST_COMPLETED).done)
+            collect(wait(futures).done)
+        progress.finish()
+        logging.info(f"Workspace variables deleted: {counts['deleted']}, already deleted: {counts['missing']}, failed: {counts['failed']}.")
+
+def find_agent_pool_id(target, name_identifier):
+    agent_pools = target.agents.list_pools()['data']
+    for agent_pool in agent_pools:
+        if name_identifier in agent_pool['attributes']['name'].lower():
+            return agent_pool['id']
+    return None
+
+def build_execution_mode_payload(mode, agent_pool_id=None):
+    payload = {
+        "data": {
+            "attributes": {
+                "execution-mode": mode
+            },
+        },
+            "type": "workspaces"
+    }
+
+    if mode == 'agent':
+        payload['data']['attributes']['agent-pool-id'] = agent_pool_id
+    return payload
+
+def update_workspace_execution_mode(target, workspace_name, payload):
+    target.workspaces.update(payload, workspace_name)
+    return {"workspace": workspace_name, "status": "created", "done": True, \
+        "detail": f"Execution Mode set to '{payload['data']['attributes']['execution-mode']}'."}
+
+def execution_mode_matches(workspace, mode, agent_pool_id=None):
+    if workspace['attributes']['execution-mode'] != mode:
+        return False
+    if mode != 'agent':
+        return True
+    try:
+        return workspace['relationships']['agent-pool']['data']['id'] == agent_pool_id
+    except (KeyError, TypeError):
+        return False
+
+@timed_phase("execution-mode")
+def set_target_workspace_execution_mode(target, mode, name_identifier, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Updating {name_identifier} Workspaces' Execution Mode with {max_workers} workers...")
+    if mode == 'agent' and target._hostname != 'app.terraform.io':
+        logging.warning(f"Execution Mode '{mode}' is not available for non TFC Workspaces.")
+        return
+
+    agent_pool_id = None
+    if mode == 'agent':
+        agent_pool_id = find_agent_pool_id(target, name_identifier)
+        if not agent_pool_id:
+            logging.error(f"Could not find correct Agent Pool to assign to Workspaces.")
+            exit()
+    payload = build_execution_mode_payload(mode, agent_pool_id)
+
+    # Workspaces are partitioned in memory, only matching Workspaces not yet in the requested mode are updated
+    workspaces = target_inventory.workspaces()
+    matching = [workspace for workspace in workspaces if name_identifier in workspace['attributes']['name'].lower()]
+    pending = [workspace['attributes']['name'] for workspace in matching if not execution_mode_matches(workspace, mode, agent_pool_id)]
+    logging.info(f"{len(matching)}/{len(workspaces)} Workspaces match identifier '{name_identifier}', " \
+        f"{len(matching) - len(pending)} already use Execution Mode '{mode}'.")
+
+    failed = []
+    progress = Progress("Workspace execution mode", len(pending))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(update_workspace_execution_mode, target, workspace_name, payload): workspace_name for workspace_name in pending}
+        for future in as_completed(futures):
+            workspace_name = futures[future]
+            try:
+                future.result()
+                logging.info(f"{progress.step()}: Updated Workspace {workspace_name} execution mode to '{mode}'.")
+            except TFCHTTPUnclassified:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as error:
+                failed.append(workspace_name)
+                logging.error(f"{progress.step()}: Failed to update Workspace {workspace_name} execution mode. {error!r}")
+    progress.finish()
+    logging.info(f"Workspaces' Execution Mode Updated. Updated: {len(pending) - len(failed)}, Failed: {len(failed)}.")
+    if failed:
+        logging.error(f"Failed to update execution mode for workspaces: {', '.join(failed)}")
+
+def build_new_workspace_payload(source_workspace):
+    source_workspace_name = source_workspace['attributes']['name']
+
+    try:
+        source_workspace_vcs_id = source_workspace['attributes']['vcs-repo']['oauth-token-id']
+        if source_workspace_vcs_id in TFE_SOURCE_VCS_TYPES:
+            source_workspace_vcs_type = TFE_SOURCE_VCS_TYPES[source_workspace_vcs_id]
+        else:
+            logger.error("Could not find VCS Identifier in hardcoded list of VCS Providers Dict.")
+            exit()
+    except:
+        logging.debug(f"Workspace {source_workspace_name} is not connected to a VCS provider")
+        source_workspace_vcs_type = None
+
+    new_workspace_payload = {
+        "data": {
+            "attributes": {
+                "name": source_workspace_name,
+                "terraform_version": source_workspace["attributes"]["terraform-version"],
+                "working-directory": source_workspace["attributes"]["working-directory"],
+                "file-triggers-enabled": \
+                    source_workspace["attributes"]["file-triggers-enabled"],
+                "allow-destroy-plan": source_workspace["attributes"]["allow-destroy-plan"],
+                "auto-apply": source_workspace["attributes"]["auto-apply"],
+                "execution-mode": source_workspace["attributes"]["execution-mode"],
+                "description": source_workspace["attributes"]["description"],
+                "source-name": source_workspace["attributes"]["source-name"],
+                "source-url": source_workspace["attributes"]["source-url"],
+                "queue-all-runs": source_workspace["attributes"]["queue-all-runs"],
+                "speculative-enabled": \
+                    source_workspace["attributes"]["speculative-enabled"],
+                "trigger-prefixes": source_workspace["attributes"]["trigger-prefixes"],
+            },
+            "type": "workspaces"
+        }
+    }
+    
+    if source_workspace_vcs_type is not None:
+        if source_workspace_vcs_type in TFC_TARGET_VCS:
+            new_workspace_payload["data"]["attributes"]["vcs-repo"] = {
+                "identifier": source_workspace["attributes"]['vcs-repo']['identifier'],
+                "oauth-token-id": TFC_TARGET_VCS[source_workspace_vcs_type],
+                "branch": source_workspace["attributes"]["vcs-repo"]["branch"],
+                "default-branch": True if source_workspace["attributes"]["vcs-repo"]["branch"] == "" else False,
+                "ingress-submodules": source_workspace["attributes"]["vcs-repo"]["ingress-submodules"]
+            }
+        else:
+            logging.warning(f"VCS Type '{source_workspace_vcs_type}' in VCS library, skipped.")
+            return None
+
+    return new_workspace_payload
+
+def update_target_workspace(target, source_workspace, target_workspace):
+    # The name identifies the Workspace and its execution mode is managed by [--update-workspace-execution]
+    workspace_payload = build_new_workspace_payload(source_workspace)
+    if workspace_payload is None:
+        raise ValueError("VCS Type not in VCS library.")
+    for attribute in ("name", "execution-mode"):
+        workspace_payload["data"]["attributes"].pop(attribute)
+    return target.workspaces.update(workspace_payload, workspace_id=target_workspace['id'])["data"]
+
+def create_target_workspace(target, new_workspace_payload, target_inventory):
+    new_workspace = target.workspaces.create(new_workspace_payload)
+    target_inventory.add("workspaces", new_workspace["data"])
+    return new_workspace["data"]
+
+def migrate_workspace(target, source_workspace, journal, target_inventory, progress="", update_workspace_ids=(), attempt=0):
+    source_workspace_name = source_workspace['attributes']['name']
+
+    if journal.is_done("workspaces", source_workspace['id']):
+        logging.info(f"{progress}Workspace {source_workspace_name} completed in a previous run, skipped.")
+        return {"workspace": source_workspace_name, "status": "skipped", "done": True, "detail": "Completed in a previous run."}
+
+    target_workspace = target_inventory.workspace(source_workspace_name)
+    if target_workspace is not None and source_workspace['id'] in update_workspace_ids:
+        # Settings changed on the Source since the last sync
+        try:
+            update_target_workspace(target, source_workspace, target_workspace)
+        except TFCHTTPUnclassified:
+            raise
+        except Exception as error:
+            journal.record("workspaces", source_workspace['id'], status="failed", detail=repr(error))
+            return {"workspace": source_workspace_name, "status": "failed", "detail": f"Workspace settings could not be updated. {error!r}"}
+        journal.record("workspaces", source_workspace['id'])
+        return {"workspace": source_workspace_name, "status": "updated", "done": True, "detail": "Workspace settings updated."}
+
+    if target_workspace is not None:
+        logging.info(f"{progress}Workspace {source_workspace_name} already exists on target.")
+        journal.record("workspaces", source_workspace['id'])
+        return {"workspace": source_workspace_name, "status": "skipped", "done": True, "detail": "Workspace already exists on target."}
+
+    new_workspace_payload = build_new_workspace_payload(source_workspace)
+    if new_workspace_payload is None:
+        return {"workspace": source_workspace_name, "status": "skipped", "detail": "VCS Type not in VCS library."}
+
+    if attempt:
+        logging.warning(f"Retry Attempt: {attempt}/{WORKSPACE_CREATE_RETRIES} to Create Workspace '{source_workspace_name}'.")
+    else:
+        logging.info(f"{progress}Creating Workspace {source_workspace_name} on TFC Target...")
+    try:
+        create_target_workspace(target, new_workspace_payload, target_inventory)
+    except TFCHTTPBadRequest as error:
+        logging.error(tfc_error_message(error))
+        logging.debug(f"New Workspace Payload: {new_workspace_payload}")
+        if attempt < WORKSPACE_CREATE_RETRIES:
+            # The task graph re-runs the next attempt once it is due, without holding a worker in the meantime
+            logging.warning(f"Failed to create Workspace '{source_workspace_name}'. Re-attempt in {WORKSPACE_CREATE_RETRY_SECONDS:.0f} Seconds...")
+            return {"workspace": source_workspace_name, "status": "retry", "delay": WORKSPACE_CREATE_RETRY_SECONDS, \
+                "task": partial(migrate_workspace, target, source_workspace, journal, target_inventory, progress, update_workspace_ids, attempt + 1)}
+        journal.record("workspaces", source_workspace['id'], status="failed", detail=tfc_error_message(error))
+        return {"workspace": source_workspace_name, "status": "failed", \
+            "detail": f"Workspace could not be created after {WORKSPACE_CREATE_RETRIES} retries."}
+    except TFCHTTPUnclassified:
+        raise
+    except Exception as error:
+        journal.record("workspaces", source_workspace['id'], status="failed", detail=tfc_error_message(error))
+        return {"workspace": source_workspace_name, "status": "failed", "detail": f"Workspace could not be created. {tfc_error_message(error)}"}
+    logging.info(f"Workspace {source_workspace_name} has been created.")
+    journal.record("workspaces", source_workspace['id'])
+    return {"workspace": source_workspace_name, "status": "created", "done": True, "detail": "Workspace created."}
+
+@timed_phase("workspaces")
+def migrate_workspaces(source, target, journal=None, source_inventory=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS, \
+        update_workspace_ids=()):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating Source Workspaces with {max_workers} workers...")
+
+    # Each Workspace is migrated like a pipeline workspace task, creates rejected with Bad Request wait for their retry without holding a worker
+    graph = WorkspaceTaskGraph({"workspace": max_workers}, "Workspaces")
+    for source_workspace in source_inventory.workspaces():
+        graph.add((source_workspace['attributes']['name'], "workspace"), "workspace", partial(migrate_workspace, \
+            target, source_workspace, journal, target_inventory, update_workspace_ids=update_workspace_ids))
+    return graph.run()
+
+def apply_variable_sets_to_workspace(target, workspace):
+    applied = []
+    for var_set in TFC_TARGET_VAR_SETS:
+        if var_set in workspace['attributes']['name'].lower():
+            payload = {
+                "data": [
+                    {
+                        "type": "workspaces",
+                        "id": workspace['id']
+                    }
+                ]
+            }
+            target.var_sets.apply_varset_to_workspace(TFC_TARGET_VAR_SETS[var_set], payload)
+            logging.info(f"Applied Variable Set '{TFC_TARGET_VAR_SETS[var_set]}' to Workspace: {workspace['attributes']['name']}")
+            applied.append(TFC_TARGET_VAR_SETS[var_set])
+    return {"workspace": workspace['attributes']['name'], "status": "created" if applied else "skipped", "done": True, \
+        "detail": f"Variable Sets applied: {', '.join(applied) or 'none'}."}
+
+def partition_variable_set_workspaces(workspaces):
+    # Target Workspace IDs per Variable Set, by the identifiers found in the Workspace names
+    variable_set_workspaces = {}
     for workspace in workspaces:
-        logging.info(f"({workspaces.index(workspace) + 1}/{total}): Applying Variables Sets to Workspace: {workspace['attributes']['name']}...")
         for var_set in TFC_TARGET_VAR_SETS:
             if var_set in workspace['attributes']['name'].lower():
-                payload = {
-                    "data": [
-                        {
-                            "type": "workspaces",
-                            "id": workspace['id']
-                        }
-                    ]
-                }
-                target.var_sets.apply_varset_to_workspace(TFC_TARGET_VAR_SETS[var_set], payload)
-                logging.info(f"Applied Variable Set '{TFC_TARGET_VAR_SETS[var_set]}' to Workspace: {workspace['attributes']['name']}")
+                variable_set_workspaces.setdefault(TFC_TARGET_VAR_SETS[var_set], {})[workspace['id']] = workspace['attributes']['name']
+    return variable_set_workspaces
 
-def migrate_current_state(source, target):
-    logging.info("Migrating current state versions...")
-    workspaces = source.workspaces.list_all()['data']
-    total = len(workspaces)
-    for workspace in workspaces:
-        logging.info(f"({workspaces.index(workspace) + 1}/{total}): Current state version for workspace: {workspace['attributes']['name']}, created.")
-        current_source_version = None
-        target_state_filters = [
-            {
-                "keys": ["workspace", "name"],
-                "value":  workspace["attributes"]["name"]
-            },
-            {
-                "keys": ["organization", "name"],
-                "value": target.get_org()
-            }
-        ]
+@timed_phase("varsets")
+def apply_workspace_variable_sets(target, target_inventory=None):
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Applying Variable Sets to Workspaces...")
+    variable_set_workspaces = partition_variable_set_workspaces(target_inventory.workspaces())
+    progress = Progress("Variable sets", len(variable_set_workspaces))
+    failed = []
+    for var_set_id, workspaces in variable_set_workspaces.items():
+        # One request per Variable Set carries every matching Workspace
+        payload = {"data": [{"type": "workspaces", "id": workspace_id} for workspace_id in workspaces]}
+        try:
+            target.var_sets.apply_varset_to_workspace(var_set_id, payload)
+            logging.info(f"{progress.step()}: Applied Variable Set '{var_set_id}' to {len(workspaces)} Workspaces: {', '.join(workspaces.values())}")
+        except TFCHTTPUnclassified:
+            raise
+        except TFCException as error:
+            failed.append(var_set_id)
+            logging.error(f"{progress.step()}: Failed to apply Variable Set '{var_set_id}' to {len(workspaces)} Workspaces. {error!r}")
+    progress.finish()
+    if failed:
+        logging.error(f"Failed to apply variable sets: {', '.join(failed)}")
+
+@contextmanager
+def locked_workspace(target, workspace_id, workspace_name=None):
+    try:
+        target.workspaces.lock(workspace_id, {"reason": "migration script"})
+    except TFCHTTPConflict:
+        target.workspaces.force_unlock(workspace_id)
+        target.workspaces.lock(workspace_id, {"reason": "migration script"})
+    # Held only while uploading, released even if the upload fails
+    locked = time.monotonic()
+    try:
+        yield
+    finally:
+        try:
+            target.workspaces.unlock(workspace_id)
+        finally:
+            METRICS.record_workspace_lock(workspace_name or workspace_id, time.monotonic() - locked)
+
+def upload_workspace_state(target, target_workspace_id, source_state, workspace_name=None):
+    try:
+        payload_file, payload_size = write_state_version_payload(source_state)
+    finally:
+        source_state["file"].close()
+
+    # Migrate state to the target workspace
+    with payload_file:
+        with locked_workspace(target, target_workspace_id, workspace_name):
+            upload_state_version(target, target_workspace_id, payload_file, payload_size)
+
+def migrate_workspace_state(source, target, workspace, target_inventory):
+    workspace_name = workspace['attributes']['name']
+    # Checked against the in-memory inventory first, so Workspaces missing on the Target cost no requests or transfer
+    target_workspace = target_inventory.workspace(workspace_name)
+    if target_workspace is None:
+        return {"workspace": workspace_name, "status": "skipped", \
+            "detail": "Target Workspace not found. Re-execute script with [--migrate-workspaces] parameter."}
+
+    target_state_filters = [
+        {
+            "keys": ["workspace", "name"],
+            "value":  workspace_name
+        },
+        {
+            "keys": ["organization", "name"],
+            "value": target.get_org()
+        }
+    ]
+
+    # State versions are listed newest first, only the current one on the Target is compared
+    target_state_versions = target.state_versions.list(filters=target_state_filters, page=1, page_size=1)["data"]
+    target_state_version_serials = [state_version["attributes"]["serial"] for state_version in target_state_versions]
+
+    try:
+        current_source_version = source.state_versions.get_current(workspace['id'])["data"]
+        current_source_version_number = current_source_version["attributes"]["serial"]
+    except TFCHTTPNotFound:
+        return {"workspace": workspace_name, "status": "skipped", "detail": "Current state version does not exist."}
 
-        target_state_versions =  target.state_versions.list_all(filters=target_state_filters)['data']
-        target_state_version_serials = [state_version["attributes"]["serial"] for state_version in target_state_versions]
+    if target_state_version_serials and current_source_version_number <= target_state_version_serials[0]:
+        return {"workspace": workspace_name, "status": "skipped", "done": True, \
+            "detail": f"State Version: {current_source_version_number} exists or is older than the current version."}
 
+    source_state = fetch_state_blob(workspace['id'], current_source_version)
+    source_state_serial = source_state["serial"]
+    upload_workspace_state(target, target_workspace['id'], source_state, workspace_name)
+    return {"workspace": workspace_name, "status": "created", "done": True, "detail": f"State Version: {source_state_serial} created."}
+
+def current_state_version_id(workspace):
+    try:
+        return workspace['relationships']['current-state-version']['data']['id']
+    except (KeyError, TypeError):
+        return None
+
+def state_journal_key(workspace):
+    # Keyed by the source current state version so that newer source states are migrated again
+    state_version_id = current_state_version_id(workspace)
+    if state_version_id is None:
+        return None
+    return f"{workspace['id']}:{state_version_id}"
+
+def record_workspace_result(journal, journal_phase, workspace, result):
+    journal_key = state_journal_key(workspace)
+    if journal_key and result.get("done"):
+        journal.record(journal_phase, journal_key)
+    elif journal_key and result['status'] == "failed":
+        journal.record(journal_phase, journal_key, status="failed", detail=result['detail'])
+
+def run_journaled_workspace_task(journal, journal_phase, workspace, task):
+    if journal.is_done(journal_phase, state_journal_key(workspace)):
+        return {"workspace": workspace['attributes']['name'], "status": "skipped", "done": True, \
+            "detail": "Completed in a previous run."}
+    try:
+        result = task()
+    except TFCHTTPUnclassified:
+        raise
+    except Exception as error:
+        result = {"workspace": workspace['attributes']['name'], "status": "failed", "detail": repr(error)}
+    record_workspace_result(journal, journal_phase, workspace, result)
+    return result
+
+def run_workspace_tasks(description, task, workspaces, max_workers, journal, journal_phase):
+    total = len(workspaces)
+    results = []
+
+    pending_workspaces = []
+    for workspace in workspaces:
+        if journal.is_done(journal_phase, state_journal_key(workspace)):
+            results.append({"workspace": workspace['attributes']['name'], "status": "skipped", "done": True, \
+                "detail": "Completed in a previous run."})
+        else:
+            pending_workspaces.append(workspace)
+    if results:
+        logging.info(f"{len(results)}/{total} {description}s completed in a previous run, skipped.")
+
+    progress = Progress(f"{description.capitalize()}s", len(pending_workspaces))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(task, workspace): workspace for workspace in pending_workspaces}
+        for future in as_completed(futures):
+            workspace_name = futures[future]['attributes']['name']
+            try:
+                result = future.result()
+            except TFCHTTPUnclassified:
+                # Authentication/proxy failures affect every workspace, stop scheduling new work
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as error:
+                result = {"workspace": workspace_name, "status": "failed", "detail": repr(error)}
+            results.append(result)
+            record_workspace_result(journal, journal_phase, futures[future], result)
+
+            message = f"{progress.step()}: {description.capitalize()} for workspace: {workspace_name}, {result['status']}. {result['detail']}"
+            if result['status'] == "failed":
+                logging.error(message)
+            else:
+                logging.info(message)
+
+    progress.finish()
+    created = sum(1 for result in results if result['status'] == "created")
+    skipped = sum(1 for result in results if result['status'] == "skipped")
+    failed = [result['workspace'] for result in results if result['status'] == "failed"]
+    logging.info(f"{description.capitalize()}s migrated. Created: {created}, Skipped: {skipped}, Failed: {len(failed)}.")
+    if failed:
+        logging.error(f"Failed to migrate {description} for workspaces: {', '.join(failed)}")
+    return results
+
+@timed_phase("current-state")
+def migrate_current_state(source, target, max_workers=MIGRATION_MAX_WORKERS, journal=None, source_inventory=None, target_inventory=None):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating current state versions with {max_workers} workers...")
+
+    def task(workspace):
+        return migrate_workspace_state(source, target, workspace, target_inventory)
+    return run_workspace_tasks("current state version", task, source_inventory.workspaces(), max_workers, journal, "current-state")
+
+@timed_phase("state-prestage")
+def prestage_current_state(source, max_workers=MIGRATION_MAX_WORKERS, source_inventory=None):
+    source_inventory = source_inventory or OrganizationInventory(source)
+    logging.info(f"Pre-staging current state versions into '{STATE_CACHE.directory}' with {max_workers} workers...")
+
+    def task(workspace):
         try:
             current_source_version = source.state_versions.get_current(workspace['id'])["data"]
-            current_source_version_number = current_source_version["attributes"]["serial"]
         except TFCHTTPNotFound:
-            logging.info(f"Current state version for workspace: {workspace['attributes']['name']}, does not exist. Skipped.")
+            return {"workspace": workspace['attributes']['name'], "status": "skipped", "detail": "Current state version does not exist."}
+        fetch_state_blob(workspace['id'], current_source_version)["file"].close()
+        return {"workspace": workspace['attributes']['name'], "status": "created", \
+            "detail": f"State Version: {current_source_version['attributes']['serial']} cached."}
+    # The cache is the record of pre-staged states, nothing is journaled
+    return run_workspace_tasks("pre-staged state version", task, source_inventory.workspaces(), max_workers, MigrationJournal(), "state-prestage")
+
+def select_state_history(source_state_versions, target_state_version_serials, max_versions, max_age_days):
+    # Source state versions missing on the target, newest first as listed by the API
+    missing_versions = [state_version for state_version in source_state_versions \
+        if state_version["attributes"]["serial"] not in target_state_version_serials]
+
+    if max_age_days:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        missing_versions = [state_version for state_version in missing_versions \
+            if datetime.fromisoformat(state_version["attributes"]["created-at"].replace("Z", "+00:00")) >= cutoff]
+
+    missing_versions = sorted(missing_versions, key=lambda state_version: state_version["attributes"]["serial"], reverse=True)[:max_versions]
+
+    # The target only accepts serials newer than its current state
+    if target_state_version_serials:
+        newest_target_serial = max(target_state_version_serials)
+        missing_versions = [state_version for state_version in missing_versions \
+            if state_version["attributes"]["serial"] > newest_target_serial]
+
+    return sorted(missing_versions, key=lambda state_version: state_version["attributes"]["serial"])
+
+def list_newest_state_versions(client, filters, newer_than=None, max_versions=None, max_age_days=None):
+    # State versions are listed newest first, paging stops at the first version select_state_history could not select
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days) if max_age_days else None
+    state_versions = []
+    page_number, total_pages = 1, 1
+    while page_number <= total_pages and (max_versions is None or len(state_versions) < max_versions):
+        page = client.state_versions.list(filters=filters, page=page_number, page_size=LIST_PAGE_SIZE)
+        total_pages = page.get('meta', {}).get('pagination', {}).get('total-pages') or 1
+        for state_version in page['data']:
+            if max_versions is not None and len(state_versions) >= max_versions:
+                return state_versions
+            if newer_than is not None and state_version["attributes"]["serial"] <= newer_than:
+                return state_versions
+            if cutoff and datetime.fromisoformat(state_version["attributes"]["created-at"].replace("Z", "+00:00")) < cutoff:
+                return state_versions
+            state_versions.append(state_version)
+        page_number += 1
+    return state_versions
+
+def download_state_version_payload(workspace_id, state_version):
+    state_blob = fetch_state_blob(workspace_id, state_version)
+    try:
+        payload_file, payload_size = write_state_version_payload(state_blob)
+    finally:
+        state_blob["file"].close()
+    # Many payloads are held until the upload, keep them on disk rather than in memory
+    payload_file.rollover()
+    return state_blob["serial"], payload_file, payload_size
+
+def migrate_workspace_state_history(source, target, workspace, target_inventory, max_versions=STATE_HISTORY_MAX_VERSIONS, \
+        max_age_days=STATE_HISTORY_MAX_AGE_DAYS):
+    workspace_name = workspace['attributes']['name']
+    target_workspace = target_inventory.workspace(workspace_name)
+    if target_workspace is None:
+        return {"workspace": workspace_name, "status": "skipped", \
+            "detail": "Target Workspace not found. Re-execute script with [--migrate-workspaces] parameter."}
+
+    source_state_filters = [
+        {
+            "keys": ["workspace", "name"],
+            "value":  workspace_name
+        },
+        {
+            "keys": ["organization", "name"],
+            "value": source.get_org()
+        }
+    ]
+    target_state_filters = [
+        {
+            "keys": ["workspace", "name"],
+            "value":  workspace_name
+        },
+        {
+            "keys": ["organization", "name"],
+            "value": target.get_org()
+        }
+    ]
+    # Only Source versions newer than the Target's current state can be uploaded, so only its newest version is listed
+    target_state_version_serials = {state_version["attributes"]["serial"] for state_version in \
+        target.state_versions.list(filters=target_state_filters, page=1, page_size=1)["data"]}
+    source_state_versions = list_newest_state_versions(source, source_state_filters, max(target_state_version_serials, default=None), \
+        max_versions, max_age_days)
+
+    missing_versions = select_state_history(source_state_versions, target_state_version_serials, max_versions, max_age_days)
+    if not missing_versions:
+        return {"workspace": workspace_name, "status": "skipped", "done": True, \
+            "detail": "No State Versions newer than the current version are missing."}
+
+    # Download every missing version before taking the lock
+    payloads = []
+    try:
+        with ThreadPoolExecutor(max_workers=STATE_HISTORY_DOWNLOAD_WORKERS) as executor:
+            for payload in executor.map(lambda state_version: download_state_version_payload(workspace['id'], state_version), missing_versions):
+                payloads.append(payload)
+
+        with locked_workspace(target, target_workspace['id'], workspace_name):
+            for serial, payload_file, payload_size in payloads:
+                upload_state_version(target, target_workspace['id'], payload_file, payload_size)
+    finally:
+        for serial, payload_file, payload_size in payloads:
+            payload_file.close()
+
+    serials = [serial for serial, payload_file, payload_size in payloads]
+    return {"workspace": workspace_name, "status": "created", "done": True, \
+        "detail": f"{len(serials)} State Versions created (serials {serials[0]}-{serials[-1]})."}
+
+@timed_phase("state-history")
+def migrate_state_history(source, target, max_workers=MIGRATION_MAX_WORKERS, journal=None, source_inventory=None, target_inventory=None, \
+        max_versions=STATE_HISTORY_MAX_VERSIONS, max_age_days=STATE_HISTORY_MAX_AGE_DAYS):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating state version history with {max_workers} workers...")
+
+    def task(workspace):
+        return migrate_workspace_state_history(source, target, workspace, target_inventory, max_versions, max_age_days)
+    return run_workspace_tasks("state version history", task, source_inventory.workspaces(), max_workers, journal, "state-history")
+
+def build_new_module_payload(source_module_name, source_module_data):
+    try:
+        registry_module_vcs_id = source_module_data['attributes']['vcs-repo']['oauth-token-id']
+        if registry_module_vcs_id in TFE_SOURCE_VCS_TYPES:
+            registry_module_vcs_type = TFE_SOURCE_VCS_TYPES[registry_module_vcs_id]
+        else:
+            logger.error("Could not find VCS Identifier in hardcoded list of VCS Providers Dict.")
+            exit()
+    except:
+        logging.warning(f"Failed to identify VCS Repo for Registry Module '{source_module_name}'. Will attempt migration with hardcoded default...")
+        registry_module_vcs_type = TFE_SOURCE_DEFAULT_MODULE_VCS_PROVIDER
+
+    # Build the new module payload
+    new_module_payload = {
+        "data": {
+            "attributes": {
+                "vcs-repo": {
+                    "identifier": source_module_data["attributes"]["vcs-repo"]["identifier"],
+                    "oauth-token-id": TFC_TARGET_VCS[registry_module_vcs_type],
+                    "display_identifier": source_module_data["attributes"]["vcs-repo"]["display-identifier"]
+                    }
+                },
+                "type": "registry-modules"
+            }
+        }
+    return new_module_payload
+
+def registry_module_key(registry_module):
+    return f"{registry_module['attributes']['name']}/{registry_module['attributes']['provider']}"
+
+def build_new_registry_module_payload(module_name, provider):
+    # Modules without a VCS repository are created empty, their versions are uploaded afterwards
+    return {
+        "data": {
+            "type": "registry-modules",
+            "attributes": {
+                "name": module_name,
+                "provider": provider,
+                "registry-name": "private"
+            }
+        }
+    }
+
+def list_registry_module_versions(client, module_name, provider):
+    modules = client.registry_modules.list_versions(module_name, provider)['modules']
+    return [version['version'] for module in modules for version in module['versions']]
+
+def stream_registry_module_version(download_url, download_headers, upload_url):
+    source_session = blob_session(TFE_SOURCE_VERIFY).session
+    response = source_session.get(download_url, headers=download_headers, allow_redirects=False)
+    response.raise_for_status()
+    # The download endpoint answers with the location of the archive in X-Terraform-Get
+    archive_url = urljoin(download_url, response.headers["X-Terraform-Get"])
+
+    # The tarball is piped from the Source download into the Target upload, never buffered in full
+    with source_session.get(archive_url, stream=True, headers={"Accept-Encoding": "identity"}) as archive:
+        archive.raise_for_status()
+        size = archive.headers.get("Content-Length")
+        body = PayloadReader(archive.raw, int(size)) if size else archive.iter_content(STATE_CHUNK_BYTES)
+        upload = blob_session(TFC_TARGET_VERIFY).session.put(upload_url, data=body)
+    upload.raise_for_status()
+
+    if size:
+        METRICS.record_bytes(urlparse(archive_url).netloc, "download", int(size))
+        METRICS.record_bytes(urlparse(upload_url).netloc, "upload", int(size))
+
+def upload_registry_module_versions(source, target, module_name, provider, target_versions=()):
+    versions = [version for version in list_registry_module_versions(source, module_name, provider) if version not in target_versions]
+    for version in versions:
+        version_payload = {"data": {"type": "registry-module-versions", "attributes": {"version": version}}}
+        upload_url = target.registry_modules.create_version(module_name, provider, version_payload)["data"]["links"]["upload"]
+        download_url = f"{source.get_url()}/api/registry/v1/modules/{source.get_org()}/{module_name}/{provider}/{version}/download"
+        REQUEST_SCHEDULER.call(upload_url, stream_registry_module_version, download_url, source._headers, upload_url, \
+            retry_server_errors=True, operation="module-version.transfer")
+    return versions
+
+def migrate_registry_module(source, target, source_module, target_module_exists):
+    module_name = source_module['attributes']['name']
+    provider = source_module['attributes']['provider']
+
+    # The registry-modules listing already includes the VCS settings of each Module
+    if source_module['attributes'].get('vcs-repo'):
+        if target_module_exists:
+            return {"status": "skipped", "done": True, "detail": "Registry Module already exists on target."}
+        target.registry_modules.publish_from_vcs(build_new_module_payload(module_name, source_module))
+        return {"status": "created", "done": True, "detail": "Published from VCS."}
+
+    target_versions = ()
+    if target_module_exists:
+        target_versions = set(list_registry_module_versions(target, module_name, provider))
+    else:
+        target.registry_modules.create(build_new_registry_module_payload(module_name, provider))
+    versions = upload_registry_module_versions(source, target, module_name, provider, target_versions)
+    return {"status": "created", "done": True, "detail": f"Uploaded {len(versions)} module versions."}
+
+@timed_phase("registry-modules")
+def create_target_registry_modules(source, target, journal=None, source_inventory=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating registry modules with {max_workers} workers...")
+
+    source_modules = source_inventory.modules()
+    # Modules whose versions failed to upload in a previous run are resumed even though they exist on the Target
+    failed_keys = journal.failed_keys()
+    pending_modules = []
+    for source_module in source_modules:
+        journal_key = registry_module_key(source_module)
+        if journal.is_done("registry-modules", journal_key):
             continue
-
-        if target_state_version_serials and current_source_version_number <= target_state_version_serials[0]:
-            logging.info( f"State Version: {current_source_version_number}, for workspace {workspace['attributes']['name']}, exists or is older than the current version. Skipped.")
+        target_module_exists = target_inventory.find("modules", name=journal_key) is not None
+        if target_module_exists and journal_key not in failed_keys:
+            logging.info(f"Registry Module {source_module['attributes']['name']} already exists on target.")
+            journal.record("registry-modules", journal_key)
             continue
-        
-        context = ssl.create_default_context()
-
-        if TFE_SOURCE_VERIFY is False:
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-        source_state_url = current_source_version["attributes"]["hosted-state-download-url"]
-        source_pull_state = request.urlopen(source_state_url, data=None, context=context)
-        source_state_data = source_pull_state.read()
-        source_state_json = json.loads(source_state_data)
-        source_state_serial = source_state_json["serial"]
-        source_state_lineage = source_state_json["lineage"]
-
-        source_state_hash = hashlib.md5()
-        source_state_hash.update(source_state_data)
-        source_state_md5 = source_state_hash.hexdigest()
-        source_state_b64 = base64.b64encode(source_state_data).decode("utf-8")
-
-        # Build the new state payload
-        create_state_version_payload = {
-            "data": {
-                "type": "state-versions",
-                "attributes": {
-                    "serial": source_state_serial,
-                    "md5": source_state_md5,
-                    "lineage": source_state_lineage,
-                    "state": source_state_b64
+        pending_modules.append((journal_key, source_module, target_module_exists))
+    completed = len(source_modules) - len(pending_modules)
+    if completed:
+        logging.info(f"{completed}/{len(source_modules)} Registry Modules completed in a previous run or existing on Target, skipped.")
+
+    statuses = {"created": 0, "skipped": 0}
+    failed = []
+    progress = Progress("Registry modules", len(pending_modules))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(migrate_registry_module, source, target, source_module, target_module_exists): journal_key \
+            for journal_key, source_module, target_module_exists in pending_modules}
+        for future in as_completed(futures):
+            journal_key = futures[future]
+            try:
+                result = future.result()
+            except TFCHTTPUnclassified:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as error:
+                result = {"status": "failed", "detail": repr(error)}
+
+            message = f"{progress.step()}: Registry Module {journal_key}, {result['status']}. {result['detail']}"
+            if result['status'] == "failed":
+                failed.append(journal_key)
+                logging.error(message)
+                journal.record("registry-modules", journal_key, status="failed", detail=result['detail'])
+            else:
+                statuses[result['status']] += 1
+                logging.info(message)
+                journal.record("registry-modules", journal_key)
+    progress.finish()
+
+    logging.info(f"Registry modules migrated. Created: {statuses['created']}, Skipped: {statuses['skipped']}, Failed: {len(failed)}.")
+    if failed:
+        logging.error(f"Failed to migrate registry modules: {', '.join(failed)}")
+
+def list_workspaces_concurrently(function, workspace_ids, max_workers):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(workspace_ids, executor.map(function, workspace_ids)))
+
+def list_team_access(client, workspace_ids, max_workers=MIGRATION_MAX_WORKERS):
+    # Team access can only be listed per Workspace
+    return list_workspaces_concurrently(lambda workspace_id: client.team_access.list(\
+        filters=[{"keys": ["workspace", "id"], "value": workspace_id}])["data"], workspace_ids, max_workers)
+
+def build_new_team_payload(source_team):
+    # Build the new team payload
+    new_team_payload = {
+        "data": {
+            "type": "teams",
+            "attributes": {
+                "name": source_team["attributes"]["name"],
+                "organization-access": {
+                    "manage-workspaces": source_team["attributes"]["organization-access"]["manage-workspaces"],
+                    "manage-policies": source_team["attributes"]["organization-access"]["manage-policies"],
+                    "manage-vcs-settings": source_team["attributes"]["organization-access"]["manage-vcs-settings"]
                 }
             }
         }
-        try:
-            target_workspace = target.workspaces.show(workspace['attributes']['name'])['data']
-        except TFCHTTPNotFound:
-            logger.warn(f"Target Workspace '{workspace['attributes']['name']}' not found. Re-execute script with [--migrate-workspaces] parameter, skipped.")
+    }
+    return new_team_payload
+
+def build_invite_payload(email, teams):
+    # Build the new user invite payload
+    new_user_invite_payload = {
+        "data": {
+            "attributes": {
+                "email": email
+            },
+            "relationships": {
+                "teams": {
+                    "data": teams
+                },
+            },
+            "type": "organization-memberships"
+        }
+    }
+    return new_user_invite_payload
+
+def build_team_access_payload(source_workspace_team, target_workspace_id, new_target_team_id):
+    new_workspace_team_payload = {
+        "data": {
+            "attributes": {
+                "access": source_workspace_team["attributes"]["access"]
+            },
+            "relationships": {
+                "workspace": {
+                    "data": {
+                        "type": "workspaces",
+                        "id": target_workspace_id
+                    }
+                },
+                "team": {
+                    "data": {
+                        "type": "teams",
+                        "id": new_target_team_id
+                    }
+                }
+            },
+            "type": "team-workspaces"
+        }
+    }
+
+    if source_workspace_team["attributes"]["access"] == "custom":
+        attributes_to_copy = [
+            "runs", "variables", "state-versions", "sentinel-mocks",
+            "workspace-locking"
+        ]
+
+        for attr in attributes_to_copy:
+            new_workspace_team_payload["data"]["attributes"][attr] = source_workspace_team["attributes"][attr]
+
+    return new_workspace_team_payload
+
+def team_access_additions(source_workspace_teams, target_workspace_teams, teams_map, target_workspace_id, workspace_name):
+    # Payloads for the Source team access missing on the Target Workspace, Teams that were not migrated are skipped
+    target_team_ids = {team["relationships"]["team"]["data"]["id"] for team in target_workspace_teams}
+    payloads = []
+    for source_workspace_team in source_workspace_teams:
+        source_team_id = source_workspace_team["relationships"]["team"]["data"]["id"]
+        new_target_team_id = teams_map.get(source_team_id)
+        if new_target_team_id is None:
+            logging.warning(f"Team '{source_team_id}' was not migrated, skipping its access to Workspace '{workspace_name}'.")
+        elif new_target_team_id not in target_team_ids:
+            payloads.append(build_team_access_payload(source_workspace_team, target_workspace_id, new_target_team_id))
+    return payloads
+
+def migrate_workspace_team_access(target, source_workspace, source_workspace_teams, teams_map, journal, target_inventory, progress=""):
+    workspace_name = source_workspace['attributes']['name']
+    if journal.is_done("team-access", source_workspace['id']):
+        logging.info(f"{progress}Team access for Workspace '{workspace_name}' completed in a previous run. Skipped.")
+        return {"workspace": workspace_name, "status": "skipped", "done": True, "detail": "Completed in a previous run."}
+
+    target_workspace = target_inventory.workspace(workspace_name)
+    if target_workspace is None:
+        logging.error(f"Workspace '{workspace_name}' does not exist on Target, skipping.")
+        return {"workspace": workspace_name, "status": "skipped", "detail": "Target Workspace not found."}
+    target_workspace_id = target_workspace['id']
+
+    # The Target side only needs listing when the Workspace has access for migrated Teams
+    target_workspace_teams = []
+    if any(team["relationships"]["team"]["data"]["id"] in teams_map for team in source_workspace_teams):
+        target_workspace_teams = list_team_access(target, [target_workspace_id], 1)[target_workspace_id]
+
+    payloads = team_access_additions(source_workspace_teams, target_workspace_teams, teams_map, target_workspace_id, workspace_name)
+    for payload in payloads:
+        logging.info(f"{progress}Adding Access for Team '{payload['data']['relationships']['team']['data']['id']}' to Workspace '{workspace_name}' on TFC Target...")
+        target.team_access.add_team_access(payload)
+
+    journal.record("team-access", source_workspace['id'])
+    return {"workspace": workspace_name, "status": "created" if payloads else "skipped", "done": True, \
+        "detail": f"Team access added for {len(payloads)} of {len(source_workspace_teams)} Teams."}
+
+def invite_org_member(target, email, teams):
+    # Returns the invitation outcome instead of raising, so one member never stops the others
+    try:
+        target_org_member = target.org_memberships.invite(build_invite_payload(email, teams))["data"]
+    except TFCHTTPUnclassified:
+        raise
+    except TFCHTTPConflict:
+        return {"status": "skipped", "detail": "Already a member of the Target organization."}
+    except RETRYABLE_INVITE_EXCEPTIONS + (requests_exceptions().RequestException,) as error:
+        return {"status": "retryable", "detail": repr(error)}
+    except TFCException as error:
+        # e.g. no user account exists for the email address
+        return {"status": "rejected", "detail": repr(error)}
+    return {"status": "invited", "user_id": target_org_member["relationships"]["user"]["data"]["id"], "detail": "Invited."}
+
+@timed_phase("org-memberships")
+def migrate_org_memberships(source, target, teams_map, journal=None, source_inventory=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating org memberships with {max_workers} workers...")
+
+    source_org_members = source_inventory.memberships(status="active")
+    target_org_members_data = {}
+    for target_org_member in target_inventory.memberships():
+        target_org_members_data[target_org_member["attributes"]["email"]] = target_org_member["id"]
+
+    org_membership_map = {}
+    summary = {"invited": 0, "skipped": 0, "retryable": [], "rejected": []}
+    previously_rejected = []
+    invitations = {}
+
+    for source_org_member in source_org_members:
+        source_org_member_email = source_org_member["attributes"]["email"]
+        source_org_member_id = source_org_member["relationships"]["user"]["data"]["id"]
+
+        if journal.is_done("org-memberships", source_org_member_id):
+            org_membership_map[source_org_member_id] = journal.detail("org-memberships", source_org_member_id)
+            summary["skipped"] += 1
             continue
-        # Migrate state to the target workspace
-        try:
-            target.workspaces.lock(target_workspace['id'], {"reason": "migration script"})
-        except TFCHTTPConflict:
-            target.workspaces.force_unlock(target_workspace['id'])
-            target.workspaces.lock(target_workspace['id'], {"reason": "migration script"})
 
-        target.state_versions.create(target_workspace['id'], create_state_version_payload)
-        target.workspaces.unlock(target_workspace['id'])
+        # Rejections are permanent (e.g. no user account for the email), re-inviting would only be rejected again
+        if journal.status("org-memberships", source_org_member_id) == "rejected":
+            org_membership_map[source_org_member_id] = None
+            previously_rejected.append(source_org_member_email)
+            continue
 
-        logging.info(f"Current state version for workspace: {workspace['attributes']['name']}, created.")
-    logging.info("Current state versions migrated.")
+        if source_org_member_email in target_org_members_data:
+            org_membership_map[source_org_member_id] = target_org_members_data[source_org_member_email]
 
-def create_target_registry_modules(source, target):
-    logging.info("Migrating registry modules...")
-    source_modules = source.registry_modules.list()['modules']
-    total = len(source_modules)
-    for source_module in source_modules:
-        try:
-            target.registry_modules.show(source_module['name'], source_module["provider"])["data"]
-            logging.info(f"({source_modules.index(source_module) + 1}/{total}): Registry Module {source_module['name']} already exists on target.")
-        except TFCHTTPNotFound as not_found:
-            logging.info(f"({source_modules.index(source_module) + 1}/{total}): Creating Registry Module {source_module['name']} on TFC Target...")
+            # TODO: should the team membership be checked for an existing org member
+            # and updated to match the source_org value if different?
+            summary["skipped"] += 1
+            continue
 
-            source_module_data = source.registry_modules.show(source_module['name'], source_module["provider"])["data"]
+        # Team IDs are mapped into new objects, the source inventory is left untouched
+        teams = []
+        for team in source_org_member["relationships"]["teams"]["data"]:
+            if team["id"] in teams_map:
+                teams.append({"type": "teams", "id": teams_map[team["id"]]})
+            else:
+                logging.warning(f"Team '{team['id']}' was not migrated, not adding {source_org_member_email} to it.")
+        invitations[source_org_member_id] = (source_org_member_email, teams)
+
+    if summary["skipped"]:
+        logging.info(f"{summary['skipped']}/{len(source_org_members)} Org members exist on Target or completed in a previous run, skipped.")
+    if previously_rejected:
+        logging.warning(f"{len(previously_rejected)} Org members were rejected by the Target in a previous run, skipped. " \
+            f"Remove their journal entries to invite them again: {', '.join(previously_rejected)}")
+
+    progress = Progress("Org membership invitations", len(invitations))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(invite_org_member, target, email, teams): source_org_member_id \
+            for source_org_member_id, (email, teams) in invitations.items()}
+        for future in as_completed(futures):
+            source_org_member_id = futures[future]
+            source_org_member_email = invitations[source_org_member_id][0]
             try:
-                registry_module_vcs_id = source_module_data['attributes']['vcs-repo']['oauth-token-id']
-                if registry_module_vcs_id in TFE_SOURCE_VCS.values():
-                    registry_module_vcs_type = list(TFE_SOURCE_VCS.keys())[list(TFE_SOURCE_VCS.values()).index(registry_module_vcs_id)]  
+                result = future.result()
+            except TFCHTTPUnclassified:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            position = progress.step()
+
+            if result["status"] == "invited":
+                summary["invited"] += 1
+                org_membership_map[source_org_member_id] = result["user_id"]
+                journal.record("org-memberships", source_org_member_id, detail=result["user_id"])
+                logging.info(f"{position}: Org member: {source_org_member_email}, invited.")
+            elif result["status"] == "skipped":
+                summary["skipped"] += 1
+                journal.record("org-memberships", source_org_member_id)
+                logging.info(f"{position}: Org member: {source_org_member_email}, exists. Skipped.")
+            else:
+                org_membership_map[source_org_member_id] = None
+                summary[result["status"]].append(source_org_member_email)
+                journal.record("org-memberships", source_org_member_id, \
+                    status="rejected" if result["status"] == "rejected" else "failed", detail=result["detail"])
+                logging.warning(f"{position}: Org member: {source_org_member_email}, {result['status']}. {result['detail']}")
+    progress.finish()
+
+    logging.info(f"Org memberships migrated. Invited: {summary['invited']}, Skipped: {summary['skipped']}, " \
+        f"Failed (retryable): {len(summary['retryable'])}, Failed (rejected): {len(summary['rejected'])}.")
+    if summary["retryable"]:
+        logging.error(f"Invitations to retry in a later run: {', '.join(summary['retryable'])}")
+    if summary["rejected"]:
+        logging.warning(f"Invitations rejected by the Target, e.g. no user account for the email: {', '.join(summary['rejected'])}")
+    return org_membership_map
+
+@timed_phase("team-access")
+def migrate_team_access(source, target, teams_map, journal=None, source_inventory=None, target_inventory=None, max_workers=MIGRATION_MAX_WORKERS):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
+    logging.info(f"Migrating team access with {max_workers} workers...")
+
+    source_workspaces = source_inventory.workspaces()
+    target_workspace_ids = {}
+    for source_workspace in source_workspaces:
+        if journal.is_done("team-access", source_workspace['id']):
+            continue
+        target_workspace = target_inventory.workspace(source_workspace['attributes']['name'])
+        if target_workspace is None:
+            logging.error(f"Workspace '{source_workspace['attributes']['name']}' does not exist on Target, skipping.")
+            continue
+        target_workspace_ids[source_workspace['id']] = target_workspace['id']
+    workspace_names = {source_workspace['id']: source_workspace['attributes']['name'] for source_workspace in source_workspaces}
+    completed = len(source_workspaces) - len(target_workspace_ids)
+    if completed:
+        logging.info(f"{completed}/{len(source_workspaces)} Workspaces' team access completed in a previous run or missing on Target, skipped.")
+
+    # Both sides are listed up front, then only the missing (Workspace, Team) pairs are added
+    source_access = list_team_access(source, list(target_workspace_ids), max_workers)
+    target_access = list_team_access(target, list(target_workspace_ids.values()), max_workers)
+
+    additions = {}
+    for source_workspace_id, target_workspace_id in target_workspace_ids.items():
+        additions[source_workspace_id] = team_access_additions(source_access[source_workspace_id], target_access[target_workspace_id], \
+            teams_map, target_workspace_id, workspace_names[source_workspace_id])
+
+    remaining = {source_workspace_id: len(payloads) for source_workspace_id, payloads in additions.items()}
+    failed = set()
+    errors = 0
+    for source_workspace_id in [source_workspace_id for source_workspace_id, count in remaining.items() if not count]:
+        journal.record("team-access", source_workspace_id)
+
+    progress = Progress("Team access", sum(remaining.values()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for source_workspace_id, payloads in additions.items():
+            for payload in payloads:
+                futures[executor.submit(target.team_access.add_team_access, payload)] = (source_workspace_id, payload)
+
+        for future in as_completed(futures):
+            source_workspace_id, payload = futures[future]
+            team_id = payload["data"]["relationships"]["team"]["data"]["id"]
+            try:
+                future.result()
+                logging.info(f"{progress.step()}: Added Access for Team '{team_id}' to Workspace '{workspace_names[source_workspace_id]}'.")
+            except TFCHTTPUnclassified:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as error:
+                failed.add(source_workspace_id)
+                errors += 1
+                logging.error(f"{progress.step()}: Failed to add Access for Team '{team_id}' to Workspace '{workspace_names[source_workspace_id]}'. {error!r}")
+
+            remaining[source_workspace_id] -= 1
+            if not remaining[source_workspace_id]:
+                if source_workspace_id in failed:
+                    journal.record("team-access", source_workspace_id, status="failed")
                 else:
-                    logger.error("Could not find VCS Identifier in hardcoded list of VCS Providers Dict.")
-                    exit()
-            except:
-                logging.warning(f"Failed to identify VCS Repo for Registry Module '{source_module['name']}'. Will attempt migration with hardcoded default...")
-                registry_module_vcs_type = TFE_SOURCE_DEFAULT_MODULE_VCS_PROVIDER
-
-            # Build the new module payload
-            new_module_payload = {
-                "data": {
-                    "attributes": {
-                        "vcs-repo": {
-                            "identifier": source_module_data["attributes"]["vcs-repo"]["identifier"],
-                            "oauth-token-id": TFC_TARGET_VCS[registry_module_vcs_type],
-                            "display_identifier": source_module_data["attributes"]["vcs-repo"]["display-identifier"]
-                            }
-                        },
-                        "type": "registry-modules"
-                    }
-                }
-            # Create the module in the target organization
-            target.registry_modules.publish_from_vcs(new_module_payload)
-
-    logging.info("Registry modules migrated.")
-
-def migrate_teams(source, target):
+                    journal.record("team-access", source_workspace_id)
+    progress.finish()
+
+    logging.info(f"Team access migrated. Added: {progress.completed - errors}, Failed: {errors}, " \
+        f"Workspaces unchanged: {sum(1 for payloads in additions.values() if not payloads)}.")
+    if failed:
+        logging.error(f"Failed to migrate team access for workspaces: {', '.join(workspace_names[source_workspace_id] for source_workspace_id in failed)}")
+
+@timed_phase("teams")
+def migrate_teams(source, target, journal=None, source_inventory=None, target_inventory=None, migrate_access=True, max_workers=MIGRATION_MAX_WORKERS):
+    journal = journal or MigrationJournal()
+    source_inventory = source_inventory or OrganizationInventory(source)
+    target_inventory = target_inventory or OrganizationInventory(target)
     teams_map = {}
 
     # Fetch teams from existing org
-    source_teams = source.teams.list()["data"]
-    target_teams = target.teams.list()["data"]
+    source_teams = source_inventory.teams()
+    target_teams = target_inventory.teams()
     total = len(source_teams)
 
     target_teams_data = {}
@@ -481,246 +2743,604 @@ def migrate_teams(source, target):
             new_org_owners_team_id = source_team["id"]
             break
 
+    progress = Progress("Teams", total)
     for source_team in source_teams:        
         source_team_name = source_team["attributes"]["name"]
+        position = progress.step()
+
+        if journal.is_done("teams", source_team["id"]):
+            teams_map[source_team["id"]] = journal.detail("teams", source_team["id"])
+            logging.info(f"{position}: '{source_team['attributes']['name']}' completed in a previous run. Skipped.")
+            continue
 
         if source_team_name in target_teams_data:
             teams_map[source_team["id"]] = target_teams_data[source_team_name]
-            logging.info(f"({source_teams.index(source_team) + 1}/{total}): '{source_team['attributes']['name']}' already exists. Skipped.")
+            journal.record("teams", source_team["id"], detail=teams_map[source_team["id"]])
+            logging.info(f"{position}: '{source_team['attributes']['name']}' already exists. Skipped.")
             continue
 
         if source_team_name == "owners":
             # No need to create a team, it's the owners team
             teams_map[source_team["id"]] = new_org_owners_team_id
         else:
-            # Build the new team payload
-            new_team_payload = {
-                "data": {
-                    "type": "teams",
-                    "attributes": {
-                        "name": source_team_name,
-                        "organization-access": {
-                            "manage-workspaces": source_team["attributes"]["organization-access"]["manage-workspaces"],
-                            "manage-policies": source_team["attributes"]["organization-access"]["manage-policies"],
-                            "manage-vcs-settings": source_team["attributes"]["organization-access"]["manage-vcs-settings"]
-                        }
-                    }
-                }
-            }
+            new_team_payload = build_new_team_payload(source_team)
 
             # Create team in the target org
-            logging.info(f"({source_teams.index(source_team) + 1}/{total}): Migrating '{source_team['attributes']['name']}' onto target.")
+            logging.info(f"{position}: Migrating '{source_team['attributes']['name']}' onto target.")
             new_team = target.teams.create(new_team_payload)
+            target_inventory.add("teams", new_team["data"])
             logging.info(f"Team '{source_team_name}' has been created.")
 
             # Build Team ID Map
             teams_map[source_team["id"]] = new_team["data"]["id"]
+            journal.record("teams", source_team["id"], detail=teams_map[source_team["id"]])
 
     logging.info("Teams migrated.")
 
-    logging.info("Migrating org memberships...")
-
-    # Set proper membership filters
-    active_member_filter = [
-        {
-            "keys": ["status"],
-            "value": "active"
-        }
-    ]
-
-    source_org_members = source.org_memberships.list_all_for_org(filters=active_member_filter)['data']
-    target_org_members = target.org_memberships.list_all_for_org()['data']
-
-    target_org_members_data = {}
-    for target_org_member in target_org_members:
-        target_org_members_data[target_org_member["attributes"]["email"]] = target_org_member["id"]
-
-    org_membership_map = {}
-
-    for source_org_member in source_org_members:
-        source_org_member_email = source_org_member["attributes"]["email"]
-        source_org_member_id = source_org_member["relationships"]["user"]["data"]["id"]
-
-        if source_org_member_email in target_org_members_data:
-            org_membership_map[source_org_member_id] = target_org_members_data[source_org_member_email]
-
-            # TODO: should the team membership be checked for an existing org member
-            # and updated to match the source_org value if different?
-            logging.info(f"Org member: {source_org_member_email}, exists. Skipped.")
-            continue
-
-        for team in source_org_member["relationships"]["teams"]["data"]:
-            team["id"] = teams_map[team["id"]]
-
-        # Build the new user invite payload
-        new_user_invite_payload = {
-            "data": {
-                "attributes": {
-                    "email": source_org_member_email
-                },
-                "relationships": {
-                    "teams": {
-                        "data": source_org_member["relationships"]["teams"]["data"]
-                    },
-                },
-                "type": "organization-memberships"
-            }
-        }
+    migrate_org_memberships(source, target, teams_map, journal, source_inventory, target_inventory, max_workers)
+
+    if not migrate_access:
+        return teams_map
+
+    migrate_team_access(source, target, teams_map, journal, source_inventory, target_inventory, max_workers)
+    return teams_map
+
+class WorkspaceTaskGraph:
+    def __init__(self, concurrency, description="Workspace pipeline tasks"):
+        self.concurrency = concurrency
+        self.description = description
+        self._tasks = {}
+        self._dependents = {}
+
+    def add(self, key, task_type, task, dependencies=()):
+        # Tasks are keyed by (workspace name, task name) and start once every dependency is done. A task
+        # returning status "retry" is run again as the returned "task" once its "delay" in seconds has passed.
+        self._tasks[key] = {"type": task_type, "task": task, "dependencies": list(dependencies)}
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, []).append(key)
+
+    def _log(self, key, result):
+        workspace_name, task_name = key
+        message = f"{self._progress.step()}: {task_name.capitalize()} for workspace: {workspace_name}, {result['status']}. {result['detail']}"
+        if result['status'] == "failed":
+            logging.error(message)
+        else:
+            logging.info(message)
+
+    def _skip(self, key, dependency, results):
+        if key in results:
+            return
+        results[key] = {"status": "skipped", "detail": f"{dependency[1].capitalize()} did not complete."}
+        self._log(key, results[key])
+        for dependent in self._dependents.get(key, []):
+            self._skip(dependent, key, results)
+
+    def run(self):
+        results = {}
+        self._progress = Progress(self.description, len(self._tasks))
+        waiting = {key: len(task["dependencies"]) for key, task in self._tasks.items()}
+        executors = {task_type: ThreadPoolExecutor(max_workers=workers) for task_type, workers in self.concurrency.items()}
+        futures = {}
+
+        def timed(key):
+            with METRICS.task(key[1].replace(' ', '-')):
+                return self._tasks[key]["task"]()
+
+        def submit(key):
+            futures[executors[self._tasks[key]["type"]].submit(timed, key)] = key
+
+        # Retried tasks wait in a queue ordered by due time
+        retry_queue = []
+        retry_sequence = 0
 
-        # try statement required in case a user account tied to the email address does
-        # not yet exist
         try:
-            target_org_member = target.org_memberships.invite(new_user_invite_payload)["data"]
-        except:
-            org_membership_map[source_org_member["relationships"]["user"]["data"]["id"]] = None
-            logging.info(f"User account for email: {source_org_member_email} does not exist. Skipped.")
-            continue
+            for key, dependencies in waiting.items():
+                if not dependencies:
+                    submit(key)
+            while futures or retry_queue:
+                while retry_queue and retry_queue[0][0] <= time.monotonic():
+                    submit(heapq.heappop(retry_queue)[2])
+
+                timeout = max(0.0, retry_queue[0][0] - time.monotonic()) if retry_queue else None
+                if not futures:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except TFCHTTPUnclassified:
+                        # Authentication/proxy failures affect every workspace, stop scheduling new work
+                        raise
+                    except Exception as error:
+                        result = {"status": "failed", "detail": repr(error)}
+                    if result['status'] == "retry":
+                        self._tasks[key]["task"] = result["task"]
+                        retry_sequence += 1
+                        heapq.heappush(retry_queue, (time.monotonic() + result["delay"], retry_sequence, key))
+                        continue
+                    results[key] = result
+                    self._log(key, result)
+
+                    for dependent in self._dependents.get(key, []):
+                        if not result.get("done"):
+                            self._skip(dependent, key, results)
+                            continue
+                        waiting[dependent] -= 1
+                        if not waiting[dependent] and dependent not in results:
+                            submit(dependent)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        self._progress.finish()
+        task_names = []
+        for workspace_name, task_name in self._tasks:
+            if task_name not in task_names:
+                task_names.append(task_name)
+        for task_name in task_names:
+            task_results = [result for (workspace_name, name), result in results.items() if name == task_name]
+            created = sum(1 for result in task_results if result['status'] == "created")
+            updated = sum(1 for result in task_results if result['status'] == "updated")
+            skipped = sum(1 for result in task_results if result['status'] == "skipped")
+            failed = [workspace_name for (workspace_name, name), result in results.items() if name == task_name and result['status'] == "failed"]
+            logging.info(f"{task_name.capitalize()} migrated. Created: {created}, Updated: {updated}, Skipped: {skipped}, Failed: {len(failed)}.")
+            if failed:
+                logging.error(f"Failed to migrate {task_name} for workspaces: {', '.join(failed)}")
+        return results
+
+@timed_phase("pipeline")
+def run_workspace_pipeline(source, target, args, journal, source_inventory, target_inventory, teams_map=None, agent_pool_id=None, changed=None):
+    # Source Workspace IDs per kind of change since the last sync, whose existing Target objects are updated
+    changed = changed or {kind: set() for kind in SyncState.KINDS}
+    concurrency = {task_type: args.max_workers for task_type in PIPELINE_TASK_TYPES}
+    concurrency.update(args.task_concurrency)
+    graph = WorkspaceTaskGraph(concurrency)
+
+    workspace_variables = {}
+    if args.create_workspace_vars:
+        workspace_variables = group_workspace_variables(args.var_file_path, journal)[0]
+
+    execution_mode_payload = None
+    if args.update_workspace_execution:
+        if args.execution_mode == 'agent' and target._hostname != 'app.terraform.io':
+            logging.warning(f"Execution Mode '{args.execution_mode}' is not available for non TFC Workspaces.")
+        else:
+            execution_mode_payload = build_execution_mode_payload(args.execution_mode, agent_pool_id)
 
-        new_user_id = target_org_member["relationships"]["user"]["data"]["id"]
-        org_membership_map[source_org_member["relationships"]["user"]["data"]["id"]] = new_user_id
+    def find_target_workspace(workspace_name):
+        if target_inventory.workspace(workspace_name) is None:
+            return {"status": "skipped", "detail": "Target Workspace not found. Re-execute script with [--migrate-workspaces] parameter."}
+        return {"status": "skipped", "done": True, "detail": "Workspace exists on target."}
 
-    logging.info("Org memberships migrated.")
+    source_workspaces = source_inventory.workspaces()
+    source_team_access = {}
+    if args.migrate_teams:
+        # Source team access is listed up front like migrate_team_access, leaving each task only the Target side
+        source_team_access = list_team_access(source, [source_workspace['id'] for source_workspace in source_workspaces \
+            if not journal.is_done("team-access", source_workspace['id'])], args.max_workers)
 
-    logging.info("Migrating team access...")
-    source_workspaces = source.workspaces.list_all()['data']
-    total = len(source_workspaces)
     for source_workspace in source_workspaces:
-        # Set proper workspace team filters to pull team access for each
-        # workspace
-        source_workspace_team_filters = [
-            {
-                "keys": ["workspace", "id"],
-                "value": source_workspace['id']
-            }
-        ]
+        workspace_name = source_workspace['attributes']['name']
+        workspace_key = (workspace_name, "workspace")
+        if args.migrate_workspaces:
+            graph.add(workspace_key, "workspace", partial(migrate_workspace, target, source_workspace, journal, target_inventory, \
+                update_workspace_ids=changed["workspaces"]))
+        else:
+            graph.add(workspace_key, "workspace", partial(find_target_workspace, workspace_name))
 
-        # Pull teams from the old workspace
-        source_workspace_teams = source.team_access.list(\
-            filters=source_workspace_team_filters)["data"]
+        if args.migrate_teams:
+            graph.add((workspace_name, "team access"), "team-access", partial(migrate_workspace_team_access, \
+                target, source_workspace, source_team_access.get(source_workspace['id'], []), teams_map, journal, target_inventory), [workspace_key])
 
-        try:
-            target_workspace = target.workspaces.show(source_workspace['attributes']['name'])['data']
-        except TFCHTTPNotFound as exception:
-            logging.error(f"Workspace '{source_workspace['attributes']['name']}' does not exist on Target, skipping.")
-            continue
+        if workspace_name in workspace_variables:
+            graph.add((workspace_name, "workspace variables"), "variables", partial(deploy_workspace_variables, \
+                target, workspace_name, workspace_variables.pop(workspace_name), journal, target_inventory, changed["variables"]), [workspace_key])
 
-        target_workspace_id = target_workspace['id']
-        target_workspace_team_filters = [
-            {
-                "keys": ["workspace", "id"],
-                "value": target_workspace_id
-            }
-        ]
+        if execution_mode_payload and args.workspace_identifier in workspace_name.lower():
+            graph.add((workspace_name, "execution mode"), "execution-mode", partial(update_workspace_execution_mode, \
+                target, workspace_name, execution_mode_payload), [workspace_key])
 
-        target_workspace_teams = target.team_access.list(filters=target_workspace_team_filters)["data"]
-        target_team_ids = [team["relationships"]["team"]["data"]["id"] for team in target_workspace_teams]
+        if args.update_workspace_varsets:
+            graph.add((workspace_name, "variable sets"), "varsets", \
+                lambda workspace_name=workspace_name: apply_variable_sets_to_workspace(target, target_inventory.workspace(workspace_name)), [workspace_key])
+
+        # State history has to land before the current state, whose serial is newer
+        state_dependencies = [workspace_key]
+        if args.migrate_state_history:
+            history_task = partial(migrate_workspace_state_history, source, target, source_workspace, target_inventory, \
+                args.state_history_max_versions, args.state_history_max_age_days)
+            graph.add((workspace_name, "state version history"), "state", partial(run_journaled_workspace_task, \
+                journal, "state-history", source_workspace, history_task), [workspace_key])
+            state_dependencies.append((workspace_name, "state version history"))
 
-        for source_workspace_team in source_workspace_teams:
-            new_target_team_id = teams_map[source_workspace_team["relationships"]["team"]["data"]["id"]]
+        if args.migrate_current_state:
+            current_state_task = partial(migrate_workspace_state, source, target, source_workspace, target_inventory)
+            graph.add((workspace_name, "current state version"), "state", partial(run_journaled_workspace_task, \
+                journal, "current-state", source_workspace, current_state_task), state_dependencies)
 
-            if new_target_team_id in target_team_ids:
-                logging.info(f"({source_workspaces.index(source_workspace) + 1}/{total}): '{new_target_team_id}' Team access for Workspace '{source_workspace['attributes']['name']}' exists. Skipped.")
-                continue
+    for workspace_name, variables in workspace_variables.items():
+        logging.error(f"Workspace '{workspace_name}' does not exist on Source, skipping {len(variables)} Workspace Variables.")
 
-            new_workspace_team_payload = {
-                "data": {
-                    "attributes": {
-                        "access": source_workspace_team["attributes"]["access"]
-                    },
-                    "relationships": {
-                        "workspace": {
-                            "data": {
-                                "type": "workspaces",
-                                "id": target_workspace_id
-                            }
-                        },
-                        "team": {
-                            "data": {
-                                "type": "teams",
-                                "id": new_target_team_id
-                            }
-                        }
-                    },
-                    "type": "team-workspaces"
-                }
-            }
+    logging.info(f"Migrating {len(source_workspaces)} Workspaces as a pipeline with workers: {concurrency}...")
+    return graph.run()
 
-            if source_workspace_team["attributes"]["access"] == "custom":
-                attributes_to_copy = [
-                    "runs", "variables", "state-versions", "sentinel-mocks",
-                    "workspace-locking"
-                ]
+def current_state_serial(client, workspace_id):
+    try:
+        state_version = client.state_versions.get_current(workspace_id)["data"]
+    except TFCHTTPNotFound:
+        return None
+    return {"id": state_version["id"], "serial": state_version["attributes"]["serial"]}
+
+@timed_phase("plan")
+def build_migration_plan(source, target, args, source_inventory, target_inventory, agent_pool_id=None):
+    plan = {
+        "created-at": datetime.now(timezone.utc).isoformat(),
+        "source": {"url": source.get_url(), "organization": source.get_org()},
+        "target": {"url": target.get_url(), "organization": target.get_org()},
+        "var-file-path": args.var_file_path,
+        # Target IDs known at plan time, IDs of created objects are added when the plan is applied
+        "targets": {
+            "teams": {},
+            "workspaces": {workspace['attributes']['name']: workspace['id'] for workspace in target_inventory.workspaces()}
+        },
+        "summary": {},
+        "actions": []
+    }
+
+    def add(phase, action, key, **fields):
+        summary = plan["summary"].setdefault(phase, {})
+        summary[action] = summary.get(action, 0) + 1
+        # Skipped and unsupported changes are only counted
+        if action not in ("skip", "unsupported"):
+            plan["actions"].append({"phase": phase, "action": action, "key": key, **fields})
+
+    source_workspaces = source_inventory.workspaces()
+    target_workspace_ids = plan["targets"]["workspaces"]
+
+    # Workspaces that exist on the Target or are created by the plan, changes to any other Workspace are unsupported
+    planned_workspaces = set(target_workspace_ids)
+    if args.migrate_workspaces:
+        for source_workspace in source_workspaces:
+            workspace_name = source_workspace['attributes']['name']
+            if workspace_name in target_workspace_ids:
+                add("workspaces", "skip", source_workspace['id'])
+                continue
+            new_workspace_payload = build_new_workspace_payload(source_workspace)
+            if new_workspace_payload is None:
+                add("workspaces", "unsupported", source_workspace['id'], workspace=workspace_name)
+                continue
+            add("workspaces", "create", source_workspace['id'], workspace=workspace_name, payload=new_workspace_payload)
+            planned_workspaces.add(workspace_name)
+
+    if args.migrate_teams:
+        target_team_ids = {team["attributes"]["name"]: team["id"] for team in target_inventory.teams()}
+        for source_team in source_inventory.teams():
+            if source_team["attributes"]["name"] in target_team_ids:
+                plan["targets"]["teams"][source_team["id"]] = target_team_ids[source_team["attributes"]["name"]]
+                add("teams", "skip", source_team["id"])
+            else:
+                add("teams", "create", source_team["id"], name=source_team["attributes"]["name"], payload=build_new_team_payload(source_team))
 
-                for attr in attributes_to_copy:
-                    new_workspace_team_payload["data"]["attributes"][attr] = source_workspace_team["attributes"][attr]
+        target_emails = {member["attributes"]["email"] for member in target_inventory.memberships()}
+        for source_org_member in source_inventory.memberships(status="active"):
+            source_org_member_email = source_org_member["attributes"]["email"]
+            if source_org_member_email in target_emails:
+                add("org-memberships", "skip", source_org_member["relationships"]["user"]["data"]["id"])
+            else:
+                add("org-memberships", "create", source_org_member["relationships"]["user"]["data"]["id"], email=source_org_member_email, \
+                    teams=[team["id"] for team in source_org_member["relationships"]["teams"]["data"]])
+
+        source_access = list_team_access(source, [workspace['id'] for workspace in source_workspaces], args.max_workers)
+        target_access = list_team_access(target, list(target_workspace_ids.values()), args.max_workers)
+        for source_workspace in source_workspaces:
+            workspace_name = source_workspace['attributes']['name']
+            target_team_ids = {team["relationships"]["team"]["data"]["id"] for team in \
+                target_access.get(target_workspace_ids.get(workspace_name), [])}
+            for source_workspace_team in source_access[source_workspace['id']]:
+                source_team_id = source_workspace_team["relationships"]["team"]["data"]["id"]
+                if plan["targets"]["teams"].get(source_team_id) in target_team_ids:
+                    add("team-access", "skip", f"{source_workspace['id']}:{source_team_id}")
+                elif workspace_name not in planned_workspaces:
+                    add("team-access", "unsupported", f"{source_workspace['id']}:{source_team_id}", workspace=workspace_name)
+                else:
+                    add("team-access", "create", f"{source_workspace['id']}:{source_team_id}", workspace=workspace_name, team=source_team_id, \
+                        payload=build_team_access_payload(source_workspace_team, None, None))
+
+    if args.migrate_registry_modules:
+        for source_module in source_inventory.modules():
+            journal_key = registry_module_key(source_module)
+            module_name = source_module['attributes']['name']
+            if target_inventory.find("modules", name=journal_key) is not None:
+                add("registry-modules", "skip", journal_key)
+            elif source_module['attributes'].get('vcs-repo'):
+                add("registry-modules", "create", journal_key, payload=build_new_module_payload(module_name, source_module))
+            else:
+                add("registry-modules", "create", journal_key, \
+                    payload=build_new_registry_module_payload(module_name, source_module['attributes']['provider']))
+
+    if args.create_workspace_vars:
+        # Variables of every Target Workspace are listed with one request
+        target_variable_keys = {}
+        for target_variable in target.vars.list()["data"]:
+            target_variable_keys.setdefault(target_variable['relationships']['configurable']['data']['id'], set()).add(target_variable['attributes']['key'])
+        workspace_variables = group_workspace_variables(args.var_file_path, MigrationJournal())[0]
+        for workspace_name, variables in workspace_variables.items():
+            existing_keys = target_variable_keys.get(target_workspace_ids.get(workspace_name), set())
+            for journal_key, sensitive_variable in variables:
+                if sensitive_variable['variable_key'] in existing_keys:
+                    add("workspace-variables", "skip", journal_key)
+                elif workspace_name not in planned_workspaces:
+                    add("workspace-variables", "unsupported", journal_key, workspace=workspace_name)
+                else:
+                    add("workspace-variables", "create", journal_key, workspace=workspace_name, variable=sensitive_variable['variable_key'])
 
-            # Create the team workspace access map for the target workspace
-            logging.info(f"({source_workspaces.index(source_workspace) + 1}/{total}): Adding Access for Team '{new_target_team_id}' to Workspace '{source_workspace['attributes']['name']}' on TFC Target...")
-            target.team_access.add_team_access(new_workspace_team_payload)
+    if args.update_workspace_execution and not (args.execution_mode == 'agent' and target._hostname != 'app.terraform.io'):
+        execution_mode_payload = build_execution_mode_payload(args.execution_mode, agent_pool_id)
+        for workspace_name in sorted(planned_workspaces):
+            if args.workspace_identifier not in workspace_name.lower():
+                continue
+            target_workspace = target_inventory.workspace(workspace_name)
+            if target_workspace is not None and execution_mode_matches(target_workspace, args.execution_mode, agent_pool_id):
+                add("execution-mode", "skip", workspace_name)
+            else:
+                add("execution-mode", "update", workspace_name, workspace=workspace_name, payload=execution_mode_payload)
+
+    if args.update_workspace_varsets:
+        # Workspaces each Variable Set is already applied to, one request per Variable Set
+        varset_workspace_ids = {}
+        for var_set_id in set(TFC_TARGET_VAR_SETS.values()):
+            relationships = target.var_sets.show(var_set_id)["data"]["relationships"]
+            varset_workspace_ids[var_set_id] = {workspace["id"] for workspace in relationships.get("workspaces", {}).get("data", [])}
+        for workspace_name in sorted(planned_workspaces):
+            for var_set in TFC_TARGET_VAR_SETS:
+                if var_set not in workspace_name.lower():
+                    continue
+                var_set_id = TFC_TARGET_VAR_SETS[var_set]
+                if target_workspace_ids.get(workspace_name) in varset_workspace_ids[var_set_id]:
+                    add("varsets", "skip", f"{var_set_id}:{workspace_name}")
+                else:
+                    add("varsets", "apply", f"{var_set_id}:{workspace_name}", workspace=workspace_name, varset=var_set_id)
+
+    if args.migrate_current_state:
+        # Current State Versions can only be read per Workspace
+        source_serials = list_workspaces_concurrently(lambda workspace_id: current_state_serial(source, workspace_id), \
+            [workspace['id'] for workspace in source_workspaces], args.max_workers)
+        target_serials = list_workspaces_concurrently(lambda workspace_id: current_state_serial(target, workspace_id), \
+            list(target_workspace_ids.values()), args.max_workers)
+        for source_workspace in source_workspaces:
+            workspace_name = source_workspace['attributes']['name']
+            source_serial = source_serials[source_workspace['id']]
+            target_serial = target_serials.get(target_workspace_ids.get(workspace_name))
+            if source_serial is None or (target_serial is not None and source_serial["serial"] <= target_serial["serial"]):
+                add("current-state", "skip", source_workspace['id'])
+            elif workspace_name not in planned_workspaces:
+                add("current-state", "unsupported", source_workspace['id'], workspace=workspace_name)
+            else:
+                add("current-state", "create", f"{source_workspace['id']}:{source_serial['id']}", workspace=workspace_name, \
+                    source_workspace_id=source_workspace['id'], state_version_id=source_serial['id'], serial=source_serial['serial'])
+
+    for phase in PLAN_PHASES:
+        if phase in plan["summary"]:
+            logging.info(f"Plan for {phase}: {', '.join(f'{action}: {count}' for action, count in plan['summary'][phase].items())}.")
+    return plan
+
+def write_migration_plan(plan, filepath):
+    with open(filepath, "w", encoding="utf-8") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+    logging.info(f"Migration plan with {len(plan['actions'])} changes written to '{filepath}'.")
+
+def apply_plan_action(source, target, action, targets, variables):
+    phase = action["phase"]
+    if phase == "teams":
+        new_team = target.teams.create(action["payload"])
+        targets["teams"][action["key"]] = new_team["data"]["id"]
+        return new_team["data"]["id"]
+    elif phase == "org-memberships":
+        teams = [{"type": "teams", "id": targets["teams"][team_id]} for team_id in action["teams"] if team_id in targets["teams"]]
+        target_org_member = target.org_memberships.invite(build_invite_payload(action["email"], teams))["data"]
+        return target_org_member["relationships"]["user"]["data"]["id"]
+    elif phase == "registry-modules":
+        attributes = action["payload"]["data"]["attributes"]
+        if "vcs-repo" in attributes:
+            target.registry_modules.publish_from_vcs(action["payload"])
+        else:
+            target.registry_modules.create(action["payload"])
+            upload_registry_module_versions(source, target, attributes["name"], attributes["provider"])
+    elif phase == "workspaces":
+        new_workspace = target.workspaces.create(action["payload"])
+        targets["workspaces"][action["workspace"]] = new_workspace["data"]["id"]
+        return new_workspace["data"]["id"]
+    elif phase == "team-access":
+        payload = action["payload"]
+        payload["data"]["relationships"]["workspace"]["data"]["id"] = targets["workspaces"][action["workspace"]]
+        payload["data"]["relationships"]["team"]["data"]["id"] = targets["teams"][action["team"]]
+        target.team_access.add_team_access(payload)
+    elif phase == "workspace-variables":
+        sensitive_variable = variables[action["key"]]
+        target.workspace_vars.create(targets["workspaces"][action["workspace"]], build_workspace_variable_payload(sensitive_variable))
+    elif phase == "execution-mode":
+        target.workspaces.update(action["payload"], action["workspace"])
+    elif phase == "varsets":
+        payload = {"data": [{"type": "workspaces", "id": targets["workspaces"][action["workspace"]]}]}
+        target.var_sets.apply_varset_to_workspace(action["varset"], payload)
+    elif phase == "current-state":
+        state_version = source.state_versions.show(action["state_version_id"])["data"]
+        source_state = fetch_state_blob(action["source_workspace_id"], state_version)
+        upload_workspace_state(target, targets["workspaces"][action["workspace"]], source_state, action["workspace"])
+    return None
+
+@timed_phase("apply-plan")
+def apply_migration_plan(source, target, filepath, journal=None, max_workers=MIGRATION_MAX_WORKERS):
+    journal = journal or MigrationJournal()
+    with open(filepath, "r", encoding="utf-8") as plan_file:
+        plan = json.load(plan_file)
+    if plan["target"]["url"] != target.get_url() or plan["target"]["organization"] != target.get_org():
+        logging.error(f"Plan '{filepath}' was built for {plan['target']['organization']} at '{plan['target']['url']}', not the configured Target.")
+        exit()
 
-    logging.info("Team access migrated.")
+    targets = plan["targets"]
+    # Teams and Workspaces created by a previous run are recorded in the journal
+    for action in plan["actions"]:
+        if action["phase"] in ("teams", "workspaces") and journal.is_done(action["phase"], action["key"]) \
+                and journal.detail(action["phase"], action["key"]):
+            collection = targets[action["phase"]]
+            collection[action["key"] if action["phase"] == "teams" else action["workspace"]] = journal.detail(action["phase"], action["key"])
+
+    variables = {}
+    if any(action["phase"] == "workspace-variables" for action in plan["actions"]):
+        for workspace_name, workspace_variables in group_workspace_variables(plan["var-file-path"], MigrationJournal())[0].items():
+            variables.update(workspace_variables)
+
+    logging.info(f"Applying {len(plan['actions'])} changes from plan '{filepath}' created at {plan['created-at']}...")
+    for phase in PLAN_PHASES:
+        actions = [action for action in plan["actions"] if action["phase"] == phase and not journal.is_done(phase, action["key"])]
+        if not actions:
+            continue
+        total = len(actions)
+        failed = 0
+        progress = Progress(f"Plan phase {phase}", total)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(apply_plan_action, source, target, action, targets, variables): action for action in actions}
+            for future in as_completed(futures):
+                action = futures[future]
+                position = progress.step()
+                try:
+                    detail = future.result()
+                except TFCHTTPUnclassified:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                except Exception as error:
+                    failed += 1
+                    logging.error(f"{position}: Failed to {action['action']} {phase} '{action['key']}'. {error!r}")
+                    journal.record(phase, action["key"], status="failed", detail=repr(error))
+                    continue
+                logging.info(f"{position}: Applied {action['action']} {phase} '{action['key']}'.")
+                journal.record(phase, action["key"], detail=detail)
+        progress.finish()
+        logging.info(f"Plan phase {phase} applied. Changed: {total - failed}, Failed: {failed}.")
+
+def variables_reexported(args):
+    # Variable changes are only applied when the variables file deployed was exported from the Source in this run
+    return bool(args.create_workspace_vars and args.create_workspace_vars_csv and args.var_file_path \
+        and os.path.abspath(args.output_file_path) == os.path.abspath(args.var_file_path))
 
 def handler(source, target, args):
+    REQUEST_SCHEDULER.configure(args.max_host_connections, args.requests_per_second)
+    configure_api_session(args.max_host_connections)
+    configure_blob_sessions(args.blob_pool_size, args.blob_gzip)
+    configure_state_cache(args.state_cache_dir, args.state_cache_max_bytes)
+    journal = MigrationJournal(args.journal_file_path)
+    # Source or Target is None when no selected phase needs it
+    source_inventory = OrganizationInventory(source, args.inventory_cache_dir, args.inventory_cache_ttl) if source is not None else None
+    target_inventory = OrganizationInventory(target, args.inventory_cache_dir, args.inventory_cache_ttl) if target is not None else None
     try:
+        agent_pool_id = None
+        if (args.pipeline or args.plan_file_path) and args.update_workspace_execution:
+            if args.execution_mode == 'agent' and target._hostname == 'app.terraform.io':
+                agent_pool_id = find_agent_pool_id(target, args.workspace_identifier)
+                if not agent_pool_id:
+                    logging.error(f"Could not find correct Agent Pool to assign to Workspaces.")
+                    exit()
+
+        sync_state = None
+        changed = {kind: set() for kind in SyncState.KINDS}
+        if args.sync_state_file_path:
+            if args.create_workspace_vars and not variables_reexported(args):
+                logging.warning(f"'{args.var_file_path}' is not re-exported by this run [--create-workspace-vars-csv], " \
+                    f"changed Source variables may be missing from it. Their sync marks are kept.")
+            sync_state = SyncState(args.sync_state_file_path)
+            source_inventory.restrict_workspaces(sync_state.changed_workspace_ids(source, source_inventory.collection("workspaces")))
+            sync_state.reopen(journal)
+            changed = sync_state.changed
+
+        if args.plan_file_path or args.apply_plan_file_path:
+            if args.plan_file_path:
+                write_migration_plan(build_migration_plan(source, target, args, source_inventory, target_inventory, agent_pool_id), args.plan_file_path)
+            else:
+                apply_migration_plan(source, target, args.apply_plan_file_path, journal, args.max_workers)
+            return
+
+        teams_map = None
         if args.migrate_teams:
-            migrate_teams(source, target)
+            # Team access is migrated per Workspace by the pipeline
+            teams_map = migrate_teams(source, target, journal, source_inventory, target_inventory, \
+                migrate_access=not args.pipeline, max_workers=args.max_workers)
         else:
             logging.info(f"[--migrate-teams] argument not provided to create new teams, skipped.")
 
         if args.migrate_registry_modules:
-            create_target_registry_modules(source, target)
+            create_target_registry_modules(source, target, journal, source_inventory, target_inventory, args.max_workers)
         else:
             logging.info(f"[--migrate-registry-modules] argument not provided to migrate registry modules, skipped.")
 
-        if args.migrate_workspaces:
-            migrate_workspaces(source, target)
-        else:
-            logging.info(f"[--migrate-workspaces] argument not provided to create new workspaces, skipped.")
-
         if args.delete_workspace_vars:
-            nuke_target_workspace_variables(target)
+            nuke_target_workspace_variables(target, args.delete_workspace_vars_identifier, target_inventory, args.max_workers)
         else:
             logging.info(f"[--delete-workspace-vars] argument not provided to delete workspace variables, skipped.")
 
         if args.create_workspace_vars_csv:
-            if args.output_file_path:
-                create_source_variable_spreadsheet(source, args.output_file_path)
-            else:
-                logging.error(f"'Missing file path for Workspace Variables Parameter. [--output-file-path]")
-                exit()
+            create_source_variable_spreadsheet(source, args.output_file_path, source_inventory, args.max_workers)
         else:
             logging.info(f"[--create-workspace-vars-csv] [--output-file-path] arguments not provided to create workspace variable spreedsheet, skipped.")
 
-        if args.create_workspace_vars:
-            deploy_target_workspace_variables(target, args.var_file_path)    
+        if args.prestage_state:
+            prestage_current_state(source, args.max_workers, source_inventory)
         else:
-            logging.info(f"[--create-workspace-vars] argument not provided to create workspace variables, skipped.")
+            logging.info(f"[--prestage-state] argument not provided to pre-stage state versions, skipped.")
 
-        if args.update_workspace_execution:
-            if args.execution_mode:
-                if args.workspace_identifier:
-                    set_target_workspace_execution_mode(target, args.execution_mode, args.workspace_identifier)
-                else:
-                    logging.error(f"'Missing Workspace Identifier Parameter. [--workspace-identifier]")
-                    exit()
-            else:
-                logging.error(f"'Missing Workspace Execution Mode Parameter. [--execution-mode]")
-                exit()
+        if args.pipeline:
+            run_workspace_pipeline(source, target, args, journal, source_inventory, target_inventory, teams_map, agent_pool_id, changed)
         else:
-            logging.info(f"[--update-workspace-execution] [--execution-mode] [--workspace-identifier] arguments not provided to updated workspace execution mode, skipped.")
+            if args.migrate_workspaces:
+                migrate_workspaces(source, target, journal, source_inventory, target_inventory, args.max_workers, changed["workspaces"])
+            else:
+                logging.info(f"[--migrate-workspaces] argument not provided to create new workspaces, skipped.")
 
-        if args.update_workspace_varsets:
-            apply_workspace_variable_sets(target)
-        else:
-            logging.info(f"[--update-workspace-varsets] argument not provided to updated workspace variable sets, skipped.")
+            if args.create_workspace_vars:
+                deploy_target_workspace_variables(target, args.var_file_path, journal, target_inventory, args.max_workers, changed["variables"])
+            else:
+                logging.info(f"[--create-workspace-vars] argument not provided to create workspace variables, skipped.")
 
-        if args.migrate_current_state:
-            migrate_current_state(source, target)
-        else:
-            logging.info(f"[--migrate-current-state] argument not provided to migrate current state versions, skipped.")
+            if args.update_workspace_execution:
+                set_target_workspace_execution_mode(target, args.execution_mode, args.workspace_identifier, target_inventory, args.max_workers)
+            else:
+                logging.info(f"[--update-workspace-execution] [--execution-mode] [--workspace-identifier] arguments not provided to updated workspace execution mode, skipped.")
+
+            if args.update_workspace_varsets:
+                apply_workspace_variable_sets(target, target_inventory)
+            else:
+                logging.info(f"[--update-workspace-varsets] argument not provided to updated workspace variable sets, skipped.")
+
+            if args.migrate_state_history:
+                migrate_state_history(source, target, args.max_workers, journal, source_inventory, target_inventory, \
+                    args.state_history_max_versions, args.state_history_max_age_days)
+            else:
+                logging.info(f"[--migrate-state-history] argument not provided to migrate state version history, skipped.")
+
+            if args.migrate_current_state:
+                migrate_current_state(source, target, args.max_workers, journal, source_inventory, target_inventory)
+            else:
+                logging.info(f"[--migrate-current-state] argument not provided to migrate current state versions, skipped.")
+
+        if sync_state is not None:
+            applied_kinds = [kind for kind, applied in (("workspaces", args.migrate_workspaces), \
+                ("state-versions", args.migrate_current_state), ("variables", variables_reexported(args))) if applied]
+            sync_state.save(journal, applied_kinds)
     except TFCHTTPUnclassified:
         logger.error("Unable to authenticate requests. Please verify proxy redirect.")
         exit()
+    finally:
+        for inventory in (source_inventory, target_inventory):
+            if inventory is not None:
+                inventory.save()
+        log_blob_session_stats()
+        METRICS.log_summary()
+        if args.metrics_file_path:
+            METRICS.write_json(args.metrics_file_path)
+        if args.prometheus_file_path:
+            METRICS.write_prometheus(args.prometheus_file_path)
 
 if __name__ == "__main__":
     args = parse_arguments()
@@ -730,13 +3350,20 @@ if __name__ == "__main__":
         log_level = logging.DEBUG
 
     logging.basicConfig(level=log_level)
+    validate_arguments(args)
     try:
-        source = TFC(TFE_SOURCE_TOKEN, url=TFE_SOURCE_URL, verify=TFE_SOURCE_VERIFY, log_level=log_level)
-        source.set_org(TFE_SOURCE_ORG)
-        logging.info(f"Configured Source: Host '{source.get_hostname()}'; Organiztion '{source.get_org()}'")
-        target = TFC(TFC_TARGET_TOKEN, url=TFC_TARGET_URL, verify=TFC_TARGET_VERIFY, log_level=log_level)
-        target.set_org(TFC_TARGET_ORG)
-        logging.info(f"Configured Target: Host '{target.get_hostname()}'; Organization '{target.get_org()}'")
+        source = None
+        if any(getattr(args, argument) for argument in SOURCE_CLIENT_ARGUMENTS):
+            source = build_client(TFE_SOURCE_TOKEN, TFE_SOURCE_URL, TFE_SOURCE_VERIFY, TFE_SOURCE_ORG, log_level)
+            logging.info(f"Configured Source: Host '{source.get_hostname()}'; Organiztion '{source.get_org()}'")
+        else:
+            logging.info(f"No selected phase reads from the Source, Source client not configured.")
+        target = None
+        if any(getattr(args, argument) for argument in TARGET_CLIENT_ARGUMENTS):
+            target = build_client(TFC_TARGET_TOKEN, TFC_TARGET_URL, TFC_TARGET_VERIFY, TFC_TARGET_ORG, log_level)
+            logging.info(f"Configured Target: Host '{target.get_hostname()}'; Organization '{target.get_org()}'")
+        else:
+            logging.info(f"No selected phase writes to the Target, Target client not configured.")
     except json.JSONDecodeError as decoding_error:
         logging.error(f"Outgoing GET Request to '//.well-known/terraform.json' failed to acquire JSON data needed for migration steps.")
         exit()      
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import migration_script
+
+WELL_KNOWN = {"tfe.v2": "/api/v2/", "tfe.v2.1": "/api/v2/", "tfe.v2.2": "/api/v2/", "modules.v1": "/api/registry/v1/modules/"}
+
+# Fake TFE API answering each request with the next injected status, then 200 once they run out. Successful
+# responses are `{"data": []}` unless a body, or a function of the query string, is set for the path.
+class FakeTFE(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeTFEHandler)
+        self.statuses = []
+        self.requests = []
+        self.bodies = {}
+
+    def body(self, path):
+        request = urlparse(path)
+        body = self.bodies.get(request.path, {"data": []})
+        return body(parse_qs(request.query)) if callable(body) else body
+
+class FakeTFEHandler(BaseHTTPRequestHandler):
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path == "/.well-known/terraform.json":
+            status, body = 200, json.dumps(WELL_KNOWN).encode()
+        else:
+            self.server.requests.append((self.command, self.path))
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+            body = json.dumps(self.server.body(self.path) if status == 200 else {"errors": [{"status": str(status)}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+# In-memory stand-ins for tests that need no HTTP. A FakeEndpoint answers each method from its responses,
+# a value or a function of the call's arguments, and records every call.
+class FakeEndpoint:
+    def __init__(self, **responses):
+        self.responses = responses
+        self.calls = []
+
+    def __getattr__(self, method):
+        if method.startswith("_") or method not in self.responses:
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            response = self.responses[method]
+            return response(*args, **kwargs) if callable(response) else response
+        return call
+
+    def called(self, method):
+        return [args for called_method, args, kwargs in self.calls if called_method == method]
+
+class FakeClient:
+    def __init__(self, **endpoints):
+        for name, endpoint in endpoints.items():
+            setattr(self, name, endpoint)
+
+    def get_url(self):
+        return "https://tfe.example.com"
+
+    def get_org(self):
+        return "org"
+
+# Indexed like OrganizationInventory, from the given collections instead of API listings
+class FakeInventory:
+    def __init__(self, workspaces=(), teams=(), memberships=(), modules=()):
+        self._collections = {"workspaces": list(workspaces), "teams": list(teams), "memberships": list(memberships), "modules": list(modules)}
+        self.added = []
+
+    def collection(self, collection):
+        return self._collections[collection]
+
+    def find(self, collection, name=None, id=None):
+        return next((item for item in self._collections[collection] if (id is not None and item["id"] == id) \
+            or (name is not None and migration_script.OrganizationInventory._name(collection, item) == name)), None)
+
+    def add(self, collection, item):
+        self._collections[collection].append(item)
+        self.added.append(item)
+
+    def workspaces(self):
+        return self.collection("workspaces")
+
+    def workspace(self, name):
+        return self.find("workspaces", name=name)
+
+    def teams(self):
+        return self.collection("teams")
+
+    def memberships(self, status=None):
+        return [membership for membership in self.collection("memberships") if status is None or membership["attributes"]["status"] == status]
+
+    def modules(self):
+        return self.collection("modules")
+
+def workspace(workspace_id, name, **attributes):
+    return {"id": workspace_id, "attributes": dict(attributes, name=name)}
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(migration_script, "MIGRATION_RETRY_BASE_SECONDS", 0.01)
+    migration_script.REQUEST_SCHEDULER.configure(4, 1000, max_retries=3)
+    fake = FakeTFE()
+    thread = threading.Thread(target=fake.serve_forever, daemon=True)
+    thread.start()
+    yield fake
+    fake.shutdown()
+    fake.server_close()
+
+@pytest.fixture
+def client(server):
+    return migration_script.build_client("token", f"http://127.0.0.1:{server.server_port}", False, "org", "WARNING")
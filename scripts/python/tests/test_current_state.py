@@ -0,0 +1,38 @@
+import io
+
+import pytest
+
+import migration_script
+from conftest import FakeClient, FakeEndpoint, FakeInventory, workspace
+
+SOURCE_WORKSPACE = workspace("ws-source", "app")
+
+def test_workspaces_missing_on_the_target_are_skipped_before_any_request():
+    # Neither client may be used, any attribute access fails
+    result = migration_script.migrate_workspace_state(None, None, SOURCE_WORKSPACE, FakeInventory())
+    assert result["status"] == "skipped" and not result.get("done")
+
+def test_only_the_newest_target_state_version_is_listed(server, client):
+    server.bodies["/api/v2/state-versions"] = {"data": [{"id": "sv-target", "attributes": {"serial": 9}}], \
+        "meta": {"pagination": {"current-page": 1, "total-pages": 50}}}
+    server.bodies["/api/v2/workspaces/ws-source/current-state-version"] = {"data": {"id": "sv-source", "attributes": {"serial": 7}}}
+    result = migration_script.migrate_workspace_state(client, client, SOURCE_WORKSPACE, FakeInventory([workspace("ws-target", "app")]))
+    assert result["status"] == "skipped" and result["done"]
+    listings = [path for method, path in server.requests if path.startswith("/api/v2/state-versions")]
+    assert len(listings) == 1 and "page%5Bsize%5D=1" in listings[0]
+
+def test_failed_uploads_release_the_lock_and_record_its_time(monkeypatch):
+    metrics = migration_script.MigrationMetrics()
+    monkeypatch.setattr(migration_script, "METRICS", metrics)
+    def upload_state_version(target, workspace_id, payload_file, payload_size):
+        raise migration_script.TFCHTTPInternalServerError({"errors": [{"status": "500"}]})
+    monkeypatch.setattr(migration_script, "upload_state_version", upload_state_version)
+
+    target = FakeClient(workspaces=FakeEndpoint(lock=None, unlock=None))
+    state = b'{"serial": 3, "lineage": "lineage"}'
+    source_state = {"file": io.BytesIO(state), "serial": 3, "lineage": "lineage", "md5": "md5", "size": len(state)}
+    with pytest.raises(migration_script.TFCHTTPInternalServerError):
+        migration_script.upload_workspace_state(target, "ws-target", source_state, "app")
+
+    assert [(method, args[0]) for method, args, kwargs in target.workspaces.calls] == [("lock", "ws-target"), ("unlock", "ws-target")]
+    assert metrics.report()["workspace_locks"]["app"]["count"] == 1
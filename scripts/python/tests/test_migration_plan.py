@@ -0,0 +1,42 @@
+import sys
+from argparse import Namespace
+
+import pytest
+
+import migration_script
+from conftest import FakeClient, FakeEndpoint, FakeInventory, workspace
+
+def fake_client(team_access=None, varset_workspace_ids=()):
+    # Team access is listed per Workspace, filtered by its ID
+    team_access = team_access or {}
+    variable_set = {"data": {"relationships": {"workspaces": {"data": [{"id": workspace_id} for workspace_id in varset_workspace_ids]}}}}
+    return FakeClient(team_access=FakeEndpoint(list=lambda filters=None: {"data": team_access.get(filters[0]["value"], [])}), \
+        var_sets=FakeEndpoint(show=variable_set))
+
+def plan_arguments(**arguments):
+    defaults = {"var_file_path": None, "max_workers": 2, "migrate_teams": False, "migrate_registry_modules": False, "migrate_workspaces": False, \
+        "create_workspace_vars": False, "update_workspace_execution": False, "update_workspace_varsets": False, "migrate_current_state": False}
+    defaults.update(arguments)
+    return Namespace(**defaults)
+
+def test_team_access_for_unplanned_workspaces_is_unsupported():
+    team = {"id": "team-1", "attributes": {"name": "developers"}}
+    source = fake_client({"ws-1": [{"attributes": {"access": "read"}, "relationships": {"team": {"data": {"id": "team-1"}}}}]})
+    plan = migration_script.build_migration_plan(source, fake_client(), plan_arguments(migrate_teams=True), \
+        FakeInventory([workspace("ws-1", "app")], [team]), FakeInventory([], [team]))
+    assert plan["summary"]["team-access"] == {"unsupported": 1}
+    assert not [action for action in plan["actions"] if action["phase"] == "team-access"]
+
+def test_variable_sets_already_applied_are_skipped(monkeypatch):
+    monkeypatch.setattr(migration_script, "TFC_TARGET_VAR_SETS", {"prod": "varset-1"})
+    target_workspaces = [workspace("ws-target-1", "app-prod"), workspace("ws-target-2", "api-prod")]
+    plan = migration_script.build_migration_plan(fake_client(), fake_client(varset_workspace_ids=["ws-target-1"]), \
+        plan_arguments(update_workspace_varsets=True), FakeInventory(), FakeInventory(target_workspaces))
+    assert plan["summary"]["varsets"] == {"apply": 1, "skip": 1}
+    assert [action["workspace"] for action in plan["actions"]] == ["api-prod"]
+
+def test_phases_a_plan_does_not_cover_are_rejected(monkeypatch):
+    for arguments in (["--plan", "plan.json", "--migrate-state-history"], ["--apply-plan", "plan.json", "--pipeline"]):
+        monkeypatch.setattr(sys, "argv", ["migration_script.py"] + arguments)
+        with pytest.raises(SystemExit):
+            migration_script.validate_arguments(migration_script.parse_arguments())
@@ -0,0 +1,29 @@
+import migration_script
+from conftest import FakeInventory
+
+def source_member(user_id, email):
+    return {"attributes": {"email": email, "status": "active"}, "relationships": {"user": {"data": {"id": user_id}}, "teams": {"data": []}}}
+
+def migrate(client, journal):
+    source_inventory = FakeInventory(memberships=[source_member("user-1", "one@example.com")])
+    return migration_script.migrate_org_memberships(None, client, {}, journal, source_inventory, FakeInventory(), max_workers=1)
+
+def test_gateway_errors_on_invites_are_retryable(server, client, tmp_path):
+    journal = migration_script.MigrationJournal(str(tmp_path / "journal.jsonl"))
+    server.statuses = [502]
+    assert migrate(client, journal) == {"user-1": None}
+    assert journal.status("org-memberships", "user-1") == "failed"
+
+    # Retryable invitations are sent again by the next run
+    server.statuses = [503]
+    migrate(client, migration_script.MigrationJournal(journal.path))
+    assert [method for method, _ in server.requests] == ["POST", "POST"]
+
+def test_rejected_invites_are_skipped_on_resume(server, client, tmp_path):
+    journal = migration_script.MigrationJournal(str(tmp_path / "journal.jsonl"))
+    server.statuses = [422]
+    assert migrate(client, journal) == {"user-1": None}
+    assert journal.status("org-memberships", "user-1") == "rejected"
+
+    assert migrate(client, migration_script.MigrationJournal(journal.path)) == {"user-1": None}
+    assert len(server.requests) == 1
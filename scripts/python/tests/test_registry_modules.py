@@ -0,0 +1,28 @@
+import migration_script
+
+MODULES_PATH = "/api/v2/organizations/org/registry-modules"
+
+def registry_module(name, provider, vcs_repo=None):
+    return {"id": f"mod-{name}", "type": "registry-modules", "attributes": {"name": name, "provider": provider, "vcs-repo": vcs_repo}}
+
+def paginated(items):
+    def list_page(query):
+        number, size = int(query["page[number]"][0]), int(query["page[size]"][0])
+        total_pages = -(-len(items) // size)
+        return {"data": items[(number - 1) * size:number * size], "meta": {"pagination": {"current-page": number, "total-pages": total_pages}}}
+    return list_page
+
+def test_registry_modules_are_listed_from_every_page(server, client):
+    modules = [registry_module(f"module-{index}", "aws") for index in range(150)]
+    server.bodies[MODULES_PATH] = paginated(modules)
+    inventory = migration_script.OrganizationInventory(client)
+    assert len(inventory.modules()) == 150
+    assert inventory.find("modules", name="module-149/aws")["id"] == "mod-module-149"
+
+def test_vcs_registry_module_is_published_from_its_listing(server, client):
+    vcs_repo = {"identifier": "org/terraform-aws-network", "display-identifier": "org/terraform-aws-network", "oauth-token-id": "ot-source"}
+    source_module = registry_module("network", "aws", vcs_repo)
+    result = migration_script.migrate_registry_module(client, client, source_module, False)
+    assert result["status"] == "created"
+    # The listing carries the VCS settings, the Module is not shown again
+    assert server.requests == [("POST", f"{MODULES_PATH}/vcs")]
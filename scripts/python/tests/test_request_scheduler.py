@@ -0,0 +1,30 @@
+import pytest
+
+from terrasnek.exceptions import TFCHTTPInternalServerError
+
+def test_rate_limited_requests_are_retried(server, client):
+    server.statuses = [429, 429]
+    assert client.workspaces.list() == {"data": []}
+    assert len(server.requests) == 3
+
+def test_rate_limited_creates_are_retried(server, client):
+    server.statuses = [429]
+    assert client.workspaces.create({"data": {}}) == {"data": []}
+    assert [method for method, _ in server.requests] == ["POST", "POST"]
+
+def test_gateway_errors_on_idempotent_requests_are_retried(server, client):
+    server.statuses = [502, 503, 504]
+    assert client.workspaces.list() == {"data": []}
+    assert len(server.requests) == 4
+
+def test_gateway_errors_on_creates_are_not_retried(server, client):
+    server.statuses = [502]
+    with pytest.raises(TFCHTTPInternalServerError):
+        client.workspaces.create({"data": {}})
+    assert len(server.requests) == 1
+
+def test_exhausted_retries_raise_a_server_error(server, client):
+    server.statuses = [502] * 4
+    with pytest.raises(TFCHTTPInternalServerError):
+        client.workspaces.list()
+    assert len(server.requests) == 4
@@ -0,0 +1,58 @@
+import io
+import os
+import gzip
+import hashlib
+
+import migration_script
+
+def state_blob(content, serial=1):
+    return {"file": io.BytesIO(content), "md5": hashlib.md5(content).hexdigest(), "serial": serial, "lineage": "lineage", "size": len(content)}
+
+def blob_exists(cache, content):
+    return os.path.exists(cache._blob_path(hashlib.md5(content).hexdigest()))
+
+def test_least_recently_used_versions_are_evicted_beyond_the_size_limit(tmp_path):
+    # Random content does not compress, so each blob takes a little over 1000 bytes on disk
+    first, second, third = os.urandom(1000), os.urandom(1000), os.urandom(1000)
+    cache = migration_script.StateBlobCache(str(tmp_path), max_bytes=2500)
+    cache.put("ws-1", "sv-1", state_blob(first))
+    cache.put("ws-2", "sv-2", state_blob(second))
+    cache.get("ws-1", 1)["file"].close()
+    cache.put("ws-3", "sv-3", state_blob(third))
+
+    assert cache.get("ws-2", 1) is None and not blob_exists(cache, second)
+    assert blob_exists(cache, first) and blob_exists(cache, third)
+    # The eviction is kept in the index across runs
+    assert set(migration_script.StateBlobCache(str(tmp_path), max_bytes=2500)._entries) == {"ws-1/1", "ws-3/1"}
+
+def test_blobs_shared_by_several_versions_are_removed_with_the_last_one(tmp_path):
+    content = b'{"serial": 1}'
+    cache = migration_script.StateBlobCache(str(tmp_path))
+    cache.put("ws-1", "sv-1", state_blob(content))
+    cache.put("ws-2", "sv-2", state_blob(content))
+
+    cache.evict("ws-1/1")
+    assert blob_exists(cache, content)
+    assert cache.get("ws-2", 1)["file"].read() == content
+    cache.evict("ws-2/1")
+    assert not blob_exists(cache, content)
+
+def test_corrupt_blobs_are_evicted(tmp_path):
+    content = b'{"serial": 1}'
+    cache = migration_script.StateBlobCache(str(tmp_path))
+    cache.put("ws-1", "sv-1", state_blob(content))
+    with gzip.open(cache._blob_path(hashlib.md5(content).hexdigest()), "wb") as blob_file:
+        blob_file.write(b'{"serial": 2}')
+
+    assert cache.get("ws-1", 1) is None
+    assert "ws-1/1" not in cache._entries and not blob_exists(cache, content)
+
+def test_unreadable_blobs_are_evicted(tmp_path):
+    content = b'{"serial": 1}'
+    cache = migration_script.StateBlobCache(str(tmp_path))
+    cache.put("ws-1", "sv-1", state_blob(content))
+    with open(cache._blob_path(hashlib.md5(content).hexdigest()), "wb") as blob_file:
+        blob_file.write(b"not gzip")
+
+    assert cache.get("ws-1", 1) is None
+    assert "ws-1/1" not in cache._entries
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+import migration_script
+from conftest import FakeClient, FakeEndpoint
+
+def fake_source(serials, days_apart=0):
+    # Listed newest first, like the API
+    now = datetime.now(timezone.utc)
+    state_versions = [{"id": f"sv-{serial}", "attributes": {"serial": serial, "created-at": (now - timedelta(days=index * days_apart)).isoformat()}} \
+        for index, serial in enumerate(sorted(serials, reverse=True))]
+    def list_page(filters=None, page=1, page_size=20):
+        return {"data": state_versions[(page - 1) * page_size:page * page_size], \
+            "meta": {"pagination": {"current-page": page, "total-pages": -(-len(state_versions) // page_size)}}}
+    return FakeClient(state_versions=FakeEndpoint(list=list_page))
+
+def pages(source):
+    return [kwargs["page"] for method, args, kwargs in source.state_versions.calls]
+
+def serials(state_versions):
+    return [state_version["attributes"]["serial"] for state_version in state_versions]
+
+def test_paging_stops_at_the_version_cap():
+    source = fake_source(range(1, 1001))
+    assert serials(migration_script.list_newest_state_versions(source, [], max_versions=100)) == list(range(1000, 900, -1))
+    assert pages(source) == [1]
+    assert serials(migration_script.list_newest_state_versions(source, [], max_versions=150))[-1] == 851
+
+def test_paging_stops_at_the_target_current_serial():
+    source = fake_source(range(1, 1001))
+    assert serials(migration_script.list_newest_state_versions(source, [], newer_than=990, max_versions=100)) == list(range(1000, 990, -1))
+    assert pages(source) == [1]
+
+def test_paging_stops_at_the_age_cutoff():
+    source = fake_source(range(1, 1001), days_apart=1)
+    state_versions = migration_script.list_newest_state_versions(source, [], max_versions=1000, max_age_days=5)
+    assert serials(state_versions) == [1000, 999, 998, 997, 996]
+    assert pages(source) == [1]
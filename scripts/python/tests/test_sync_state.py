@@ -0,0 +1,69 @@
+import json
+from argparse import Namespace
+
+import migration_script
+from conftest import FakeClient, FakeEndpoint, FakeInventory, workspace
+
+def fake_source(variables=()):
+    return FakeClient(vars=FakeEndpoint(list={"data": list(variables)}))
+
+def fake_target(variables=()):
+    return FakeClient(workspace_vars=FakeEndpoint(list={"data": list(variables)}, update=None, \
+        create=lambda workspace_id, payload: {"data": {"id": "var-new", "attributes": payload["data"]["attributes"]}}))
+
+def source_workspace(workspace_id, updated_at):
+    return dict(workspace(workspace_id, workspace_id, **{"updated-at": updated_at}), relationships={})
+
+def variable(key, value, variable_id="var-1"):
+    return {"id": variable_id, "attributes": {"key": key, "value": value, "description": None, "category": "terraform", \
+        "hcl": False, "sensitive": False}}
+
+def test_unapplied_kinds_keep_their_marks(tmp_path):
+    path = str(tmp_path / "sync.json")
+    journal = migration_script.MigrationJournal(str(tmp_path / "journal.jsonl"))
+    sync_state = migration_script.SyncState(path)
+    sync_state.changed_workspace_ids(fake_source(), [source_workspace("ws-1", "2024-01-01")])
+    sync_state.save(journal, ["workspaces"])
+
+    with open(path, "r", encoding="utf-8") as sync_file:
+        marks = json.load(sync_file)
+    assert marks["workspaces"] == {"ws-1": "2024-01-01"}
+    assert marks["variables"] == {} and marks["state-versions"] == {}
+
+    # Only the kinds that were not applied are still seen as changed
+    sync_state = migration_script.SyncState(path)
+    assert sync_state.changed_workspace_ids(fake_source(), [source_workspace("ws-1", "2024-01-01")]) == {"ws-1"}
+    assert not sync_state.changed["workspaces"]
+
+def test_changed_workspaces_reopen_their_journal_entries(tmp_path):
+    journal = migration_script.MigrationJournal(str(tmp_path / "journal.jsonl"))
+    journal.record("workspace-variables", "ws-1:region")
+    journal.record("workspace-variables", "ws-2:region")
+    journal.record("workspaces", "ws-1")
+    sync_state = migration_script.SyncState(str(tmp_path / "sync.json"))
+    sync_state.changed = {"workspaces": set(), "state-versions": set(), "variables": {"ws-1"}}
+    sync_state.reopen(journal)
+
+    assert not journal.is_done("workspace-variables", "ws-1:region")
+    assert journal.is_done("workspace-variables", "ws-2:region")
+    assert journal.is_done("workspaces", "ws-1")
+
+def test_changed_variables_update_existing_target_variables():
+    target = fake_target([variable("region", "us-east-1")])
+    target_inventory = FakeInventory([workspace("ws-target", "app")])
+    variables = [("ws-1:region", {"workspace_name": "app", "workspace_id": "ws-1", "variable_key": "region", "variable_value": "eu-west-1", \
+        "variable_category": "terraform", "variable_hcl": False})]
+    result = migration_script.deploy_workspace_variables(target, "app", variables, migration_script.MigrationJournal(), target_inventory)
+    assert target.workspace_vars.called("update") == [] and result["status"] == "skipped"
+
+    result = migration_script.deploy_workspace_variables(target, "app", variables, migration_script.MigrationJournal(), target_inventory, {"ws-1"})
+    assert [variable_id for workspace_id, variable_id, payload in target.workspace_vars.called("update")] == ["var-1"]
+    assert result["status"] == "created" and not target.workspace_vars.called("create")
+
+def test_variables_only_count_as_applied_when_re_exported_in_the_same_run(tmp_path):
+    var_file_path = str(tmp_path / "variables.csv")
+    arguments = {"create_workspace_vars": True, "create_workspace_vars_csv": True, "var_file_path": var_file_path, "output_file_path": var_file_path}
+    assert migration_script.variables_reexported(Namespace(**arguments))
+    # A stale export from an earlier run does not contain the changed Source values
+    assert not migration_script.variables_reexported(Namespace(**dict(arguments, create_workspace_vars_csv=False)))
+    assert not migration_script.variables_reexported(Namespace(**dict(arguments, output_file_path=str(tmp_path / "other.csv"))))
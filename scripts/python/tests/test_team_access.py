@@ -0,0 +1,26 @@
+import migration_script
+from conftest import FakeClient, FakeEndpoint, FakeInventory, workspace
+
+SOURCE_WORKSPACE = workspace("ws-source", "app")
+
+def workspace_team(team_id):
+    return {"attributes": {"access": "read"}, "relationships": {"team": {"data": {"id": team_id}}}}
+
+def fake_target(target_workspace_teams=()):
+    return FakeClient(team_access=FakeEndpoint(list={"data": list(target_workspace_teams)}, add_team_access=None))
+
+def migrate(target, source_workspace_teams, teams_map):
+    return migration_script.migrate_workspace_team_access(target, SOURCE_WORKSPACE, source_workspace_teams, teams_map, \
+        migration_script.MigrationJournal(), FakeInventory([workspace("ws-target", "app")]))
+
+def test_missing_team_access_is_added():
+    target = fake_target([workspace_team("team-target-1")])
+    result = migrate(target, [workspace_team("team-1"), workspace_team("team-2")], {"team-1": "team-target-1", "team-2": "team-target-2"})
+    assert result["status"] == "created"
+    assert [payload["data"]["relationships"]["team"]["data"]["id"] for payload, in target.team_access.called("add_team_access")] == ["team-target-2"]
+
+def test_unmigrated_teams_are_skipped_without_listing_the_target():
+    target = fake_target()
+    result = migrate(target, [workspace_team("team-1")], {})
+    assert result["status"] == "skipped" and result["done"]
+    assert target.team_access.calls == []
@@ -0,0 +1,77 @@
+import time
+
+import migration_script
+from terrasnek.exceptions import TFCHTTPBadRequest
+from conftest import FakeClient, FakeEndpoint, FakeInventory, workspace
+
+def fake_target(rejections=0):
+    # The first creates are rejected with Bad Request, the rest succeed
+    remaining = [rejections]
+    def create(payload):
+        if remaining[0]:
+            remaining[0] -= 1
+            raise TFCHTTPBadRequest({"errors": [{"status": "400", "detail": "Bad Request"}]})
+        return {"data": workspace(f"ws-{payload['data']['attributes']['name']}", payload["data"]["attributes"]["name"])}
+    return FakeClient(workspaces=FakeEndpoint(create=create))
+
+def created(target_inventory):
+    # Workspaces are added to the Target inventory once created
+    return [workspace["attributes"]["name"] for workspace in target_inventory.added]
+
+def source_workspace(name):
+    return workspace(f"ws-source-{name}", name, **{"terraform-version": "1.5.0", "working-directory": "", "file-triggers-enabled": True, \
+        "allow-destroy-plan": True, "auto-apply": False, "execution-mode": "remote", "description": None, "source-name": None, \
+        "source-url": None, "queue-all-runs": False, "speculative-enabled": True, "trigger-prefixes": []})
+
+def test_rejected_creates_are_retried_without_holding_a_worker(monkeypatch):
+    monkeypatch.setattr(migration_script, "WORKSPACE_CREATE_RETRY_SECONDS", 0.2)
+    target, target_inventory = fake_target(rejections=1), FakeInventory()
+    graph = migration_script.WorkspaceTaskGraph({"workspace": 1})
+    for name in ("app", "api"):
+        graph.add((name, "workspace"), "workspace", lambda name=name: migration_script.migrate_workspace(\
+            target, source_workspace(name), migration_script.MigrationJournal(), target_inventory))
+
+    started = time.monotonic()
+    results = graph.run()
+    assert time.monotonic() - started >= 0.2
+    # The second Workspace is created while the first waits for its retry on the only worker
+    assert created(target_inventory) == ["api", "app"]
+    assert {key: result["status"] for key, result in results.items()} == {("app", "workspace"): "created", ("api", "workspace"): "created"}
+
+def test_creates_fail_once_retries_are_exhausted(monkeypatch):
+    monkeypatch.setattr(migration_script, "WORKSPACE_CREATE_RETRIES", 1)
+    monkeypatch.setattr(migration_script, "WORKSPACE_CREATE_RETRY_SECONDS", 0)
+    target = fake_target(rejections=2)
+    graph = migration_script.WorkspaceTaskGraph({"workspace": 1})
+    graph.add(("app", "workspace"), "workspace", lambda: migration_script.migrate_workspace(\
+        target, source_workspace("app"), migration_script.MigrationJournal(), FakeInventory()))
+    assert graph.run()[("app", "workspace")]["status"] == "failed"
+    assert len(target.workspaces.called("create")) == 2
+
+def test_workspace_phase_retries_through_the_task_graph(monkeypatch):
+    monkeypatch.setattr(migration_script, "WORKSPACE_CREATE_RETRY_SECONDS", 0)
+    target, target_inventory = fake_target(rejections=1), FakeInventory()
+    source_inventory = FakeInventory([source_workspace("app"), source_workspace("api")])
+    results = migration_script.migrate_workspaces(None, target, migration_script.MigrationJournal(), source_inventory, target_inventory, max_workers=1)
+    assert sorted(created(target_inventory)) == ["api", "app"]
+    assert all(result["status"] == "created" for result in results.values())
+
+def test_concurrent_task_time_is_not_reported_as_phase_wall_time(monkeypatch, tmp_path):
+    metrics = migration_script.MigrationMetrics()
+    monkeypatch.setattr(migration_script, "METRICS", metrics)
+    graph = migration_script.WorkspaceTaskGraph({"workspace": 2})
+    def task(name):
+        time.sleep(0.1)
+        return {"workspace": name, "status": "created", "detail": ""}
+    for name in ("app", "api"):
+        graph.add((name, "workspace"), "workspace", lambda name=name: task(name))
+
+    with metrics.phase("migrate-workspaces"):
+        graph.run()
+    report = metrics.report()
+    # Both tasks overlap, so their summed seconds exceed the wall time of the phase running them
+    assert list(report["phases"]) == ["migrate-workspaces"]
+    assert report["tasks"]["workspace"]["runs"] == 2
+    assert report["tasks"]["workspace"]["seconds"] > report["phases"]["migrate-workspaces"]["seconds"]
+    metrics.write_prometheus(tmp_path / "metrics.prom")
+    assert 'tfe_migration_task_seconds_total{task="workspace"}' in (tmp_path / "metrics.prom").read_text()
@@ -0,0 +1,20 @@
+import json
+
+import migration_script
+
+def write_variables(filepath, keys):
+    with open(filepath, "w", encoding="utf-8") as variables_file:
+        for key in keys:
+            variables_file.write(json.dumps({"workspace_name": "app", "workspace_id": "ws-source", "variable_key": key, \
+                "variable_value": "value", "variable_category": "terraform", "variable_hcl": False, "variable_sensitive": False}) + "\n")
+
+def test_failed_variable_creates_are_journaled_without_aborting_the_phase(server, client, tmp_path):
+    server.bodies["/api/v2/organizations/org/workspaces"] = {"data": [{"id": "ws-target", "attributes": {"name": "app"}}]}
+    filepath = str(tmp_path / "variables.jsonl")
+    write_variables(filepath, ["region", "zone", "size"])
+    journal = migration_script.MigrationJournal(str(tmp_path / "journal.jsonl"))
+
+    # Workspace and variable listings succeed, then a proxy 502 without a title and a 422 for the first two creates
+    server.statuses = [200, 200, 502, 422]
+    migration_script.deploy_target_workspace_variables(client, filepath, journal, migration_script.OrganizationInventory(client), max_workers=1)
+    assert [journal.status("workspace-variables", f"ws-source:{key}") for key in ("region", "zone", "size")] == ["failed", "failed", "done"]